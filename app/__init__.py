@@ -7,10 +7,20 @@ Purpose:
 Features:
     - Load environment variables
     - Configure app from settings
-    - Initialize SQLAlchemy and rate limiter
-    - Automatically create database tables
-    - Configure Jinja2 loaders for partials and fallback templates
-    - Register home and users blueprints
+    - Initialize SQLAlchemy, rate limiter, recommender, title suggestion index
+      live shelf change feed, warm-up and the soft-delete purger
+    - Automatically create database tables without leaking connections into forked workers
+    - Configure Jinja2 loaders for partials and fallback templates with a
+      resolved-path cache, shared bytecode cache and optional precompilation
+    - Register home, users, health and JSON API (/api/v1) blueprints
+    - Optionally trace allocations and register the diagnostics blueprint
+    - Register SQLAlchemy event hooks (SQLite FKs, soft-delete filter, pool statistics)
+    - Route replica-safe reads to the read engine with read-your-writes stickiness
+    - Optionally shard per-user tables over several SQLite files
+    - Serve fingerprinted, precompressed static assets with immutable caching
+    - Compress dynamic responses (brotli/gzip) and revalidate HTML GETs by ETag
+    - Replay responses of retried shelf changes by idempotency key
+    - Register the stream_flush template global for streamed pages
     - Define HTTP error handlers for 404, 403, and 500 errors
     - Set up rotating file logging
 
@@ -19,13 +29,30 @@ Required Modules:
     - logging, logging.handlers.RotatingFileHandler: application logging
     - flask: Flask, render_template
     - dotenv.load_dotenv: environment variable loading
-    - jinja2.FileSystemLoader, jinja2.ChoiceLoader: template loading
     - sqlalchemy.exc: SQLAlchemyError
     - app.config.config_by_name: configuration mapping
     - app.extentions.db: SQLAlchemy instance
     - app.extentions.limiter: rate limiter instance
+    - app.services.recommender.recommender: recommender index
+    - app.services.title_index.title_index: title suggestion index
+    - app.services.change_feed.change_feed: live shelf change feed
+    - app.services.warmup.warmup: warm-up stages and readiness (run by wsgi.py)
+    - app.services.purger.purger: purge of soft-deleted rows and incremental VACUUM
     - app.blueprints.home.home_bp: home blueprint
     - app.blueprints.users.users_bp: users blueprint
+    - app.blueprints.health.health_bp: health blueprint
+    - app.blueprints.api.api_bp: versioned JSON API blueprint
+    - app.blueprints.diagnostics.diagnostics_bp: memory diagnostics blueprint
+    - app.diagnostics.init_diagnostics: allocation tracing and per-request peaks
+    - app.idempotency.idempotency: idempotency key store and replay hooks
+    - app.events: SQLAlchemy event hooks
+    - app.pool.pool_stats: connection pool statistics
+    - app.routing.init_routing: read-your-writes request hooks
+    - app.sharding.init_sharding: shard schemas and per-user request routing
+    - app.assets.init_assets: asset_url helper and fingerprinted static serving
+    - app.compression.init_compression: compression middleware and conditional GETs
+    - app.templating.init_templating: template loader chain and caching
+    - app.streaming.init_streaming: streamed HTML helpers
 
 Exceptions:
     - OSError: on filesystem errors when creating log directory
@@ -40,12 +67,29 @@ from logging.handlers import RotatingFileHandler
 
 from flask import Flask, render_template
 from dotenv import load_dotenv
-from jinja2 import ChoiceLoader, FileSystemLoader
 
 from app.config import config_by_name
 from app.extentions import db, limiter
 from app.blueprints.home import home_bp
 from app.blueprints.users import users_bp
+from app.blueprints.health import health_bp
+from app.blueprints.api import api_bp
+from app.blueprints.diagnostics import diagnostics_bp
+from app.diagnostics import init_diagnostics
+from app.idempotency import idempotency
+from app.pool import pool_stats
+from app.routing import init_routing
+from app.sharding import init_sharding
+from app.assets import init_assets
+from app.compression import init_compression
+from app.templating import init_templating
+from app.streaming import init_streaming
+from app import events  # noqa: F401  (registers SQLAlchemy event listeners)
+from app.services.recommender import recommender
+from app.services.title_index import title_index
+from app.services.change_feed import change_feed
+from app.services.warmup import warmup
+from app.services.purger import purger
 
 
 def create_app(
@@ -66,8 +110,8 @@ def create_app(
     :rtype: Flask
     :raises OSError: if log directory cannot be created
     """
-    # add prodject root for production
-    project_home = "/home/H4rf3r/CineShelf"
+    # add project root for production (derived from this file, not the host)
+    project_home = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
     if project_home not in sys.path:
         sys.path.insert(0, project_home)
 
@@ -77,8 +121,8 @@ def create_app(
     # Initialize Flask
     app = Flask(
         __name__,
-        template_folder=template_folder or "app/templates",
-        static_folder=static_folder or "app/static",
+        template_folder=template_folder or "templates",
+        static_folder=static_folder or "static",
         instance_relative_config=True,
     )
 
@@ -86,29 +130,46 @@ def create_app(
     cfg = config_by_name.get(config_name or "default")
     app.config.from_object(cfg)
 
+    # Trace allocations from the start, so startup caches show up in snapshots
+    init_diagnostics(app)
+
+    # Replays are answered before any other hook can touch the database
+    idempotency.init_app(app)
+
     # Initialize extensions
     db.init_app(app)
     limiter.init_app(app)
-
-    # Create tables
+    recommender.init_app(app)
+    title_index.init_app(app)
+    change_feed.init_app(app)
+    warmup.init_app(app)
+    purger.init_app(app)
+    pool_stats.slow_checkout_ms = app.config["DB_SLOW_CHECKOUT_MS"]
+    init_routing(app, db)
+    init_assets(app)
+    init_streaming(app)
+    init_compression(app)
+
+    # Create tables, then drop the pooled connection so a preloading server
+    # never hands the master's connection to its forked workers. An in-memory
+    # SQLite database only lives as long as its connection, so it is kept.
     with app.app_context():
         db.create_all()
+        for engine in db.engines.values():
+            if engine.url.database not in (None, "", ":memory:"):
+                engine.dispose()
+    init_sharding(app, db)
 
-    # Configure Jinja2 loaders: default -> partials -> fallback
-    root = app.root_path
-    partials_path = os.path.join(root, "templates", "partials")
-    fallback_path = os.path.join(root, "templates", "fallback")
-    app.jinja_loader = ChoiceLoader(
-        [
-            app.jinja_loader,
-            FileSystemLoader(partials_path),
-            FileSystemLoader(fallback_path),
-        ]
-    )
+    # Configure Jinja2 loaders (default -> partials -> fallback) and caching
+    init_templating(app)
 
     # Register blueprints
     app.register_blueprint(home_bp)
     app.register_blueprint(users_bp, url_prefix="/users")
+    app.register_blueprint(health_bp, url_prefix="/health")
+    app.register_blueprint(api_bp, url_prefix="/api/v1")
+    if app.config["DIAGNOSTICS_ENABLED"]:
+        app.register_blueprint(diagnostics_bp, url_prefix="/diagnostics")
 
     # Register error handlers
     @app.errorhandler(404)
@@ -0,0 +1,111 @@
+# File: app/assets.py
+"""
+Purpose:
+    Serve fingerprinted static assets produced by `app/assets_build.py` with
+    long-lived immutable caching and precompressed (brotli/gzip) variants.
+
+Features:
+    - asset_url: Jinja global resolving a source asset name to its fingerprinted URL
+    - Falls back to the plain static URL when no build manifest exists
+    - Serves `.br`/`.gz` variants by Accept-Encoding for fingerprinted files
+    - Sets `Cache-Control: public, max-age=31536000, immutable` and `Vary: Accept-Encoding`
+
+Required Modules:
+    - json, os, mimetypes: manifest loading and file lookup
+    - flask: request, url_for, send_from_directory
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import json
+import logging
+import mimetypes
+import os
+
+from flask import Flask, Response, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+# Output folder (inside the static folder) and manifest written by the build step
+DIST_DIR: str = "dist"
+MANIFEST_NAME: str = "manifest.json"
+
+# Fingerprinted files never change, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE: int = 365 * 24 * 3600
+
+# Content-Encoding tokens and file suffixes of precompressed variants, best first
+ENCODINGS: list[tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def load_manifest(static_folder: str) -> dict[str, str]:
+    """
+    Read the source-name -> fingerprinted-path manifest of the last asset build.
+
+    :param static_folder: Absolute path of the app's static folder
+    :return: Manifest mapping, empty if the build step has not been run
+    """
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.info("No asset manifest found; serving unfingerprinted assets.")
+        return {}
+
+
+def init_assets(app: Flask) -> None:
+    """
+    Register the `asset_url` template helper and the fingerprint-aware static view.
+
+    :param app: Flask application instance
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions["assets"] = manifest
+    default_static = app.view_functions["static"]
+
+    @app.template_global()
+    def asset_url(filename: str) -> str:
+        """
+        Return the URL of a static asset, fingerprinted if it was built.
+
+        :param filename: Asset path relative to the static folder
+        :return: URL of the fingerprinted file, or of the source file
+        """
+        return url_for("static", filename=manifest.get(filename, filename))
+
+    def static(filename: str) -> Response:
+        """
+        Serve a static file; fingerprinted files get precompression and immutable caching.
+
+        :param filename: Path relative to the static folder
+        :return: File response
+        """
+        if not filename.startswith(f"{DIST_DIR}/"):
+            return default_static(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = None
+        for encoding, suffix in ENCODINGS:
+            variant = os.path.join(app.static_folder, filename + suffix)
+            if encoding in request.accept_encodings and os.path.isfile(variant):
+                response = send_from_directory(
+                    app.static_folder,
+                    filename + suffix,
+                    mimetype=mimetype,
+                    max_age=IMMUTABLE_MAX_AGE,
+                )
+                response.headers["Content-Encoding"] = encoding
+                break
+        if response is None:
+            response = send_from_directory(
+                app.static_folder,
+                filename,
+                mimetype=mimetype,
+                max_age=IMMUTABLE_MAX_AGE,
+            )
+
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
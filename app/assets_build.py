@@ -0,0 +1,137 @@
+# File: app/assets_build.py
+"""
+Purpose:
+    Build step for static assets: fingerprint, recompress and precompress the
+    files referenced by the templates, and write the manifest used by `asset_url`.
+
+Features:
+    - Content-hash fingerprinting (`main.<hash>.js`) into `static/dist/`
+    - Downscales oversized images to their display size (2x) and re-optimizes them
+    - Writes gzip and brotli variants next to each compressible file
+    - Writes `static/dist/manifest.json` mapping source names to fingerprinted paths
+
+Usage:
+    python -m app.assets_build
+
+Required Modules:
+    - gzip, hashlib, io, json, os, shutil: file processing
+    - brotli: brotli compression
+    - PIL.Image: image recompression
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+
+import brotli
+from PIL import Image
+
+from app.assets import DIST_DIR, MANIFEST_NAME
+
+STATIC_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# Assets referenced by the templates through asset_url()
+ASSETS: list[str] = [
+    "main.js",
+    "style.css",
+    "assets/logo.png",
+    "assets/favicon.ico",
+]
+
+# Oversized images: maximum height in px (twice the rendered height for HiDPI)
+IMAGE_MAX_HEIGHT: dict[str, int] = {
+    "assets/logo.png": 240,
+}
+
+# File types worth precompressing (images are already compressed)
+COMPRESSIBLE: set[str] = {".js", ".css", ".svg", ".ico", ".json", ".txt"}
+
+
+def recompress_image(data: bytes, max_height: int) -> bytes:
+    """
+    Downscale an image to `max_height` and re-encode it with maximum compression.
+
+    PNGs are additionally reduced to a 256-colour palette.
+
+    :param data: Original image bytes
+    :param max_height: Maximum height in pixels
+    :return: Re-encoded image bytes (the original if that is smaller)
+    """
+    image = Image.open(io.BytesIO(data))
+    fmt = image.format
+    if image.height > max_height:
+        width = round(image.width * max_height / image.height)
+        image = image.resize((width, max_height), Image.LANCZOS)
+
+    # A 256-colour palette is visually lossless for logos and icons
+    if fmt == "PNG":
+        image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+
+    out = io.BytesIO()
+    image.save(out, format=fmt, optimize=True)
+    return min(out.getvalue(), data, key=len)
+
+
+def write_compressed_variants(path: str, data: bytes) -> None:
+    """
+    Write `.gz` and `.br` variants of a file when they are smaller than the original.
+
+    :param path: Path of the uncompressed file
+    :param data: File contents
+    """
+    variants = {
+        ".gz": gzip.compress(data, compresslevel=9, mtime=0),
+        ".br": brotli.compress(data, quality=11),
+    }
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+def build_assets(static_dir: str = STATIC_DIR) -> dict[str, str]:
+    """
+    Rebuild `static/dist/` and its manifest from the source assets.
+
+    :param static_dir: Static folder containing the source assets
+    :return: Manifest mapping source names to fingerprinted paths
+    :raises OSError: if a source asset cannot be read or the output written
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+
+    manifest: dict[str, str] = {}
+    for name in ASSETS:
+        with open(os.path.join(static_dir, name), "rb") as f:
+            data = f.read()
+        original_size = len(data)
+        if name in IMAGE_MAX_HEIGHT:
+            data = recompress_image(data, IMAGE_MAX_HEIGHT[name])
+
+        root, ext = os.path.splitext(name)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = f"{DIST_DIR}/{root}.{digest}{ext}"
+        target = os.path.join(static_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+        if ext in COMPRESSIBLE:
+            write_compressed_variants(target, data)
+
+        manifest[name] = hashed
+        print(f"{name} -> {hashed} ({original_size} -> {len(data)} bytes)")
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    build_assets()
+    print("[OK] Assets built.")
@@ -0,0 +1,458 @@
+# File: app/blueprints/api.py
+"""
+Purpose:
+    Versioned JSON API over DataManager for clients that need shelf data
+    without rendering HTML pages.
+
+Features:
+    - List, get, create, rename and delete users
+    - List, get, add, update and delete movies on a user's shelf
+    - Cursor (keyset) pagination: ?limit=&cursor=, next cursor in the response
+    - Sparse fieldsets: ?fields=name,year (the id is always included)
+    - Fast JSON encoding with orjson when installed, compact stdlib json otherwise
+    - ETag / If-None-Match on shelf resources driven by the user's shelf version
+      and the page/fieldset requested, answered with 304 before any movie rows
+      are loaded
+    - JSON error bodies for every HTTP error raised inside the blueprint
+
+Exceptions:
+    - HTTPException: rendered as {"error": ...} with the matching status code
+    - SQLAlchemyError: logged and answered with HTTP 500
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Blueprint, Response, abort, request, url_for
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import HTTPException
+
+from app import limiter
+from app.models import Movie, User, db
+from app.services.data_manager import DataManager
+from app.utils import build_movie_from_omdb, fetch_omdb_data, omdb_data_from_entry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+api_bp = Blueprint("api", __name__)
+data_manager = DataManager(db)
+
+# Serializable fields per resource; "id" is always returned
+USER_FIELDS: Tuple[str, ...] = ("id", "name", "shelf_version")
+MOVIE_FIELDS: Tuple[str, ...] = (
+    "id",
+    "name",
+    "director",
+    "year",
+    "poster_url",
+    "plot",
+    "imdb_id",
+)
+
+DEFAULT_PAGE_SIZE: int = 50
+MAX_PAGE_SIZE: int = 200
+
+
+def _dumps(payload: Any) -> bytes:
+    """
+    Encode a payload as compact UTF-8 JSON.
+
+    :param payload: JSON-serializable object
+    :return: Encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _json(payload: Any, status: int = 200, etag: Optional[str] = None) -> Response:
+    """
+    Build a JSON response, optionally tagged with a strong ETag.
+
+    :param payload: JSON-serializable object
+    :param status: HTTP status code
+    :param etag: ETag value (unquoted)
+    :return: Response with application/json body
+    """
+    response = Response(_dumps(payload), status=status, mimetype="application/json")
+    if etag is not None:
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response
+
+
+def _not_modified(etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the client already holds this ETag.
+
+    :param etag: Current ETag value (unquoted)
+    :return: 304 response, or None if the client's copy is stale
+    """
+    # Weak comparison (RFC 7232): compressed responses carry W/ tags
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _shelf_etag(user_id: int, version: int, scope: str, *variant: Any) -> str:
+    """
+    Return the ETag of a shelf resource at a given shelf version.
+
+    :param user_id: ID of the user
+    :param version: Shelf version of the user
+    :param scope: Resource name, e.g. "shelf" or "movie-7"
+    :param variant: Parsed query arguments that change the body (page, fields)
+    :return: ETag value (unquoted)
+    """
+    etag = f"{scope}-{user_id}-v{version}"
+    if variant:
+        key = "|".join(str(part) for part in variant).encode()
+        etag += "-" + hashlib.blake2s(key, digest_size=6).hexdigest()
+    return etag
+
+
+def _fields(allowed: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Parse the sparse fieldset from ?fields=.
+
+    :param allowed: Fields the resource supports
+    :return: Requested fields (all if not given), always including "id"
+    """
+    raw = request.args.get("fields")
+    if not raw:
+        return allowed
+    requested = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    return ("id",) + tuple(f for f in requested if f != "id")
+
+
+def _page_args() -> Tuple[int, int]:
+    """
+    Parse ?limit= and the opaque ?cursor= of a paginated listing.
+
+    :return: Tuple of (after_id, limit)
+    """
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    cursor = request.args.get("cursor")
+    if not cursor:
+        return 0, limit
+    try:
+        after_id = int(base64.urlsafe_b64decode(cursor.encode() + b"==").decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400, description="Invalid cursor")
+    return after_id, limit
+
+
+def _encode_cursor(last_id: int) -> str:
+    """Return the opaque cursor pointing after the given id."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def _serialize(obj: Any, fields: Iterable[str]) -> Dict[str, Any]:
+    """Return the selected attributes of a model instance as a dict."""
+    return {field: getattr(obj, field) for field in fields}
+
+
+def _page(items: List[Any], limit: int, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Serialize one page of a keyset-paginated listing.
+
+    :param items: Items of this page, ordered by id
+    :param limit: Requested page size
+    :param fields: Fields to serialize
+    :return: Dict with data and next_cursor (None on the last page)
+    """
+    next_cursor = _encode_cursor(items[-1].id) if len(items) == limit else None
+    return {
+        "data": [_serialize(item, fields) for item in items],
+        "next_cursor": next_cursor,
+    }
+
+
+def _body() -> Dict[str, Any]:
+    """
+    Return the JSON request body.
+
+    :return: Parsed JSON object
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        abort(400, description="Request body must be a JSON object")
+    return payload
+
+
+def _year(value: Any) -> Optional[int]:
+    """Parse a year from JSON input; None if missing or invalid."""
+    try:
+        return int(str(value)[:4])
+    except (ValueError, TypeError):
+        return None
+
+
+@api_bp.errorhandler(HTTPException)
+def handle_http_error(e: HTTPException) -> Response:
+    """Render HTTP errors of the API as JSON (keeping e.g. Retry-After)."""
+    response = _json({"error": e.description}, e.code or 500)
+    for name, value in e.get_headers():
+        if name != "Content-Type":
+            response.headers[name] = value
+    return response
+
+
+# The app registers HTML handlers for these codes, which would otherwise take
+# precedence over the generic HTTPException handler above
+for _code in (403, 404, 500):
+    api_bp.register_error_handler(_code, handle_http_error)
+
+
+@api_bp.errorhandler(SQLAlchemyError)
+def handle_database_error(e: SQLAlchemyError) -> Response:
+    """Log database errors and answer with a JSON 500."""
+    logger.exception("Database error in API request")
+    db.session.rollback()
+    return _json({"error": "Database error"}, 500)
+
+
+# ---------------------------------------------------------------------------
+# Users
+# ---------------------------------------------------------------------------
+
+
+@api_bp.route("/users", methods=["GET"])
+def list_users() -> Response:
+    """
+    List users ordered by id.
+
+    :return: JSON page of users; supports ?limit=, ?cursor= and ?fields=
+    """
+    fields = _fields(USER_FIELDS)
+    after_id, limit = _page_args()
+    response = _json(_page(data_manager.page_users(after_id, limit), limit, fields))
+    # No single version covers all users; tag the body instead
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api_bp.route("/users", methods=["POST"])
+def create_user() -> Response:
+    """
+    Create a user from {"name": ...}.
+
+    :return: JSON of the created user with HTTP 201
+    """
+    name = str(_body().get("name", "")).strip()
+    if not name:
+        abort(400, description="name is required")
+    user = data_manager.create_user(name)
+    response = _json(_serialize(user, USER_FIELDS), 201)
+    response.headers["Location"] = url_for("api.get_user", user_id=user.id)
+    return response
+
+
+@api_bp.route("/users/<int:user_id>", methods=["GET"])
+def get_user(user_id: int) -> Response:
+    """
+    Return a single user.
+
+    :param user_id: ID of the user
+    :return: JSON of the user, or 304 if the client's ETag is current
+    """
+    fields = _fields(USER_FIELDS)
+    version = data_manager.shelf_version(user_id)
+    if version is None:
+        abort(404, description="User not found")
+    etag = _shelf_etag(user_id, version, "user", ",".join(fields))
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    user = User.query.get_or_404(user_id)
+    return _json(_serialize(user, fields), etag=etag)
+
+
+@api_bp.route("/users/<int:user_id>", methods=["PATCH"])
+def update_user(user_id: int) -> Response:
+    """
+    Rename a user from {"name": ...}.
+
+    :param user_id: ID of the user
+    :return: JSON of the updated user
+    """
+    user = User.query.get_or_404(user_id)
+    name = str(_body().get("name", "")).strip()
+    if not name:
+        abort(400, description="name is required")
+    user = data_manager.update_user(user, name)
+    return _json(_serialize(user, USER_FIELDS))
+
+
+@api_bp.route("/users/<int:user_id>", methods=["DELETE"])
+def delete_user(user_id: int) -> Response:
+    """
+    Delete a user and their shelf.
+
+    :param user_id: ID of the user
+    :return: Empty response with HTTP 204
+    """
+    User.query.get_or_404(user_id)
+    data_manager.delete_user(user_id)
+    return Response(status=204)
+
+
+# ---------------------------------------------------------------------------
+# Movies
+# ---------------------------------------------------------------------------
+
+
+@api_bp.route("/users/<int:user_id>/movies", methods=["GET"])
+def list_movies(user_id: int) -> Response:
+    """
+    List the movies on a user's shelf ordered by id.
+
+    The ETag is the user's shelf version plus the requested page and fields,
+    so an unchanged page is answered with 304 after a single primary-key lookup.
+
+    :param user_id: ID of the user
+    :return: JSON page of movies; supports ?limit=, ?cursor= and ?fields=
+    """
+    fields = _fields(MOVIE_FIELDS)
+    after_id, limit = _page_args()
+
+    version = data_manager.shelf_version(user_id)
+    if version is None:
+        abort(404, description="User not found")
+    etag = _shelf_etag(user_id, version, "shelf", after_id, limit, ",".join(fields))
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    movies = data_manager.page_movies(user_id, after_id, limit)
+    return _json(_page(movies, limit, fields), etag=etag)
+
+
+@api_bp.route("/users/<int:user_id>/movies", methods=["POST"])
+@limiter.limit("10/minute")
+def add_movie(user_id: int) -> Response:
+    """
+    Add a movie to a user's shelf.
+
+    With only {"title": ...} the details come from the shared catalogue or
+    OMDb; with name/director/year (and optionally poster_url, plot, imdb_id)
+    the given details are used as-is.
+
+    :param user_id: ID of the user
+    :return: JSON of the added movie with HTTP 201; 409 if already on the shelf
+    """
+    User.query.get_or_404(user_id)
+    payload = _body()
+
+    if payload.get("name"):
+        name = str(payload["name"]).strip()
+        movie = Movie(
+            name=name,
+            director=str(payload.get("director") or "Unknown").strip(),
+            year=_year(payload.get("year")) or 0,
+            poster_url=payload.get("poster_url") or None,
+            plot=payload.get("plot") or None,
+            imdb_id=payload.get("imdb_id") or None,
+            user_id=user_id,
+        )
+    else:
+        title = str(payload.get("title", "")).strip()
+        if not title:
+            abort(400, description="title or name is required")
+        entry = data_manager.find_catalog_entry(title)
+        if entry is not None and entry.imdb_id:
+            data = omdb_data_from_entry(entry)
+        else:
+            data = fetch_omdb_data(title)
+        if not data.get("Title"):
+            abort(404, description=f'No movie found for "{title}"')
+        movie = build_movie_from_omdb(data, user_id)
+
+    if data_manager.find_movie(user_id, movie.name):
+        abort(409, description=f'"{movie.name}" is already on this shelf')
+
+    movie = data_manager.add_movie(movie)
+    response = _json(_serialize(movie, MOVIE_FIELDS), 201)
+    response.headers["Location"] = url_for(
+        "api.get_movie", user_id=user_id, movie_id=movie.id
+    )
+    return response
+
+
+@api_bp.route("/users/<int:user_id>/movies/<int:movie_id>", methods=["GET"])
+def get_movie(user_id: int, movie_id: int) -> Response:
+    """
+    Return a single movie of a user's shelf.
+
+    :param user_id: ID of the user
+    :param movie_id: ID of the movie
+    :return: JSON of the movie, or 304 if the client's ETag is current
+    """
+    fields = _fields(MOVIE_FIELDS)
+    version = data_manager.shelf_version(user_id)
+    if version is None:
+        abort(404, description="User not found")
+    etag = _shelf_etag(user_id, version, f"movie-{movie_id}", ",".join(fields))
+    cached = _not_modified(etag)
+    if cached is not None:
+        return cached
+
+    movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
+    return _json(_serialize(movie, fields), etag=etag)
+
+
+@api_bp.route("/users/<int:user_id>/movies/<int:movie_id>", methods=["PATCH"])
+def update_movie(user_id: int, movie_id: int) -> Response:
+    """
+    Update name, director and/or year of a movie.
+
+    :param user_id: ID of the user
+    :param movie_id: ID of the movie
+    :return: JSON of the updated movie; 409 if the new title is already on the shelf
+    """
+    movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
+    payload = _body()
+    name = str(payload.get("name") or movie.name).strip()
+    director = str(payload.get("director") or movie.director).strip()
+    year = _year(payload.get("year"))
+
+    try:
+        movie = data_manager.update_movie(movie, name, director, year)
+    except ValueError as e:
+        abort(409, description=str(e))
+    return _json(_serialize(movie, MOVIE_FIELDS))
+
+
+@api_bp.route("/users/<int:user_id>/movies/<int:movie_id>", methods=["DELETE"])
+def delete_movie(user_id: int, movie_id: int) -> Response:
+    """
+    Remove a movie from a user's shelf.
+
+    :param user_id: ID of the user
+    :param movie_id: ID of the movie
+    :return: Empty response with HTTP 204
+    """
+    Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
+    data_manager.delete_movie(movie_id)
+    return Response(status=204)
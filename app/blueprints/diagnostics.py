@@ -0,0 +1,135 @@
+# File: app/blueprints/diagnostics.py
+"""
+Purpose:
+    Expose the memory diagnostics of the answering worker process. Registered
+    only when DIAGNOSTICS_ENABLED is set (off by default in production).
+
+Features:
+    - Access limited to direct loopback clients (no forwarding headers) and
+      requests with `Authorization: Bearer <DIAGNOSTICS_TOKEN>`
+    - POST /snapshots: take a tracemalloc snapshot, GET /snapshots: list them
+    - GET /snapshots/<id>: largest allocation sites of one snapshot
+    - GET /snapshots/<older>/diff/<newer>: allocation sites that grew the most
+    - GET /heap: live User/Movie/CatalogEntry instances, sessions and caches
+    - Optional `group_by` (lineno, filename, traceback) and `limit` arguments
+
+Exceptions:
+    - Forbidden: for clients that are neither local nor hold the token
+    - NotFound: for unknown or dropped snapshot ids
+    - BadRequest: for an unknown `group_by`
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import hmac
+import ipaddress
+
+from flask import Blueprint, abort, current_app, jsonify, request
+
+from app.diagnostics import diff_allocations, heap_summary, snapshots, top_allocations
+
+diagnostics_bp = Blueprint("diagnostics", __name__)
+
+# Grouping keys accepted by tracemalloc statistics
+GROUP_BY = ("lineno", "filename", "traceback")
+
+# Headers set by proxies; a loopback peer sending them relays a remote client
+FORWARDING_HEADERS = ("Forwarded", "X-Forwarded-For", "X-Real-IP")
+
+
+@diagnostics_bp.before_request
+def _restrict_access() -> None:
+    """
+    Admit holders of DIAGNOSTICS_TOKEN and direct loopback clients only.
+
+    Checked before any endpoint runs, so a refused request takes no snapshot.
+
+    :raises Forbidden: for any other client
+    """
+    token = current_app.config.get("DIAGNOSTICS_TOKEN")
+    if token:
+        supplied = request.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return
+    if _is_loopback(request.remote_addr) and not any(
+        header in request.headers for header in FORWARDING_HEADERS
+    ):
+        return
+    abort(403)
+
+
+def _is_loopback(address: str) -> bool:
+    """Return whether a peer address is a loopback address."""
+    try:
+        return ipaddress.ip_address(address or "").is_loopback
+    except ValueError:
+        return False
+
+
+def _stat_args() -> tuple:
+    """
+    Read the grouping and size of a statistics listing from the query string.
+
+    :return: Tuple of (group_by, limit)
+    :raises BadRequest: if group_by is not a tracemalloc grouping key
+    """
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in GROUP_BY:
+        abort(400, description=f"group_by must be one of {', '.join(GROUP_BY)}")
+    limit = max(1, min(request.args.get("limit", 20, type=int), 200))
+    return group_by, limit
+
+
+@diagnostics_bp.route("/snapshots", methods=["GET", "POST"])
+def snapshot_list():
+    """
+    Take a snapshot (POST) or list the snapshots kept by this worker (GET).
+
+    :return: JSON snapshot summary (201) or list of summaries
+    """
+    if request.method == "POST":
+        return jsonify(snapshots.take()), 201
+    return jsonify(snapshots=snapshots.list())
+
+
+@diagnostics_bp.route("/snapshots/<int:snapshot_id>")
+def snapshot_top(snapshot_id: int):
+    """
+    Return the largest allocation sites of a snapshot.
+
+    :param snapshot_id: Snapshot id
+    :return: JSON list of statistics; 404 if the snapshot is unknown
+    """
+    group_by, limit = _stat_args()
+    try:
+        stats = top_allocations(snapshot_id, group_by, limit)
+    except KeyError:
+        abort(404)
+    return jsonify(snapshot=snapshot_id, group_by=group_by, top=stats)
+
+
+@diagnostics_bp.route("/snapshots/<int:older_id>/diff/<int:newer_id>")
+def snapshot_diff(older_id: int, newer_id: int):
+    """
+    Return the allocation sites that changed most between two snapshots.
+
+    :param older_id: Earlier snapshot id
+    :param newer_id: Later snapshot id
+    :return: JSON list of differences; 404 if a snapshot is unknown
+    """
+    group_by, limit = _stat_args()
+    try:
+        stats = diff_allocations(older_id, newer_id, group_by, limit)
+    except KeyError:
+        abort(404)
+    return jsonify(older=older_id, newer=newer_id, group_by=group_by, top=stats)
+
+
+@diagnostics_bp.route("/heap")
+def heap():
+    """
+    Summarize live ORM instances, sessions and caches of this worker.
+
+    :return: JSON heap summary
+    """
+    return jsonify(heap_summary())
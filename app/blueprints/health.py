@@ -0,0 +1,103 @@
+# File: app/blueprints/health.py
+"""
+Purpose:
+    Expose database health and connection pool statistics for monitoring.
+
+Features:
+    - Run a trivial query to verify the database is reachable
+    - Report the live pool state (size, checked out, overflow)
+    - Report checkout wait statistics recorded since worker start
+    - Report user and movie counts per shard (fan-out over all shards)
+    - Readiness for load balancers: 503 until the process finished warm-up
+
+Exceptions:
+    - SQLAlchemyError: reported as HTTP 503 instead of raised
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+import os
+import time
+
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extentions import db
+from app.services.data_manager import DataManager
+from app.pool import pool_stats, pool_status
+from app.services.warmup import warmup
+
+logger = logging.getLogger(__name__)
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/db")
+def database():
+    """
+    Check the database connection and return pool statistics as JSON.
+
+    :return: JSON body with status, ping time, pool state and wait statistics;
+        HTTP 503 if the database cannot be reached
+    """
+    started = time.perf_counter()
+    try:
+        db.session.execute(text("SELECT 1"))
+        status, code = "ok", 200
+    except SQLAlchemyError:
+        logger.exception("Database health check failed")
+        db.session.rollback()
+        status, code = "unavailable", 503
+
+    return (
+        jsonify(
+            status=status,
+            pid=os.getpid(),
+            ping_ms=(time.perf_counter() - started) * 1000,
+            pool=pool_status(db.engine),
+            stats=pool_stats.snapshot(),
+        ),
+        code,
+    )
+
+
+@health_bp.route("/shards")
+def shards():
+    """
+    Report how users and shelved movies are spread over the shards.
+
+    :return: JSON body with status, shard count and per-shard counts;
+        HTTP 503 if a shard cannot be queried
+    """
+    try:
+        counts = DataManager(db).shard_stats()
+    except SQLAlchemyError:
+        logger.exception("Shard statistics failed")
+        db.session.rollback()
+        return jsonify(status="unavailable"), 503
+
+    return jsonify(
+        status="ok",
+        shard_count=current_app.config["SHARD_COUNT"],
+        shards=counts,
+    )
+
+
+@health_bp.route("/ready")
+def ready():
+    """
+    Tell the load balancer whether this process is warm.
+
+    :return: JSON body with readiness and warm-up stage results;
+        HTTP 503 with Retry-After while warm-up has not finished
+    """
+    status = warmup.status()
+    if not status["ready"]:
+        return (
+            jsonify(status="warming", pid=os.getpid(), **status),
+            503,
+            {"Retry-After": "5"},
+        )
+    return jsonify(status="ready", pid=os.getpid(), **status)
@@ -6,8 +6,11 @@ Purpose:
 Features:
     - Fetch all users from the database
     - Default to the first user if none is selected
-    - Retrieve movies for the selected user
+    - Retrieve movies for the selected user (served from the read engine)
     - Render the index.html template with context
+    - Offer an Undo button after a deletion (restore URL passed by the users blueprint)
+    - Stream large shelves: header first, then movie cards from a batched cursor
+    - Pass the latest change event id so the live-update feed starts where the page ends
 
 Exceptions:
     - SQLAlchemyError: raised when database operations fail
@@ -18,13 +21,15 @@ Date: 2025-07-18
 
 """
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 
-from flask import Blueprint, render_template, request, abort
+from flask import Blueprint, Response, abort, current_app, render_template, request
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.models import db
+from app.services.change_feed import change_feed
 from app.services.data_manager import DataManager
+from app.streaming import stream_page
 
 logger = logging.getLogger(__name__)
 
@@ -32,11 +37,15 @@ home_bp = Blueprint("home", __name__)
 
 
 @home_bp.route("/")
-def home() -> str:
+def home() -> Union[str, Response]:
     """
     Render the home view displaying users and their movies.
 
-    :return: Rendered HTML for the home page
+    Shelves with at least STREAM_MIN_MOVIES movies are streamed: the header
+    and user picker are sent right away and movie cards follow batch by batch
+    from a yield_per cursor, so memory stays bounded by the batch size.
+
+    :return: Rendered (or streamed) HTML for the home page
     :raises SQLAlchemyError: when database queries fail
     :raises Exception: on unexpected errors
     """
@@ -44,6 +53,10 @@ def home() -> str:
         # Parse query parameters
         user_id: Optional[int] = request.args.get("user_id", type=int)
         message: Optional[str] = request.args.get("message")
+        undo: Optional[str] = request.args.get("undo")
+        # Only restore URLs of this app may become the Undo button
+        if undo and not (undo.startswith("/users/") and undo.endswith("/restore")):
+            undo = None
 
         # Retrieve all users
         users: List = DataManager(db).get_users()
@@ -53,16 +66,29 @@ def home() -> str:
             user_id = users[0].id  # type: ignore
 
         selected_user = next((u for u in users if u.id == user_id), None)
-        movies = selected_user.movies.all() if selected_user else []
+        data_manager = DataManager(db)
+        movie_count = data_manager.count_movies(user_id) if selected_user else 0
 
-        return render_template(
-            "index.html",
+        context = dict(
             users=users,
             selected_user=selected_user,
             selected_user_id=user_id,
-            movies=movies,
+            movie_count=movie_count,
+            feed_after=change_feed.latest_id() if movie_count else 0,
             message=message,
+            undo=undo,
         )
+        if selected_user and movie_count >= current_app.config["STREAM_MIN_MOVIES"]:
+            return stream_page(
+                "index.html",
+                movies=data_manager.iter_movie_cards(
+                    user_id, current_app.config["STREAM_BATCH_SIZE"]
+                ),
+                **context,
+            )
+
+        movies = data_manager.get_movies(user_id) if selected_user else []
+        return render_template("index.html", movies=movies, **context)
     except SQLAlchemyError:
         logger.exception("Database error during home rendering")
         abort(500)
@@ -5,9 +5,16 @@ Purpose:
     handling for HTTP and application-specific errors.
 
 Features:
-    - User creation and deletion
-    - Searching and adding movies via OMDB API
+    - User creation and deletion, with undo while the deleted rows are kept
+    - Searching and adding movies via the shared catalogue or OMDB API
+    - Batch-adding a pasted list of titles with concurrent lookups
+    - Type-ahead title suggestions for the add-movie search
     - Editing and updating movie details
+    - Idempotency keys on every change: retried or double submissions get the
+      first response replayed (see app.idempotency)
+    - Suggesting movies from similar users' shelves
+    - Live shelf updates as server-sent events; background (fetch) submissions
+      get JSON instead of a redirect, the page is patched from the feed
     - Blueprint-specific HTTP error handlers for 404 and 500
 
 Exceptions:
@@ -19,21 +26,57 @@ Exceptions:
 Author: Martin Haferanke
 Date: 2025-07-18
 """
+import json
 import logging
 from datetime import datetime
-
-from flask import Blueprint, render_template, request, redirect, url_for, abort
-from sqlalchemy.exc import SQLAlchemyError
+from typing import Optional
+
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    abort,
+    jsonify,
+    current_app,
+    Response,
+    stream_with_context,
+)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app import limiter
+from app.compression import fragment_etag
+from app.events import INCLUDE_DELETED
+from app.idempotency import idempotency
+from app.services.batch_add import parse_titles, resolve_titles
+from app.services.change_feed import change_feed
 from app.services.data_manager import DataManager
+from app.services.recommender import recommender
+from app.services.title_index import title_index
 from app.models import User, Movie, db
-from app.utils import fetch_omdb_data
+from app.utils import build_movie_from_omdb, fetch_omdb_data, omdb_data_from_entry
 
 users_bp = Blueprint("users", __name__, url_prefix="/users")
+idempotency.protect(users_bp)
 data_manager = DataManager(db)
 
 
+def _finish(user_id: int, message: str, undo: Optional[str] = None):
+    """
+    Answer a shelf change: JSON for background (fetch) submissions, whose page
+    is patched by the live-update feed, a redirect home for plain form posts.
+
+    :param user_id: ID of the user whose shelf changed
+    :param message: Status message for the user
+    :param undo: URL that reverts the change (shown as an Undo button)
+    :return: JSON response or redirect
+    """
+    if request.headers.get("X-Requested-With") == "fetch":
+        return jsonify(message=message, undo=undo)
+    return redirect(url_for("home.home", user_id=user_id, message=message, undo=undo))
+
+
 @users_bp.route("/add", methods=["GET", "POST"])
 def add_user():
     """
@@ -70,17 +113,36 @@ def delete_user(user_id: int):
     user = User.query.get_or_404(user_id)
     data_manager.delete_user(user_id)
     message = f'User "{user.name}" deleted.'
+    undo = url_for("users.restore_user", user_id=user_id)
+
+    return redirect(url_for("home.home", message=message, undo=undo))
+
+
+@users_bp.route("/<int:user_id>/restore", methods=["POST"])
+def restore_user(user_id: int):
+    """
+    Restore a deleted user and their shelf within the undo window.
+
+    :param user_id: ID of the deleted user
+    :return: Redirect URL to the user's shelf with a status message
+    :raises SQLAlchemyError: if restoring fails
+    """
+    user = data_manager.restore_user(user_id)
+    if user is None:
+        message = "The user can no longer be restored."
+        return redirect(url_for("home.home", message=message))
+    message = f'User "{user.name}" restored.'
 
-    return redirect(url_for("home.home", message=message))
+    return redirect(url_for("home.home", user_id=user_id, message=message))
 
 
-@limiter.limit("10/minute")
 @users_bp.route("/<int:user_id>/movies", methods=["GET", "POST"])
+@limiter.limit("10/minute", methods=["POST"])
 def user_movies(user_id: int):
     """
-    View and manage movies for a user (Rate-limited).
-    This endpoint is limited to 10 requests per minute
-    per user to prevent abuse.
+    View and manage movies for a user (Rate-limited on POST).
+    Adding is limited to 10 requests per minute
+    per client address to prevent abuse.
 
     GET with modal parameter: search or add movie form.
     POST: add movie to user's favourites.
@@ -96,7 +158,12 @@ def user_movies(user_id: int):
         data: dict = {}
 
         if title:
-            data = fetch_omdb_data(title)
+            # Films already fetched from OMDb are served from the shared catalogue
+            entry = data_manager.find_catalog_entry(title)
+            if entry is not None and entry.imdb_id:
+                data = omdb_data_from_entry(entry)
+            else:
+                data = fetch_omdb_data(title)
 
         # Flag, if the search already performed
         search_performed: bool = bool(title)
@@ -104,7 +171,7 @@ def user_movies(user_id: int):
         # Check if the movie is already in the favourites
         already_added: bool = False
         if data.get("Title"):
-            exists = Movie.query.filter_by(user_id=user_id, name=data["Title"]).first()
+            exists = data_manager.find_movie(user_id, data["Title"])
             already_added = bool(exists)
 
         return render_template(
@@ -122,6 +189,8 @@ def user_movies(user_id: int):
         director: str = request.form.get("director", "Unknown").strip()
         year_raw: str = request.form.get("year", "")
         poster: str = request.form.get("poster", "")
+        plot: str = request.form.get("plot", "").strip()
+        imdb_id: str = request.form.get("imdb_id", "").strip()
 
         try:
             try:
@@ -129,7 +198,7 @@ def user_movies(user_id: int):
             except (ValueError, TypeError):
                 year = None
 
-            if Movie.query.filter_by(user_id=user_id, name=title).first():
+            if data_manager.find_movie(user_id, title):
                 msg = f'"{title}" is already in your favourites.'
             else:
                 movie = Movie(
@@ -137,10 +206,15 @@ def user_movies(user_id: int):
                     director=director,
                     year=year or 0,
                     poster_url=poster or None,
+                    plot=plot or None,
+                    imdb_id=imdb_id or None,
                     user_id=user_id,
                 )
                 data_manager.add_movie(movie)
                 msg = f'"{movie.name}" has been added to favourites.'
+        except IntegrityError:
+            # A concurrent submission shelved the film between check and insert
+            msg = f'"{title}" is already in your favourites.'
         except SQLAlchemyError:
             logging.exception("Database error adding movie")
             abort(500)
@@ -148,12 +222,95 @@ def user_movies(user_id: int):
             logging.exception("Unexpected error adding movie")
             abort(500)
 
-        return redirect(url_for("home.home", user_id=user_id, message=msg))
+        return _finish(user_id, msg)
 
     # Fallback
     return redirect(url_for("home.home", user_id=user_id))
 
 
+@users_bp.route("/<int:user_id>/movies/batch", methods=["GET", "POST"])
+@limiter.limit("5/minute", methods=["POST"])
+def batch_add_movies(user_id: int) -> str:
+    """
+    Add a pasted list of titles to a user's favourites (Rate-limited on POST).
+
+    GET: render the batch-add form fragment.
+    POST: look the titles up concurrently (bounded by BATCH_ADD_WORKERS and
+    BATCH_ADD_DEADLINE_SECONDS), insert every found movie in one transaction
+    and render a per-title status list.
+
+    :param user_id: ID of the user
+    :return: HTML fragment for modal body
+    :raises SQLAlchemyError: if the batch insert fails
+    """
+    user = User.query.get_or_404(user_id)
+    limit: int = current_app.config["BATCH_ADD_MAX_TITLES"]
+
+    if request.method == "GET":
+        return render_template("movies/batch_add.html", user=user, limit=limit)
+
+    raw: str = request.form.get("titles", "")
+    titles = parse_titles(raw, limit + 1)
+    truncated = len(titles) > limit
+    titles = titles[:limit]
+    results = resolve_titles(
+        titles,
+        user_id,
+        current_app.config["BATCH_ADD_WORKERS"],
+        current_app.config["BATCH_ADD_DEADLINE_SECONDS"],
+    )
+
+    found = [r for r in results if r["status"] == "found"]
+    for result in found:
+        result["movie"] = build_movie_from_omdb(result["data"], user_id)
+
+    try:
+        added, _ = data_manager.add_movies(user_id, [r["movie"] for r in found])
+    except SQLAlchemyError:
+        logging.exception("Database error batch-adding movies")
+        abort(500)
+
+    added_ids = {id(movie) for movie in added}
+    for result in found:
+        result["status"] = "added" if id(result["movie"]) in added_ids else "duplicate"
+
+    return render_template(
+        "movies/batch_add.html",
+        user=user,
+        limit=limit,
+        results=results,
+        added_count=len(added),
+        truncated=truncated,
+    )
+
+
+@users_bp.route("/<int:user_id>/movies/suggest", methods=["GET"])
+@limiter.limit("60/minute")
+def suggest_movies(user_id: int):
+    """
+    Return type-ahead title suggestions for the add-movie search as JSON
+    (Rate-limited).
+
+    Served from the local title index; OMDb is only queried for prefixes
+    without any local match.
+
+    :param user_id: ID of the user
+    :return: JSON list of {Title, Year, imdbID}
+    """
+    User.query.get_or_404(user_id)
+    prefix: str = request.args.get("q", "").strip()
+    try:
+        suggestions = title_index.suggest(prefix)
+    except SQLAlchemyError:
+        logging.exception("Database error loading title suggestions")
+        suggestions = []
+
+    response = jsonify(suggestions)
+    response.cache_control.private = True
+    response.cache_control.max_age = 300
+    return response
+
+
 @users_bp.route("/<int:user_id>/movies/<int:movie_id>/delete", methods=["POST"])
 def delete_movie(user_id: int, movie_id: int):
     """
@@ -161,15 +318,39 @@ def delete_movie(user_id: int, movie_id: int):
 
     :param user_id: ID of the user
     :param movie_id: ID of the movie to delete
-    :return: Redirect URL to home with a status message
+    :return: Redirect URL to home with a status message (JSON for fetch requests)
     :raises SQLAlchemyError: if deletion fails
     """
     User.query.get_or_404(user_id)
     movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
     data_manager.delete_movie(movie_id)
     message = f'"{movie.name}" successfully deleted.'
+    undo = url_for("users.restore_movie", user_id=user_id, movie_id=movie_id)
+
+    return _finish(user_id, message, undo)
 
-    return redirect(url_for("home.home", user_id=user_id, message=message))
+
+@users_bp.route("/<int:user_id>/movies/<int:movie_id>/restore", methods=["POST"])
+def restore_movie(user_id: int, movie_id: int):
+    """
+    Restore a deleted movie within the undo window.
+
+    :param user_id: ID of the user
+    :param movie_id: ID of the deleted movie
+    :return: Redirect URL to home with a status message (JSON for fetch requests)
+    :raises SQLAlchemyError: if restoring fails
+    """
+    User.query.get_or_404(user_id)
+    Movie.query.execution_options(**{INCLUDE_DELETED: True}).filter_by(
+        id=movie_id, user_id=user_id
+    ).first_or_404()
+    movie = data_manager.restore_movie(movie_id)
+    if movie is None:
+        message = "The movie can no longer be restored."
+    else:
+        message = f'"{movie.name}" restored.'
+
+    return _finish(user_id, message)
 
 
 @users_bp.route("/<int:user_id>/movies/<int:movie_id>/edit", methods=["GET"])
@@ -182,11 +363,24 @@ def edit_movie(user_id: int, movie_id: int) -> str:
     :return: HTML fragment for modal body
     """
     user = User.query.get_or_404(user_id)
-    movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
     current_year = datetime.now().year
-    return render_template(
-        "movies/edit.html", user=user, movie=movie, current_year=current_year
-    )
+    # Every change to the movie bumps the shelf version, so the tag can be
+    # checked before the movie is loaded and the form rendered
+    etag = fragment_etag("edit", user_id, movie_id, user.shelf_version, current_year)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
+        response = Response(
+            render_template(
+                "movies/edit.html", user=user, movie=movie, current_year=current_year
+            ),
+            mimetype="text/html",
+        )
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @users_bp.route("/<int:user_id>/movies/<int:movie_id>/update", methods=["POST"])
@@ -196,26 +390,98 @@ def update_movie(user_id: int, movie_id: int):
 
     :param user_id: ID of the user
     :param movie_id: ID of the movie to update
-    :return: Redirect URL to home with a status message
+    :return: Redirect URL to home with a status message (JSON for fetch requests)
     """
     User.query.get_or_404(user_id)
 
     movie = Movie.query.filter_by(id=movie_id, user_id=user_id).first_or_404()
-    movie.name = request.form.get("name", movie.name).strip()
-    movie.director = request.form.get("director", movie.director).strip()
+    name = request.form.get("name", movie.name).strip()
+    director = request.form.get("director", movie.director).strip()
 
     year_raw = request.form.get("year", "")
     try:
-        movie.year = int(year_raw[:4])
+        year = int(year_raw[:4])
     except (ValueError, TypeError):
         # leave movie.year unchanged on error
-        pass
+        year = None
 
     try:
-        updated = data_manager.update_movie(movie)
+        updated = data_manager.update_movie(movie, name, director, year)
         message = f'"{updated.name}" successfully updated.'
+    except ValueError as e:
+        message = str(e)
     except SQLAlchemyError:
         logging.exception("Error updating movie")
         abort(500)
 
-    return redirect(url_for("home.home", user_id=user_id, message=message))
+    return _finish(user_id, message)
+
+
+@users_bp.route("/<int:user_id>/recommendations", methods=["GET"])
+def recommendations(user_id: int) -> str:
+    """
+    Render the precomputed movie suggestions for a user as a modal fragment.
+
+    :param user_id: ID of the user
+    :return: HTML fragment for modal body
+    :raises SQLAlchemyError: if the recommender index cannot be refreshed
+    """
+    user = User.query.get_or_404(user_id)
+    try:
+        suggestions = recommender.suggestions(user_id)
+    except SQLAlchemyError:
+        logging.exception("Database error building recommendations")
+        abort(500)
+
+    return render_template(
+        "movies/recommendations.html", user=user, suggestions=suggestions
+    )
+
+
+def _render_event(event) -> dict:
+    """
+    Turn a shelf change event into the data sent to the browser.
+
+    :param event: Row of the shelf_events table
+    :return: Dict with the movie id and, unless it was removed, its card HTML
+    """
+    data = {"id": event.movie_id}
+    if event.payload:
+        movie = dict(json.loads(event.payload), id=event.movie_id)
+        data["html"] = render_template(
+            "movies/card.html", movie=movie, selected_user_id=event.user_id
+        )
+    return data
+
+
+@users_bp.route("/<int:user_id>/events", methods=["GET"])
+def shelf_events(user_id: int) -> Response:
+    """
+    Stream a user's shelf changes as server-sent events.
+
+    Resumes after the Last-Event-ID header (sent by EventSource when it
+    reconnects) or the `after` argument (the last event id when the page was
+    rendered). Answers 503 when this worker has no free stream slot; the page
+    then falls back to full reloads.
+
+    :param user_id: ID of the user
+    :return: text/event-stream response
+    """
+    User.query.get_or_404(user_id)
+    after = request.headers.get("Last-Event-ID", type=int) or request.args.get(
+        "after", 0, type=int
+    )
+    subscription = change_feed.subscribe(user_id)
+    if subscription is None:
+        abort(503)
+
+    # The stream must not hold a database connection while it waits for events
+    db.session.close()
+    response = Response(
+        stream_with_context(change_feed.stream(subscription, after, _render_event)),
+        mimetype="text/event-stream",
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(lambda: change_feed.unsubscribe(subscription))
+    return response
@@ -0,0 +1,286 @@
+# File: app/compression.py
+"""
+Purpose:
+    Cut the bytes sent for dynamic pages: compress responses on the fly and
+    let browsers revalidate idempotent HTML GETs instead of downloading them again.
+
+Features:
+    - CompressionMiddleware: WSGI layer negotiating brotli or gzip from
+      Accept-Encoding (q-values honoured, brotli preferred on a tie)
+    - Compresses chunk by chunk with a sync flush after each chunk, so streamed
+      pages (app.streaming) keep their flush points and nothing is buffered
+    - Skips bodies below COMPRESSION_MIN_SIZE (when the length is known),
+      already encoded responses (precompressed assets), event streams,
+      `Cache-Control: no-transform` and HEAD requests
+    - Adds `Vary: Accept-Encoding` to every compressible response, compressed
+      or not, and weakens strong ETags of compressed bodies
+    - Conditional GET for buffered HTML pages without cache headers:
+      body ETag, `Cache-Control: private, no-cache` and 304 on a match
+    - fragment_etag: ETag for fragments whose views can answer 304 before
+      rendering (e.g. the edit modal, keyed by shelf version and deploy)
+
+Required Modules:
+    - zlib: streaming gzip
+    - brotli: streaming brotli
+    - werkzeug: Accept-Encoding parsing and header handling
+    - flask: request hooks
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import os
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+import brotli
+from flask import Flask, Response, current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header, parse_options_header
+
+# Content-Encoding tokens in server preference order
+ENCODINGS: tuple = ("br", "gzip")
+
+# Non-text types worth compressing (text/* is, except event streams)
+COMPRESSIBLE_TYPES: frozenset = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+# Event streams are consumed message by message and must not be transformed
+NEVER_COMPRESS: frozenset = frozenset({"text/event-stream"})
+
+# Statuses without a body, or with a byte range of the unencoded body
+_SKIP_STATUSES: frozenset = frozenset({204, 206})
+
+
+class _GzipStream:
+    """Incremental gzip encoder."""
+
+    def __init__(self, level: int) -> None:
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress a chunk and flush it, so the client can decode it right away."""
+        return self._z.compress(chunk) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Return the end of the stream."""
+        return self._z.flush()
+
+
+class _BrotliStream:
+    """Incremental brotli encoder."""
+
+    def __init__(self, quality: int) -> None:
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress a chunk and flush it, so the client can decode it right away."""
+        return self._c.process(chunk) + self._c.flush()
+
+    def finish(self) -> bytes:
+        """Return the end of the stream."""
+        return self._c.finish()
+
+
+class _CompressedBody:
+    """
+    WSGI body that compresses the wrapped body while it is being sent.
+
+    `close()` is passed on, so call_on_close callbacks (change feed
+    unsubscribe, diagnostics) still run.
+    """
+
+    def __init__(self, body: Iterable[bytes], encoder) -> None:
+        self._body = body
+        self._encoder = encoder
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._body:
+            if chunk:
+                data = self._encoder.compress(chunk)
+                if data:
+                    yield data
+        yield self._encoder.finish()
+
+    def close(self) -> None:
+        close = getattr(self._body, "close", None)
+        if close is not None:
+            close()
+
+
+class CompressionMiddleware:
+    """
+    WSGI middleware compressing compressible responses with brotli or gzip.
+
+    Bodies without a Content-Length (streamed pages) are always compressed:
+    deciding on their size would mean holding back their first chunk.
+    """
+
+    def __init__(
+        self,
+        wsgi_app: Callable,
+        min_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        """
+        Wrap a WSGI application.
+
+        :param wsgi_app: The wrapped WSGI callable.
+        :param min_size: Smallest body (bytes) worth compressing.
+        :param gzip_level: zlib compression level (1-9).
+        :param brotli_quality: Brotli quality (0-11; dynamic content wants 4-5).
+        """
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def __call__(self, environ: dict, start_response: Callable) -> Iterable[bytes]:
+        encoding = self._negotiate(environ)
+        chosen: dict = {}
+
+        def compressing_start_response(status: str, headers: list, exc_info=None):
+            headers = Headers(headers)
+            chosen["encoding"] = self._prepare(environ, status, headers, encoding)
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+
+        body = self.wsgi_app(environ, compressing_start_response)
+        if chosen.get("encoding") is None:
+            return body
+        if chosen["encoding"] == "br":
+            return _CompressedBody(body, _BrotliStream(self.brotli_quality))
+        return _CompressedBody(body, _GzipStream(self.gzip_level))
+
+    @staticmethod
+    def _negotiate(environ: dict) -> Optional[str]:
+        """Return the best encoding the client accepts, or None."""
+        accepted = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING"))
+        return accepted.best_match(ENCODINGS)
+
+    def _prepare(
+        self, environ: dict, status: str, headers: Headers, encoding: Optional[str]
+    ) -> Optional[str]:
+        """
+        Adjust the response headers and return the encoding to apply, if any.
+
+        :param environ: WSGI environment of the request.
+        :param status: WSGI status line.
+        :param headers: Response headers (modified in place).
+        :param encoding: Negotiated encoding, or None.
+        :return: Encoding to compress the body with, or None.
+        """
+        code = int(status.split(" ", 1)[0])
+        if code == 304:
+            # A 304 carries the Vary the full response would have had
+            _add_vary(headers, "Accept-Encoding")
+            return None
+        mimetype = parse_options_header(headers.get("Content-Type", ""))[0]
+        if (
+            code < 200
+            or code in _SKIP_STATUSES
+            or "Content-Encoding" in headers
+            or not _compressible(mimetype)
+            or "no-transform" in headers.get("Cache-Control", "")
+        ):
+            return None
+
+        _add_vary(headers, "Accept-Encoding")
+        length = headers.get("Content-Length", type=int)
+        if (
+            encoding is None
+            or environ.get("REQUEST_METHOD") == "HEAD"
+            or (length is not None and length < self.min_size)
+        ):
+            return None
+
+        headers["Content-Encoding"] = encoding
+        headers.remove("Content-Length")
+        headers.remove("Accept-Ranges")
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes differ from the ones the strong tag names
+            headers["ETag"] = f"W/{etag}"
+        return encoding
+
+
+def _compressible(mimetype: str) -> bool:
+    """Return whether a content type benefits from compression."""
+    if mimetype in NEVER_COMPRESS:
+        return False
+    return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES
+
+
+def _add_vary(headers: Headers, field: str) -> None:
+    """Add a field to the Vary header unless it is already listed (or `*`)."""
+    vary = [v.strip() for v in headers.get("Vary", "").split(",") if v.strip()]
+    if "*" in vary or field.lower() in (v.lower() for v in vary):
+        return
+    headers["Vary"] = ", ".join(vary + [field])
+
+
+def fragment_etag(*parts: object) -> str:
+    """
+    Return an ETag for a rendered fragment from the state it is rendered from.
+
+    The deploy token changes with the templates, so a new release never
+    answers 304 for markup rendered by the previous one.
+
+    :param parts: Values identifying the fragment and its data version.
+    :return: ETag value (unquoted).
+    """
+    token = current_app.extensions["compression"]["deploy_token"]
+    return "-".join(str(p) for p in (*parts, token))
+
+
+def _deploy_token(template_folder: str) -> str:
+    """Return the newest template modification time, in hex (same in every worker)."""
+    newest = 0.0
+    for root, _, files in os.walk(template_folder):
+        for name in files:
+            newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+    return format(int(newest), "x")
+
+
+def _conditional_html(response: Response) -> Response:
+    """Tag buffered HTML GET responses without cache headers and answer 304 on a match."""
+    if (
+        request.method not in ("GET", "HEAD")
+        or response.status_code != 200
+        or response.is_streamed
+        or response.mimetype != "text/html"
+        or "Cache-Control" in response.headers
+        or "ETag" in response.headers
+    ):
+        return response
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Wrap the app in the compression middleware and enable conditional HTML GETs.
+
+    :param app: Flask application instance.
+    """
+    app.extensions["compression"] = {
+        "deploy_token": _deploy_token(
+            os.path.join(app.root_path, app.template_folder or "templates")
+        )
+    }
+    if app.config.get("HTTP_CACHE_ENABLED", True):
+        app.after_request(_conditional_html)
+    if app.config.get("COMPRESSION_ENABLED", True):
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config.get("COMPRESSION_MIN_SIZE", 1024),
+            gzip_level=app.config.get("COMPRESSION_GZIP_LEVEL", 6),
+            brotli_quality=app.config.get("COMPRESSION_BROTLI_QUALITY", 4),
+        )
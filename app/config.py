@@ -9,11 +9,22 @@ Features:
     - DevelopmentConfig enabling debug mode
     - TestingConfig using in-memory database and disabling external API calls
     - ProductionConfig optimizing for production deployment
+    - Per-environment connection pool profiles (SQLALCHEMY_ENGINE_OPTIONS)
+    - Optional read engine (SQLALCHEMY_BINDS["read"]) for replica-safe queries
+    - Optional per-user shards (SQLALCHEMY_BINDS["shard_<n>"]) for write scaling
+    - Opt-in memory diagnostics (DIAGNOSTICS_*), off unless enabled by environment
+    - Warm-up before serving (WARMUP_*), on in production
+    - Soft-delete undo window, purge batches and incremental VACUUM pacing
+    - On-the-fly response compression (COMPRESSION_*) and conditional HTML GETs
+    - Idempotency key store for retried shelf changes (IDEMPOTENCY_*)
     - `config_by_name` mapping for selecting configurations by name
 
 Required Modules:
     - os: file paths and environment variable access
     - dotenv.load_dotenv: load variables from .env file
+    - app.pool.build_engine_options: backend-specific pool options
+    - app.routing.read_only_uri: read-only SQLite URI for the read engine
+    - app.routing.shard_bind_key: bind keys of the shard engines
 
 Author: Martin Haferanke
 Date: 2025-07-18
@@ -21,10 +32,40 @@ Date: 2025-07-18
 import os
 from dotenv import load_dotenv
 
+from app.pool import build_engine_options
+from app.routing import READ_BIND_KEY, read_only_uri, shard_bind_key
+
 # Load environment variables from .env file
 load_dotenv()
 
 
+def _read_binds(read_uri: str | None) -> dict:
+    """
+    Build SQLALCHEMY_BINDS with the read engine, or none if there is no read URI.
+
+    :param read_uri: Read replica / read-only database URI
+    :return: Binds mapping for Flask-SQLAlchemy
+    """
+    if not read_uri:
+        return {}
+    return {READ_BIND_KEY: {"url": read_uri, **build_engine_options(read_uri)}}
+
+
+def _shard_binds(count: int, uri_template: str) -> dict:
+    """
+    Build SQLALCHEMY_BINDS entries for the shard engines.
+
+    :param count: Number of shards (0 disables sharding)
+    :param uri_template: Database URI with a `{}` placeholder for the shard number
+    :return: Binds mapping for Flask-SQLAlchemy
+    """
+    binds = {}
+    for shard in range(count):
+        uri = uri_template.format(shard)
+        binds[shard_bind_key(shard)] = {"url": uri, **build_engine_options(uri)}
+    return binds
+
+
 class BaseConfig:
     """
     Base configuration with default settings for all environments.
@@ -34,8 +75,62 @@ class BaseConfig:
         SQLALCHEMY_TRACK_MODIFICATIONS (bool): Disable SQLAlchemy event system.
         SQLALCHEMY_ECHO (bool): Toggle SQL query logging.
         SQLALCHEMY_DATABASE_URI (str): Database connection URI.
+        SQLALCHEMY_ENGINE_OPTIONS (dict): Pool class, sizing, pre-ping and recycling.
+        DB_SLOW_CHECKOUT_MS (float): Connection checkout waits above this are logged.
+        SQLALCHEMY_READ_DATABASE_URI (str | None): Read replica URI; defaults to a
+            read-only connection pool on the same SQLite file.
+        SHARD_COUNT (int): Number of per-user SQLite shards; 0 keeps every shelf on the primary.
+        SHARD_DATABASE_URI (str): Shard URI template, `{}` is replaced by the shard number.
+        SQLALCHEMY_BINDS (dict): Registers the read engine under the "read" bind key
+            and the shards under "shard_<n>".
+        READ_YOUR_WRITES_SECONDS (int): Window after a write in which a client reads from the primary.
         DEBUG (bool): Flask debug flag.
         TESTING (bool): Flask testing flag.
+        RATELIMIT_STORAGE_URI (str): Rate limit storage shared by all workers.
+        RECOMMENDER_TOP_K (int): Suggestions precomputed per user.
+        RECOMMENDER_REBUILD_INTERVAL (int): Seconds between full similarity rebuilds.
+        SUGGEST_MIN_LENGTH (int): Minimum typed characters before title suggestions.
+        SUGGEST_CACHE_SIZE (int): Number of prefixes kept in the suggestion cache.
+        SUGGEST_CACHE_TTL (int): Seconds a cached suggestion result stays valid.
+        TEMPLATE_CACHE_DIR (str | None): Shared directory for compiled template bytecode.
+        TEMPLATE_PRECOMPILE (bool): Compile all templates at startup.
+        STREAM_MIN_MOVIES (int): Shelf size from which the home page is streamed.
+        STREAM_BATCH_SIZE (int): Movies fetched per cursor batch while streaming.
+        STREAM_CHUNK_SIZE (int): Characters buffered before a streamed chunk is sent.
+        BATCH_ADD_MAX_TITLES (int): Maximum titles accepted by one batch add.
+        BATCH_ADD_WORKERS (int): Concurrent title lookups per batch add.
+        BATCH_ADD_DEADLINE_SECONDS (float): Time all lookups of one batch add may take.
+        FEED_POLL_INTERVAL (float): Seconds between polls for shelf change events.
+        FEED_QUEUE_SIZE (int): Events buffered per live-update stream before it is reset.
+        FEED_MAX_SUBSCRIBERS (int): Open live-update streams per worker process.
+        FEED_RETENTION_SECONDS (int): Seconds change events are kept for reconnecting clients.
+        FEED_STREAM_SECONDS (int): Lifetime of one stream before the client reconnects.
+        FEED_HEARTBEAT_SECONDS (int): Seconds between keep-alive comments on idle streams.
+        DIAGNOSTICS_ENABLED (bool): Trace allocations and register /diagnostics.
+        DIAGNOSTICS_TOKEN (str): Bearer token admitting remote clients to /diagnostics;
+            without it only direct loopback clients are admitted (the endpoints
+            expose file paths and memory layout, and snapshots are expensive).
+        DIAGNOSTICS_TRACE_FRAMES (int): Stack frames stored per traced allocation.
+        DIAGNOSTICS_MAX_SNAPSHOTS (int): tracemalloc snapshots kept per worker.
+        DIAGNOSTICS_LOG_PEAK_KB (int): Requests allocating more than this at peak are logged.
+        WARMUP_ENABLED (bool): Warm caches in wsgi.py before the server accepts traffic.
+        WARMUP_BUDGET_SECONDS (float): Time all warm-up stages together may take.
+        WARMUP_TOP_TITLES (int): Most-shelved titles replayed into the suggestion cache.
+        WARMUP_TOP_SHELVES (int): Largest shelves rendered once during warm-up.
+        SOFT_DELETE_UNDO_SECONDS (int): Seconds a deleted user or movie can be restored.
+        PURGE_INTERVAL_SECONDS (int): Seconds between purges per worker (0 disables them).
+        PURGE_BATCH_SIZE (int): Rows removed per purge transaction.
+        VACUUM_INTERVAL_SECONDS (int): Seconds between incremental VACUUM steps per worker.
+        VACUUM_PAGES (int): Free pages returned to the file system per step and database.
+        COMPRESSION_ENABLED (bool): Compress dynamic responses with brotli or gzip.
+        COMPRESSION_MIN_SIZE (int): Smallest body in bytes worth compressing.
+        COMPRESSION_GZIP_LEVEL (int): zlib level for gzip responses (1-9).
+        COMPRESSION_BROTLI_QUALITY (int): Brotli quality for br responses (0-11).
+        HTTP_CACHE_ENABLED (bool): ETag and revalidation headers for buffered HTML GETs.
+        IDEMPOTENCY_ENABLED (bool): Replay responses of repeated idempotency keys.
+        IDEMPOTENCY_TTL_SECONDS (int): Seconds a key and its response are kept.
+        IDEMPOTENCY_MAX_KEYS (int): Keys kept per worker process.
+        IDEMPOTENCY_WAIT_SECONDS (float): Time a duplicate waits for the original request.
     """
 
     # Security for production
@@ -53,10 +148,106 @@ class BaseConfig:
         "DATABASE_URL", f"sqlite:///{os.path.join(instance_dir, 'movies.sqlite')}"
     )
 
+    # Connection pool profile (only sized for server databases, see app/pool.py)
+    SQLALCHEMY_ENGINE_OPTIONS: dict = build_engine_options(SQLALCHEMY_DATABASE_URI)
+    DB_SLOW_CHECKOUT_MS: float = float(os.getenv("DB_SLOW_CHECKOUT_MS", 100))
+
+    # Read engine for get_users/get_movies and other replica-safe listings
+    SQLALCHEMY_READ_DATABASE_URI = os.getenv(
+        "DATABASE_READ_URL", read_only_uri(SQLALCHEMY_DATABASE_URI)
+    )
+
+    # Per-user shards; the primary keeps the shard directory and reference catalogue
+    SHARD_COUNT: int = int(os.getenv("SHARD_COUNT", 0))
+    SHARD_DATABASE_URI: str = os.getenv(
+        "SHARD_DATABASE_URL",
+        f"sqlite:///{os.path.join(instance_dir, 'movies_shard_{}.sqlite')}",
+    )
+    SQLALCHEMY_BINDS: dict = {
+        **_read_binds(SQLALCHEMY_READ_DATABASE_URI),
+        **_shard_binds(SHARD_COUNT, SHARD_DATABASE_URI),
+    }
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
     # Flask settings
     DEBUG: bool = False
     TESTING: bool = False
 
+    # In-memory limits are per worker; point this at Redis/Memcached when scaling out
+    RATELIMIT_STORAGE_URI: str = os.getenv("RATELIMIT_STORAGE_URI", "memory://")
+
+    # Recommender index
+    RECOMMENDER_TOP_K: int = int(os.getenv("RECOMMENDER_TOP_K", 10))
+    RECOMMENDER_REBUILD_INTERVAL: int = int(
+        os.getenv("RECOMMENDER_REBUILD_INTERVAL", 900)
+    )
+
+    # Type-ahead title suggestions
+    SUGGEST_MIN_LENGTH: int = 3
+    SUGGEST_CACHE_SIZE: int = int(os.getenv("SUGGEST_CACHE_SIZE", 2048))
+    SUGGEST_CACHE_TTL: int = int(os.getenv("SUGGEST_CACHE_TTL", 3600))
+
+    # Compiled templates shared by all workers on this host
+    TEMPLATE_CACHE_DIR: str | None = os.getenv(
+        "TEMPLATE_CACHE_DIR", os.path.join(instance_dir, "jinja_cache")
+    )
+    TEMPLATE_PRECOMPILE: bool = False
+
+    # Streamed HTML for large shelves
+    STREAM_MIN_MOVIES: int = int(os.getenv("STREAM_MIN_MOVIES", 200))
+    STREAM_BATCH_SIZE: int = int(os.getenv("STREAM_BATCH_SIZE", 100))
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", 16384))
+
+    # Batch add from a pasted title list
+    BATCH_ADD_MAX_TITLES: int = int(os.getenv("BATCH_ADD_MAX_TITLES", 250))
+    BATCH_ADD_WORKERS: int = int(os.getenv("BATCH_ADD_WORKERS", 8))
+    BATCH_ADD_DEADLINE_SECONDS: float = 20.0  # below the gunicorn worker timeout
+
+    # Live shelf updates; each open stream holds a worker thread, so by default
+    # at most half of a worker's threads serve streams (none for sync workers)
+    FEED_POLL_INTERVAL: float = float(os.getenv("FEED_POLL_INTERVAL", 0.5))
+    FEED_QUEUE_SIZE: int = int(os.getenv("FEED_QUEUE_SIZE", 100))
+    FEED_MAX_SUBSCRIBERS: int = int(
+        os.getenv("FEED_MAX_SUBSCRIBERS", int(os.getenv("GUNICORN_THREADS", 2)) // 2)
+    )
+    FEED_RETENTION_SECONDS: int = int(os.getenv("FEED_RETENTION_SECONDS", 300))
+    FEED_STREAM_SECONDS: int = 25  # below the gunicorn worker timeout
+    FEED_HEARTBEAT_SECONDS: int = 10
+
+    # Memory diagnostics; tracing slows every allocation, so they are opt-in
+    DIAGNOSTICS_ENABLED: bool = os.getenv("DIAGNOSTICS_ENABLED", "0") == "1"
+    DIAGNOSTICS_TOKEN: str = os.getenv("DIAGNOSTICS_TOKEN", "")
+    DIAGNOSTICS_TRACE_FRAMES: int = int(os.getenv("DIAGNOSTICS_TRACE_FRAMES", 5))
+    DIAGNOSTICS_MAX_SNAPSHOTS: int = int(os.getenv("DIAGNOSTICS_MAX_SNAPSHOTS", 4))
+    DIAGNOSTICS_LOG_PEAK_KB: int = int(os.getenv("DIAGNOSTICS_LOG_PEAK_KB", 256))
+
+    # Warm-up before serving; without preloading it runs in every worker, so
+    # the budget must stay below the gunicorn worker timeout
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "0") == "1"
+    WARMUP_BUDGET_SECONDS: float = float(os.getenv("WARMUP_BUDGET_SECONDS", 15))
+    WARMUP_TOP_TITLES: int = int(os.getenv("WARMUP_TOP_TITLES", 50))
+    WARMUP_TOP_SHELVES: int = int(os.getenv("WARMUP_TOP_SHELVES", 10))
+
+    # Soft delete; purges run after responses, one batch per table and database
+    SOFT_DELETE_UNDO_SECONDS: int = int(os.getenv("SOFT_DELETE_UNDO_SECONDS", 120))
+    PURGE_INTERVAL_SECONDS: int = int(os.getenv("PURGE_INTERVAL_SECONDS", 60))
+    PURGE_BATCH_SIZE: int = int(os.getenv("PURGE_BATCH_SIZE", 500))
+    VACUUM_INTERVAL_SECONDS: int = int(os.getenv("VACUUM_INTERVAL_SECONDS", 3600))
+    VACUUM_PAGES: int = int(os.getenv("VACUUM_PAGES", 2000))
+
+    # Compression of dynamic responses; turn it off when a proxy in front compresses
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+    HTTP_CACHE_ENABLED: bool = os.getenv("HTTP_CACHE_ENABLED", "1") == "1"
+
+    # Idempotency keys; kept per worker, the shelf's unique constraints cover the rest
+    IDEMPOTENCY_ENABLED: bool = os.getenv("IDEMPOTENCY_ENABLED", "1") == "1"
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 300))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 5))
+
 
 class DevelopmentConfig(BaseConfig):
     """
@@ -64,10 +255,14 @@ class DevelopmentConfig(BaseConfig):
 
     Overrides:
         DEBUG: Enable Flask debug mode.
+        SQLALCHEMY_ENGINE_OPTIONS: Small pool; a single developer needs few connections.
     """
 
     DEBUG: bool = True
     SQLALCHEMY_ECHO: bool = False  # Optionally log SQL statements
+    SQLALCHEMY_ENGINE_OPTIONS: dict = build_engine_options(
+        BaseConfig.SQLALCHEMY_DATABASE_URI, pool_size=2, max_overflow=3
+    )
 
 
 class TestingConfig(BaseConfig):
@@ -78,11 +273,22 @@ class TestingConfig(BaseConfig):
         TESTING: Enable Flask testing mode.
         TESTING: Enable Flask testing mode.
         SQLALCHEMY_DATABASE_URI: Use SQLite in-memory database.
+        SQLALCHEMY_ENGINE_OPTIONS: One shared connection (StaticPool) for :memory:.
+        SQLALCHEMY_BINDS: No read engine; a second :memory: database would be empty.
+        SHARD_COUNT: No shards; every shelf lives in the in-memory database.
+        TEMPLATE_CACHE_DIR: No bytecode cache; templates compile in memory.
+        PURGE_INTERVAL_SECONDS: No purges after responses; tests purge explicitly.
         OPENAI_API_KEY: None to prevent real API calls.
     """
 
     TESTING: bool = True
     SQLALCHEMY_DATABASE_URI: str = "sqlite:///:memory:"
+    SQLALCHEMY_ENGINE_OPTIONS: dict = build_engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_READ_DATABASE_URI = None
+    SHARD_COUNT: int = 0
+    SQLALCHEMY_BINDS: dict = _read_binds(SQLALCHEMY_READ_DATABASE_URI)
+    TEMPLATE_CACHE_DIR: str | None = None
+    PURGE_INTERVAL_SECONDS: int = 0
     OPENAI_API_KEY = None  # Prevent external API calls during tests
 
 
@@ -93,6 +299,15 @@ class ProductionConfig(BaseConfig):
     Overrides:
         SQLALCHEMY_DATABASE_URI: Use provided DATABASE_URL or default SQLite file.
         SQLALCHEMY_ECHO: Disable query logging in production.
+        SQLALCHEMY_ENGINE_OPTIONS: Pool sized per worker from DB_POOL_* variables;
+            fail fast on exhaustion instead of queueing for 30 seconds.
+        SQLALCHEMY_READ_DATABASE_URI: Read engine for the production database file.
+        SHARD_DATABASE_URI: Shard files next to the production database file.
+        TEMPLATE_PRECOMPILE: Compile templates in the (preloading) master so
+            forked workers serve their first requests without compiling.
+        DIAGNOSTICS_ENABLED: Off unless DIAGNOSTICS_ENABLED=1 is set; the
+            endpoints expose internals and tracing costs throughput.
+        WARMUP_ENABLED: Warm up before serving unless WARMUP_ENABLED=0.
     """
 
     SQLALCHEMY_DATABASE_URI: str = os.getenv(
@@ -100,6 +315,27 @@ class ProductionConfig(BaseConfig):
         f"sqlite:///{os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data/movies.sqlite')}",
     )
     SQLALCHEMY_ECHO: bool = False
+    SQLALCHEMY_ENGINE_OPTIONS: dict = build_engine_options(
+        SQLALCHEMY_DATABASE_URI,
+        pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    )
+    SQLALCHEMY_READ_DATABASE_URI = os.getenv(
+        "DATABASE_READ_URL", read_only_uri(SQLALCHEMY_DATABASE_URI)
+    )
+    SHARD_DATABASE_URI: str = os.getenv(
+        "SHARD_DATABASE_URL",
+        f"sqlite:///{os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data/movies_shard_{}.sqlite')}",
+    )
+    SQLALCHEMY_BINDS: dict = {
+        **_read_binds(SQLALCHEMY_READ_DATABASE_URI),
+        **_shard_binds(BaseConfig.SHARD_COUNT, SHARD_DATABASE_URI),
+    }
+    TEMPLATE_PRECOMPILE: bool = os.getenv("TEMPLATE_PRECOMPILE", "1") == "1"
+    DIAGNOSTICS_ENABLED: bool = os.getenv("DIAGNOSTICS_ENABLED", "0") == "1"
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "1") == "1"
 
 
 # Mapping for easy configuration lookup by environment name
@@ -29,6 +29,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from app import create_app
 from app.extentions import db
 from app.models import User, Movie
+from app.services.data_manager import DataManager
 
 load_dotenv()
 OMDB_API_KEY: str = os.getenv("OMDB_API_KEY", "YOUR_OMDB_API_KEY")
@@ -72,6 +73,7 @@ def seed_data() -> None:
     :raises SQLAlchemyError: when database operations fail
     """
     app = create_app()
+    data_manager = DataManager(db)
     with app.app_context():
         # Reset database schema
         db.drop_all()
@@ -106,35 +108,23 @@ def seed_data() -> None:
             ("The Shawshank Redemption", "Frank Darabont", 1994),
         ]
 
-        # Add movies and fetch posters
+        # Add movies and fetch posters; films are shared through the catalogue
         for title, director, year in alice_movies:
             # Attempt to fetch poster URL
             try:
                 poster_url: str = fetch_poster_by_title(title)
             except Exception:
                 poster_url = ""
-            movie = Movie(
-                name=title,
-                director=director,
-                year=year,
-                poster_url=poster_url,
-                user_id=alice.id,
-            )
-            db.session.add(movie)
+            entry = data_manager.resolve_entry(title, director, year, poster_url)
+            db.session.add(Movie(entry=entry, user_id=alice.id))
 
         for title, director, year in bob_movies:
             try:
                 poster_url = fetch_poster_by_title(title)
             except Exception:
                 poster_url = ""
-            movie = Movie(
-                name=title,
-                director=director,
-                year=year,
-                poster_url=poster_url,
-                user_id=bob.id,
-            )
-            db.session.add(movie)
+            entry = data_manager.resolve_entry(title, director, year, poster_url)
+            db.session.add(Movie(entry=entry, user_id=bob.id))
 
         # Commit seeded movies
         try:
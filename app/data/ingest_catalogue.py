@@ -0,0 +1,353 @@
+# File: data/ingest_catalogue.py
+"""
+Purpose:
+    Load a public movie dataset dump into the offline reference catalogue
+    (`reference_titles`) so title lookups resolve without calling OMDb.
+
+Features:
+    - Streams plain or gzip-compressed TSV/CSV files row by row (constant memory)
+    - Inserts in fixed-size batches inside one transaction per file
+    - IMDb dataset layout: title.basics (required), title.ratings, title.crew
+      and name.basics (optional, for vote ranking and director names)
+    - Generic dumps: any TSV/CSV whose header has imdb_id, title and
+      optionally year, director and votes columns
+    - Director names are joined in SQL through a staging table, never in memory
+    - Replaces the previous reference catalogue; cached posters and plots are kept
+
+Usage:
+    python -m app.data.ingest_catalogue title.basics.tsv.gz \\
+        [--ratings title.ratings.tsv.gz] [--crew title.crew.tsv.gz --names name.basics.tsv.gz]
+    python -m app.data.ingest_catalogue movies.csv.gz
+
+Exceptions:
+    - OSError: if a dump cannot be read
+    - ValueError: if a dump lacks the required columns
+    - SQLAlchemyError: on database failures (the current file is rolled back)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+import csv
+import gzip
+import io
+import logging
+import sys
+from typing import Callable, Dict, Iterator, List, Optional, TextIO
+
+from sqlalchemy import Column, MetaData, String, Table, bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from app.extentions import db
+from app.models import ReferenceTitle
+from app.utils import normalize_title
+
+# Rows sent to the database per executemany() batch
+BATCH_SIZE: int = 10_000
+
+# IMDb's marker for missing values
+NULL: str = "\\N"
+
+# Title types imported from title.basics
+MOVIE_TYPES: set[str] = {"movie", "tvMovie"}
+
+# Accepted header names per field (IMDb dataset names first)
+COLUMN_ALIASES: Dict[str, tuple[str, ...]] = {
+    "imdb_id": ("tconst", "imdb_id", "imdbid", "id"),
+    "title": ("primaryTitle", "title", "name"),
+    "year": ("startYear", "year"),
+    "director": ("director", "directors_name"),
+    "votes": ("numVotes", "votes"),
+    "type": ("titleType", "type"),
+    "adult": ("isAdult", "adult"),
+}
+
+# csv.field_size_limit default (128 KiB) is too small for some dump columns
+csv.field_size_limit(sys.maxsize)
+
+
+def open_dump(path: str) -> TextIO:
+    """
+    Open a TSV/CSV dump as text, transparently decompressing `.gz` files.
+
+    :param path: Path to the dump
+    :return: Text stream
+    :raises OSError: if the file cannot be opened
+    """
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream the rows of a dump as dicts keyed by its header.
+
+    TSV dumps (IMDb style) are read without quote handling and `\\N` becomes "".
+
+    :param path: Path to a .tsv, .csv, .tsv.gz or .csv.gz file
+    :return: Iterator of row dicts
+    """
+    is_tsv = ".tsv" in path
+    with open_dump(path) as f:
+        if is_tsv:
+            reader = csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+        else:
+            reader = csv.DictReader(f)
+        for row in reader:
+            yield {k: ("" if v == NULL else v or "") for k, v in row.items() if k}
+
+
+def _column(header: List[str], field: str) -> Optional[str]:
+    """Return the header name used for a field, or None if the dump lacks it."""
+    lowered = {name.lower(): name for name in header}
+    for alias in COLUMN_ALIASES[field]:
+        if alias.lower() in lowered:
+            return lowered[alias.lower()]
+    return None
+
+
+def _int(value: str) -> Optional[int]:
+    """Parse an integer column; None if empty or invalid."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batched(rows: Iterator[dict], size: int = BATCH_SIZE) -> Iterator[List[dict]]:
+    """Group an iterator of rows into lists of at most `size` rows."""
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _header(path: str) -> List[str]:
+    """Return the header columns of a dump."""
+    with open_dump(path) as f:
+        first = f.readline().rstrip("\r\n")
+    return first.split("\t") if ".tsv" in path else next(csv.reader([first]))
+
+
+def _titles(path: str) -> Iterator[dict]:
+    """
+    Stream reference rows from a title dump.
+
+    :param path: title.basics or generic dump
+    :return: Iterator of dicts matching the reference_titles columns
+    :raises ValueError: if the dump has no id or title column
+    """
+    header = _header(path)
+    cols = {field: _column(header, field) for field in COLUMN_ALIASES}
+    if not cols["imdb_id"] or not cols["title"]:
+        raise ValueError(f"{path}: needs an imdb_id/tconst and a title column")
+
+    for row in read_rows(path):
+        if cols["type"] and row.get(cols["type"]) not in MOVIE_TYPES:
+            continue
+        if cols["adult"] and row.get(cols["adult"]) == "1":
+            continue
+        title = row[cols["title"]].strip()
+        imdb_id = row[cols["imdb_id"]].strip()
+        if not title or not imdb_id:
+            continue
+        yield {
+            "imdb_id": imdb_id,
+            "title_key": normalize_title(title),
+            "name": title,
+            "year": _int(row.get(cols["year"], "")) if cols["year"] else None,
+            "director": (
+                (row.get(cols["director"]) or None) if cols["director"] else None
+            ),
+            "votes": (_int(row.get(cols["votes"], "")) or 0) if cols["votes"] else 0,
+        }
+
+
+def _run_batches(conn, statement, rows: Iterator[dict], label: str) -> int:
+    """
+    Execute a statement for every batch of rows and report progress.
+
+    :param conn: Connection inside an open transaction
+    :param statement: Insert/update statement with bind parameters
+    :param rows: Parameter dicts
+    :param label: Progress label
+    :return: Number of rows processed
+    """
+    count = 0
+    for batch in _batched(rows):
+        conn.execute(statement, batch)
+        count += len(batch)
+        print(f"\r{label}: {count:,} rows", end="", flush=True)
+    print()
+    return count
+
+
+def ingest_titles(conn, path: str) -> int:
+    """
+    Replace the reference catalogue with the titles of a dump.
+
+    Posters and plots already fetched from OMDb are carried over by IMDb id.
+
+    :param conn: Connection inside an open transaction
+    :param path: Title dump
+    :return: Number of titles loaded
+    """
+    table = ReferenceTitle.__table__
+    details = Table(
+        "reference_details_staging",
+        MetaData(),
+        Column("imdb_id", String, primary_key=True),
+        Column("poster_url", String),
+        Column("plot", String),
+        prefixes=["TEMPORARY"],
+    )
+    details.create(conn)
+    conn.execute(
+        details.insert().from_select(
+            ["imdb_id", "poster_url", "plot"],
+            select(table.c.imdb_id, table.c.poster_url, table.c.plot).where(
+                table.c.plot.is_not(None)
+            ),
+        )
+    )
+    conn.execute(table.delete())
+
+    count = _run_batches(conn, table.insert(), _titles(path), "titles")
+
+    conn.execute(
+        update(table)
+        .where(table.c.imdb_id == details.c.imdb_id)
+        .values(poster_url=details.c.poster_url, plot=details.c.plot)
+    )
+    details.drop(conn)
+    return count
+
+
+def ingest_ratings(conn, path: str) -> int:
+    """
+    Set vote counts from an IMDb title.ratings dump.
+
+    :param conn: Connection inside an open transaction
+    :param path: title.ratings dump (tconst, averageRating, numVotes)
+    :return: Number of rating rows processed
+    """
+    table = ReferenceTitle.__table__
+    statement = (
+        update(table)
+        .where(table.c.imdb_id == bindparam("b_id"))
+        .values(votes=bindparam("b_votes"))
+    )
+    rows = (
+        {"b_id": row["tconst"], "b_votes": _int(row.get("numVotes", "")) or 0}
+        for row in read_rows(path)
+    )
+    return _run_batches(conn, statement, rows, "ratings")
+
+
+def ingest_directors(conn, crew_path: str, names_path: str) -> int:
+    """
+    Set director names from IMDb title.crew and name.basics dumps.
+
+    Both files are staged into temporary tables and joined in SQL, so memory
+    use does not depend on the size of the name dump.
+
+    :param conn: Connection inside an open transaction
+    :param crew_path: title.crew dump (tconst, directors, writers)
+    :param names_path: name.basics dump (nconst, primaryName, ...)
+    :return: Number of crew rows processed
+    """
+    table = ReferenceTitle.__table__
+    metadata = MetaData()
+    crew = Table(
+        "crew_staging",
+        metadata,
+        Column("imdb_id", String, primary_key=True),
+        Column("person_id", String, index=True),
+        prefixes=["TEMPORARY"],
+    )
+    names = Table(
+        "names_staging",
+        metadata,
+        Column("person_id", String, primary_key=True),
+        Column("name", String),
+        prefixes=["TEMPORARY"],
+    )
+    metadata.create_all(conn)
+
+    crew_rows = (
+        {"imdb_id": row["tconst"], "person_id": row["directors"].split(",")[0]}
+        for row in read_rows(crew_path)
+        if row.get("directors")
+    )
+    count = _run_batches(conn, crew.insert(), crew_rows, "crew")
+    name_rows = (
+        {"person_id": row["nconst"], "name": row["primaryName"]}
+        for row in read_rows(names_path)
+    )
+    _run_batches(conn, names.insert(), name_rows, "names")
+
+    director = (
+        select(names.c.name)
+        .join(crew, crew.c.person_id == names.c.person_id)
+        .where(crew.c.imdb_id == table.c.imdb_id)
+        .scalar_subquery()
+    )
+    conn.execute(update(table).values(director=director))
+    metadata.drop_all(conn)
+    return count
+
+
+def ingest_catalogue(
+    titles: str,
+    ratings: Optional[str] = None,
+    crew: Optional[str] = None,
+    names: Optional[str] = None,
+) -> None:
+    """
+    Rebuild the offline reference catalogue from dataset dumps.
+
+    :param titles: Title dump (IMDb title.basics or a generic TSV/CSV)
+    :param ratings: Optional IMDb title.ratings dump
+    :param crew: Optional IMDb title.crew dump (requires `names`)
+    :param names: Optional IMDb name.basics dump (requires `crew`)
+    :raises ValueError: if only one of crew/names is given or a dump lacks columns
+    :raises SQLAlchemyError: when database operations fail
+    """
+    if bool(crew) != bool(names):
+        raise ValueError("--crew and --names must be given together")
+
+    steps: List[tuple[str, Callable]] = [(titles, lambda c: ingest_titles(c, titles))]
+    if ratings:
+        steps.append((ratings, lambda c: ingest_ratings(c, ratings)))
+    if crew:
+        steps.append((crew, lambda c: ingest_directors(c, crew, names)))
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for path, step in steps:
+            try:
+                with db.engine.begin() as conn:
+                    step(conn)
+            except SQLAlchemyError:
+                logging.exception("Ingest of %s failed, rolled back", path)
+                raise
+
+        total = db.session.query(ReferenceTitle).count()
+        print(f"[OK] Reference catalogue holds {total:,} titles.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2].strip())
+    parser.add_argument("titles", help="title.basics.tsv.gz or a generic TSV/CSV dump")
+    parser.add_argument("--ratings", help="title.ratings.tsv.gz (ranks remakes)")
+    parser.add_argument("--crew", help="title.crew.tsv.gz (director ids)")
+    parser.add_argument("--names", help="name.basics.tsv.gz (director names)")
+    args = parser.parse_args()
+    ingest_catalogue(args.titles, args.ratings, args.crew, args.names)
@@ -0,0 +1,132 @@
+# File: data/migrate_catalog.py
+"""
+Purpose:
+    Migrate a database from the per-user `movies` table to the shared `catalog`
+    table plus the thin `user_movies` link table.
+
+Features:
+    - Detects the legacy `movies` table and skips databases already migrated
+    - Creates the new tables if they do not exist yet
+    - Collapses legacy rows into one catalogue entry per normalized title
+    - Keeps the first poster URL found for each film
+    - Preserves movie ids so existing URLs stay valid
+    - Runs in a single transaction; renames (or drops) the legacy table at the end
+
+Usage:
+    python -m app.data.migrate_catalog [--drop]
+
+Exceptions:
+    - SQLAlchemyError: on database transaction failures (the migration is rolled back)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from app.extentions import db
+from app.models import CatalogEntry, Movie
+from app.utils import normalize_title
+
+LEGACY_TABLE: str = "movies"
+BACKUP_TABLE: str = "movies_legacy"
+
+
+def migrate_catalog(drop_legacy: bool = False) -> None:
+    """
+    Copy legacy per-user movie rows into the shared catalogue and link table.
+
+    :param drop_legacy: Drop the legacy table instead of renaming it to `movies_legacy`
+    :raises RuntimeError: if the link table already contains rows
+    :raises SQLAlchemyError: when database operations fail
+    """
+    app = create_app()
+    with app.app_context():
+        if LEGACY_TABLE not in inspect(db.engine).get_table_names():
+            print("[OK] No legacy movies table found, nothing to migrate.")
+            return
+
+        db.create_all()
+
+        try:
+            with db.engine.begin() as conn:
+                if conn.execute(
+                    db.select(db.func.count()).select_from(Movie.__table__)
+                ).scalar():
+                    raise RuntimeError(
+                        "user_movies already contains rows; refusing to migrate twice."
+                    )
+
+                legacy = conn.execute(
+                    text(
+                        f"SELECT id, name, director, year, poster_url, user_id "
+                        f"FROM {LEGACY_TABLE} ORDER BY id"
+                    )
+                ).all()
+
+                # One catalogue entry per normalized title, first row wins
+                entries: dict[str, dict] = {}
+                for _, name, director, year, poster_url, _ in legacy:
+                    key = normalize_title(name)
+                    entry = entries.setdefault(
+                        key,
+                        {
+                            "title_key": key,
+                            "name": name,
+                            "director": director,
+                            "year": year or 0,
+                            "poster_url": None,
+                        },
+                    )
+                    if poster_url and not entry["poster_url"]:
+                        entry["poster_url"] = poster_url
+
+                if entries:
+                    conn.execute(
+                        CatalogEntry.__table__.insert(), list(entries.values())
+                    )
+                catalog_ids = dict(
+                    conn.execute(
+                        db.select(CatalogEntry.title_key, CatalogEntry.id)
+                    ).all()
+                )
+
+                # Keep movie ids; drop duplicate titles on the same shelf
+                links: dict[tuple[int, int], dict] = {}
+                for movie_id, name, _, _, _, user_id in legacy:
+                    catalog_id = catalog_ids[normalize_title(name)]
+                    links.setdefault(
+                        (user_id, catalog_id),
+                        {"id": movie_id, "user_id": user_id, "catalog_id": catalog_id},
+                    )
+                if links:
+                    conn.execute(Movie.__table__.insert(), list(links.values()))
+
+                if drop_legacy:
+                    conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+                else:
+                    conn.execute(
+                        text(f"ALTER TABLE {LEGACY_TABLE} RENAME TO {BACKUP_TABLE}")
+                    )
+        except SQLAlchemyError:
+            logging.exception("Catalogue migration failed, rolled back")
+            raise
+
+        print(
+            f"[OK] Migrated {len(legacy)} movies into {len(entries)} catalogue "
+            f"entries and {len(links)} shelf links."
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2].strip())
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help=f"drop the legacy table instead of renaming it to {BACKUP_TABLE}",
+    )
+    migrate_catalog(drop_legacy=parser.parse_args().drop)
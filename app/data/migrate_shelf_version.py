@@ -0,0 +1,59 @@
+# File: data/migrate_shelf_version.py
+"""
+Purpose:
+    Add the `shelf_version` column to the `users` table of an existing database.
+
+Features:
+    - Detects databases that already have the column and skips them
+    - Adds the column with a server default of 0, so existing rows need no backfill
+
+Usage:
+    python -m app.data.migrate_shelf_version
+
+Exceptions:
+    - SQLAlchemyError: on database failures (the migration is rolled back)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from app.extentions import db
+
+COLUMN: str = "shelf_version"
+
+
+def migrate_shelf_version() -> None:
+    """
+    Add `users.shelf_version` if it is missing.
+
+    :raises SQLAlchemyError: when database operations fail
+    """
+    app = create_app()
+    with app.app_context():
+        columns = {c["name"] for c in inspect(db.engine).get_columns("users")}
+        if COLUMN in columns:
+            print(f"[OK] users.{COLUMN} already exists, nothing to migrate.")
+            return
+
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"ALTER TABLE users ADD COLUMN {COLUMN} "
+                        f"INTEGER NOT NULL DEFAULT 0"
+                    )
+                )
+        except SQLAlchemyError:
+            logging.exception("Adding users.%s failed, rolled back", COLUMN)
+            raise
+
+        print(f"[OK] Added users.{COLUMN}.")
+
+
+if __name__ == "__main__":
+    migrate_shelf_version()
@@ -0,0 +1,84 @@
+# File: data/migrate_soft_delete.py
+"""
+Purpose:
+    Prepare an existing database for soft deletes: add the `deleted_at`
+    columns and partial indexes, and switch SQLite files to incremental
+    auto-vacuum so the purger can hand freed pages back to the file system.
+
+Features:
+    - Migrates the primary database and, with sharding on, every shard
+    - Detects columns and indexes that already exist and skips them
+    - Converts SQLite files to `auto_vacuum=INCREMENTAL` with one full VACUUM
+      (rewrites the file: run it while the app is stopped)
+
+Usage:
+    python -m app.data.migrate_soft_delete
+
+Exceptions:
+    - SQLAlchemyError: on database failures (the column changes are rolled back)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from app.extentions import db
+from app.models import Movie, User
+from app.sharding import shard_count, shard_engine
+
+COLUMN: str = "deleted_at"
+
+
+def _add_columns(engine: Engine) -> None:
+    """Add the `deleted_at` columns and their partial indexes where missing."""
+    inspector = inspect(engine)
+    try:
+        with engine.begin() as conn:
+            for table in (User.__table__, Movie.__table__):
+                columns = {c["name"] for c in inspector.get_columns(table.name)}
+                if COLUMN not in columns:
+                    conn.execute(
+                        text(f"ALTER TABLE {table.name} ADD COLUMN {COLUMN} FLOAT")
+                    )
+                    print(f"[OK] Added {table.name}.{COLUMN}.")
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+    except SQLAlchemyError:
+        logging.exception("Adding %s columns failed, rolled back", COLUMN)
+        raise
+
+
+def _enable_incremental_vacuum(engine: Engine) -> None:
+    """Switch a SQLite file to incremental auto-vacuum (needs a full VACUUM)."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            return
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    print(f"[OK] Incremental auto-vacuum enabled for {engine.url.database}.")
+
+
+def migrate_soft_delete() -> None:
+    """
+    Add the soft-delete columns and enable incremental VACUUM on every database.
+
+    :raises SQLAlchemyError: when database operations fail
+    """
+    app = create_app()
+    with app.app_context():
+        engines = [db.engine] + [shard_engine(db, s) for s in range(shard_count())]
+        for engine in engines:
+            _add_columns(engine)
+            _enable_incremental_vacuum(engine)
+        print(f"[OK] {len(engines)} database(s) ready for soft deletes.")
+
+
+if __name__ == "__main__":
+    migrate_soft_delete()
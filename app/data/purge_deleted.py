@@ -0,0 +1,45 @@
+# File: data/purge_deleted.py
+"""
+Purpose:
+    Purge all soft-deleted users and movies past the undo window in one go
+    and return the freed pages to the file system, e.g. from cron or before
+    a backup. The running app purges the same rows a batch at a time.
+
+Usage:
+    python -m app.data.purge_deleted
+    python -m app.data.purge_deleted --no-vacuum
+
+Exceptions:
+    - SQLAlchemyError: on database failures (finished batches stay purged)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+
+from app import create_app
+from app.services.purger import purger
+
+
+def purge_deleted(vacuum: bool = True) -> None:
+    """
+    Purge every expired tombstone, then run an incremental VACUUM step.
+
+    :param vacuum: Also return free pages to the file system
+    :raises SQLAlchemyError: when database operations fail
+    """
+    app = create_app()
+    with app.app_context():
+        purged = purger.purge()
+        print(f"[OK] Purged {purged['movies']} movies and {purged['users']} users.")
+        if vacuum:
+            freed = purger.vacuum()
+            print(f"[OK] Freed {sum(freed.values())} pages.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge soft-deleted rows")
+    parser.add_argument(
+        "--no-vacuum", action="store_true", help="skip the incremental VACUUM"
+    )
+    purge_deleted(vacuum=not parser.parse_args().no_vacuum)
@@ -0,0 +1,329 @@
+# File: data/rebalance_shards.py
+"""
+Purpose:
+    Move users between per-user SQLite shards: after SHARD_COUNT was raised
+    or lowered, to relieve a hot shard, or to import an unsharded database.
+
+Features:
+    - The shard directory is authoritative: a user stays where the directory
+      puts them, including placements made with --user/--to. The hash of the
+      id (app.sharding.shard_for) only picks the shard of new users, so
+      changing SHARD_COUNT does not relocate anyone by itself
+    - A rebalance moves only users on removed shards (shard >= SHARD_COUNT)
+      and, from shards holding more than `--tolerance` above the even share
+      of users, the newest users down to that share; each goes to the shard
+      with the fewest users at that moment
+    - Removed shards are opened from SHARD_DATABASE_URI to be drained: run the
+      rebalance with the lowered SHARD_COUNT before restarting the app with it
+    - Moves a single user to a chosen shard (--user/--to)
+    - Imports users from the primary database when sharding is switched on
+    - Locks the user in the directory while moving (requests get HTTP 503),
+      copies the shelf, switches the directory, then deletes the old rows
+    - Catalogue entries are matched against the target shard's catalogue by
+      IMDb id, or by title, director and year, so no film is duplicated there
+      and a user's edited details stay their own
+    - Bumps the shelf version of moved users (movie ids change on the new shard)
+
+Usage:
+    python -m app.data.rebalance_shards
+    python -m app.data.rebalance_shards --tolerance 0.25
+    python -m app.data.rebalance_shards --user 42 --to 3
+    python -m app.data.rebalance_shards --import-primary
+
+Exceptions:
+    - ValueError: if sharding is off or a shard number is out of range
+    - SQLAlchemyError: on database failures (the user is unlocked again)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import Connection, create_engine, delete, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import create_app
+from app.extentions import db
+from app.models import CatalogEntry, Movie, ShardDirectory, User
+from app.sharding import (
+    register_user,
+    release_user,
+    shard_count,
+    shard_engine,
+    shard_for,
+)
+
+# Seconds to wait after locking a user, so requests already routed can finish
+GRACE_SECONDS: float = 1.0
+
+# Share of users above the even share a shard may hold before it is relieved
+TOLERANCE: float = 0.1
+
+
+def _set_lock(user_id: int, locked: bool, shard: Optional[int] = None) -> None:
+    """Lock or unlock a user in the directory, optionally switching its shard."""
+    values = {"locked": locked} if shard is None else {"locked": locked, "shard": shard}
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(ShardDirectory)
+            .where(ShardDirectory.user_id == user_id)
+            .values(**values)
+        )
+
+
+def _engine(shard: Optional[int]) -> Engine:
+    """Return the engine of a shard, opening removed shards (>= SHARD_COUNT) from the URL template."""
+    try:
+        return shard_engine(db, shard)
+    except KeyError:
+        url = current_app.config["SHARD_DATABASE_URI"].format(shard)
+        return create_engine(url)
+
+
+def _target_entry(conn: Connection, entry: dict) -> int:
+    """
+    Return the id of a film in the target shard's catalogue, copying it if unknown.
+
+    :param conn: Connection to the target shard inside a transaction
+    :param entry: Catalogue row from the source shard
+    :return: Catalogue id on the target shard
+    """
+    catalog = CatalogEntry.__table__
+    if entry["imdb_id"]:
+        found = conn.execute(
+            select(catalog.c.id).where(catalog.c.imdb_id == entry["imdb_id"])
+        ).scalar()
+    else:
+        found = conn.execute(
+            select(catalog.c.id)
+            .where(
+                catalog.c.title_key == entry["title_key"],
+                catalog.c.name == entry["name"],
+                catalog.c.director == entry["director"],
+                catalog.c.year == entry["year"],
+                catalog.c.imdb_id.is_(None),
+            )
+            .order_by(catalog.c.id)
+        ).scalar()
+    if found is not None:
+        return found
+    values = {k: v for k, v in entry.items() if k != "id"}
+    return conn.execute(insert(catalog).values(**values)).inserted_primary_key[0]
+
+
+def move_user(
+    user_id: int, source: Optional[int], target: int, grace: float = GRACE_SECONDS
+) -> int:
+    """
+    Move a user and their shelf from one shard to another.
+
+    :param user_id: ID of the user
+    :param source: Shard holding the user, or None for the primary database
+    :param target: Shard to move the user to
+    :param grace: Seconds to wait after locking the user
+    :return: Number of shelf entries moved
+    :raises SQLAlchemyError: if copying fails (the user stays on the source shard)
+    """
+    users, movies = User.__table__, Movie.__table__
+    catalog = CatalogEntry.__table__
+
+    _set_lock(user_id, True)
+    try:
+        time.sleep(grace)
+        with _engine(source).connect() as src:
+            user = (
+                src.execute(select(users).where(users.c.id == user_id)).mappings().one()
+            )
+            shelf = (
+                src.execute(
+                    select(movies, *[c.label(f"entry_{c.name}") for c in catalog.c])
+                    .join(catalog, movies.c.catalog_id == catalog.c.id)
+                    .where(movies.c.user_id == user_id)
+                    .order_by(movies.c.id)
+                )
+                .mappings()
+                .all()
+            )
+
+        with shard_engine(db, target).begin() as dst:
+            dst.execute(
+                insert(users).values(
+                    **dict(user, shelf_version=user["shelf_version"] + 1)
+                )
+            )
+            entry_ids: Dict[int, int] = {}
+            for row in shelf:
+                if row["catalog_id"] not in entry_ids:
+                    entry = {c.name: row[f"entry_{c.name}"] for c in catalog.c}
+                    entry_ids[row["catalog_id"]] = _target_entry(dst, entry)
+                values = {c.name: row[c.name] for c in movies.c if c.name != "id"}
+                values["catalog_id"] = entry_ids[row["catalog_id"]]
+                dst.execute(insert(movies).values(**values))
+    except (SQLAlchemyError, LookupError):
+        logging.exception("Moving user %d to shard %d failed", user_id, target)
+        _set_lock(user_id, False)
+        raise
+
+    # The copy is committed: switch the directory, then drop the old rows
+    _set_lock(user_id, False, shard=target)
+    with _engine(source).begin() as src:
+        src.execute(delete(movies).where(movies.c.user_id == user_id))
+        src.execute(delete(users).where(users.c.id == user_id))
+    return len(shelf)
+
+
+def import_primary(grace: float = 0.0) -> int:
+    """
+    Move the users of an unsharded database from the primary onto their shards.
+
+    :param grace: Seconds to wait after locking each user
+    :return: Number of users imported
+    :raises SQLAlchemyError: when database operations fail
+    """
+    count = shard_count()
+    users = User.__table__
+    with db.engine.connect() as conn:
+        known = set(conn.execute(select(ShardDirectory.user_id)).scalars())
+        user_ids = [
+            u
+            for u in conn.execute(select(users.c.id).order_by(users.c.id)).scalars()
+            if u not in known
+        ]
+    for user_id in user_ids:
+        home = shard_for(user_id, count)
+        register_user(db, user_id)
+        try:
+            moved = move_user(user_id, None, home, grace)
+        except (SQLAlchemyError, LookupError):
+            release_user(db, user_id)
+            raise
+        print(f"user {user_id}: primary -> shard {home} ({moved} movies)")
+    return len(user_ids)
+
+
+def plan_moves(
+    placements: Dict[int, int], count: int, tolerance: float = TOLERANCE
+) -> List[Tuple[int, int, int]]:
+    """
+    Return the moves that drain removed shards and relieve overloaded ones.
+
+    Users on removed shards go first; then every shard holding more than
+    (1 + tolerance) times the even share of users gives up its newest users
+    until it is down to the even share. Each user goes to the shard with the
+    fewest users at that point. Everyone else stays where they are.
+
+    :param placements: Shard of every user, from the directory
+    :param count: Number of shards
+    :param tolerance: Share above the even share tolerated before moving users
+    :return: List of (user id, source shard, target shard)
+    """
+    shards: Dict[int, List[int]] = {shard: [] for shard in range(count)}
+    stranded: List[Tuple[int, int]] = []
+    for user_id, shard in sorted(placements.items()):
+        if shard in shards:
+            shards[shard].append(user_id)
+        else:
+            stranded.append((user_id, shard))
+
+    def least_loaded() -> int:
+        return min(shards, key=lambda shard: (len(shards[shard]), shard))
+
+    moves: List[Tuple[int, int, int]] = []
+    for user_id, source in stranded:
+        target = least_loaded()
+        shards[target].append(user_id)
+        moves.append((user_id, source, target))
+
+    share = -(-len(placements) // count)
+    for source in range(count):
+        if len(shards[source]) <= share * (1 + tolerance):
+            continue
+        while len(shards[source]) > share:
+            target = least_loaded()
+            if len(shards[target]) + 1 >= len(shards[source]):
+                break
+            user_id = shards[source].pop()
+            shards[target].append(user_id)
+            moves.append((user_id, source, target))
+    return moves
+
+
+def rebalance(grace: float = GRACE_SECONDS, tolerance: float = TOLERANCE) -> int:
+    """
+    Drain removed shards and relieve overloaded ones (see `plan_moves`).
+
+    :param grace: Seconds to wait after locking each user
+    :param tolerance: Share above the even share tolerated before moving users
+    :return: Number of users moved
+    :raises SQLAlchemyError: when database operations fail
+    """
+    with db.engine.connect() as conn:
+        placements = dict(
+            conn.execute(select(ShardDirectory.user_id, ShardDirectory.shard)).all()
+        )
+    moves = plan_moves(placements, shard_count(), tolerance)
+    for user_id, source, target in moves:
+        moved = move_user(user_id, source, target, grace)
+        print(f"user {user_id}: shard {source} -> shard {target} ({moved} movies)")
+    return len(moves)
+
+
+def main() -> None:
+    """Parse the command line and run the requested move."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2].strip())
+    parser.add_argument("--user", type=int, help="move only this user")
+    parser.add_argument("--to", type=int, help="target shard for --user")
+    parser.add_argument(
+        "--import-primary",
+        action="store_true",
+        help="move users of an unsharded database onto their shards",
+    )
+    parser.add_argument(
+        "--grace",
+        type=float,
+        default=GRACE_SECONDS,
+        help="seconds between locking a user and copying the shelf",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="share above the even share of users a shard may hold",
+    )
+    parser.add_argument("--config", default=None, help="configuration name")
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    with app.app_context():
+        count = shard_count()
+        if not count:
+            raise ValueError("Sharding is off; set SHARD_COUNT first")
+
+        if args.import_primary:
+            imported = import_primary(args.grace)
+            print(f"[OK] Imported {imported} users from the primary database.")
+        elif args.user is not None:
+            if args.to is None or not 0 <= args.to < count:
+                raise ValueError(f"--to must be a shard between 0 and {count - 1}")
+            source = db.session.get(ShardDirectory, args.user)
+            if source is None:
+                raise ValueError(f"User {args.user} is not in the shard directory")
+            if source.shard != args.to:
+                moved = move_user(args.user, source.shard, args.to, args.grace)
+                print(
+                    f"[OK] Moved user {args.user} to shard {args.to} ({moved} movies)."
+                )
+            else:
+                print(f"[OK] User {args.user} already lives on shard {args.to}.")
+        else:
+            moved = rebalance(args.grace, args.tolerance)
+            print(f"[OK] Moved {moved} users.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# File: app/diagnostics.py
+"""
+Purpose:
+    Opt-in memory diagnostics for finding what makes worker RSS grow over
+    long uptimes: the SQLAlchemy identity map, Jinja caches or our own code.
+
+Features:
+    - init_diagnostics: start tracemalloc when DIAGNOSTICS_ENABLED is set
+      (nothing is traced or hooked otherwise)
+    - Per-request peak and retained allocation, logged for requests whose
+      peak exceeds DIAGNOSTICS_LOG_PEAK_KB (measured when the response is
+      closed, so streamed bodies are included)
+    - SnapshotStore: numbered tracemalloc snapshots per worker and the top
+      allocation differences between two of them
+    - heap_summary: live ORM instances per model, open sessions, Jinja cache
+      entries and the worker's peak RSS
+
+Required Modules:
+    - tracemalloc: allocation tracing and snapshots
+    - gc: live object scan for the heap summary
+    - resource: peak RSS (not available on Windows)
+    - threading: snapshot store lock
+    - flask: request hooks and application globals
+    - sqlalchemy: instance state of ORM objects
+    - app.extentions.db: registry of the ORM models
+
+Exceptions:
+    - KeyError: when a snapshot id is unknown (SnapshotStore.get)
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import gc
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, current_app, g, request
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app.extentions import db
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Allocations of the tracer itself and of the import machinery are noise
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class SnapshotStore:
+    """
+    Numbered tracemalloc snapshots of this worker, oldest dropped first.
+
+    Snapshots are large (one entry per traced allocation site), so only the
+    last `limit` are kept.
+    """
+
+    def __init__(self, limit: int = 4) -> None:
+        """
+        Initialize an empty store.
+
+        :param limit: Maximum number of snapshots kept.
+        """
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._snapshots: "OrderedDict[int, dict]" = OrderedDict()
+        self._next_id = 1
+
+    def take(self) -> dict:
+        """
+        Take a snapshot of the currently traced allocations.
+
+        :return: Summary with id, time, traced size and peak.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            entry = {
+                "id": self._next_id,
+                "taken_at": time.time(),
+                "traced_kb": round(current / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "snapshot": snapshot,
+            }
+            self._snapshots[self._next_id] = entry
+            self._next_id += 1
+            while len(self._snapshots) > self.limit:
+                self._snapshots.popitem(last=False)
+        return self._summary(entry)
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        """
+        Return a stored snapshot.
+
+        :param snapshot_id: Id returned by `take`.
+        :return: The snapshot.
+        :raises KeyError: if the snapshot is unknown or was dropped.
+        """
+        with self._lock:
+            return self._snapshots[snapshot_id]["snapshot"]
+
+    def list(self) -> List[dict]:
+        """Return the summaries of all stored snapshots, oldest first."""
+        with self._lock:
+            return [self._summary(e) for e in self._snapshots.values()]
+
+    def clear(self) -> None:
+        """Drop all snapshots (after a fork they belong to the parent)."""
+        with self._lock:
+            self._snapshots.clear()
+
+    @staticmethod
+    def _summary(entry: dict) -> dict:
+        """Return a snapshot entry without the snapshot itself."""
+        return {k: v for k, v in entry.items() if k != "snapshot"}
+
+
+def _stat_dict(stat) -> dict:
+    """Turn a tracemalloc Statistic or StatisticDiff into JSON-friendly data."""
+    data = {
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+        "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+    }
+    if hasattr(stat, "size_diff"):
+        data["size_diff_kb"] = round(stat.size_diff / 1024, 1)
+        data["count_diff"] = stat.count_diff
+    return data
+
+
+def top_allocations(
+    snapshot_id: int, group_by: str = "lineno", limit: int = 20
+) -> List[dict]:
+    """
+    Return the largest allocation sites of one snapshot.
+
+    :param snapshot_id: Id of a stored snapshot.
+    :param group_by: "lineno", "filename" or "traceback".
+    :param limit: Number of entries.
+    :return: Statistics, largest first.
+    :raises KeyError: if the snapshot is unknown.
+    """
+    stats = snapshots.get(snapshot_id).statistics(group_by)
+    return [_stat_dict(s) for s in stats[:limit]]
+
+
+def diff_allocations(
+    older_id: int, newer_id: int, group_by: str = "lineno", limit: int = 20
+) -> List[dict]:
+    """
+    Return the allocation sites that grew (or shrank) most between two snapshots.
+
+    :param older_id: Id of the earlier snapshot.
+    :param newer_id: Id of the later snapshot.
+    :param group_by: "lineno", "filename" or "traceback".
+    :param limit: Number of entries.
+    :return: Differences, largest absolute change first.
+    :raises KeyError: if a snapshot is unknown.
+    """
+    stats = snapshots.get(newer_id).compare_to(snapshots.get(older_id), group_by)
+    return [_stat_dict(s) for s in stats[:limit]]
+
+
+def heap_summary() -> Dict[str, object]:
+    """
+    Summarize live objects that commonly pile up in a long-running worker.
+
+    Scans every object tracked by the garbage collector, so it takes a moment
+    on a large heap.
+
+    :return: Dict with ORM instance counts per model (and how many are still
+        attached to a session), live sessions, Jinja cache entries and peak RSS.
+    """
+    models = {m.class_: m.class_.__name__ for m in db.Model.registry.mappers}
+    instances: Dict[str, Dict[str, int]] = {
+        name: {"live": 0, "in_session": 0} for name in models.values()
+    }
+    sessions = 0
+    for obj in gc.get_objects():
+        name = models.get(type(obj))
+        if name is not None:
+            instances[name]["live"] += 1
+            if inspect(obj).session_id is not None:
+                instances[name]["in_session"] += 1
+        elif isinstance(obj, Session):
+            sessions += 1
+
+    jinja_cache = current_app.jinja_env.cache
+    max_rss_kb = None
+    if resource is not None:
+        max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "pid": os.getpid(),
+        "instances": instances,
+        "sessions": sessions,
+        "jinja_cached_templates": len(jinja_cache) if jinja_cache is not None else 0,
+        "gc_counts": gc.get_count(),
+        "max_rss_kb": max_rss_kb,
+        "traced_kb": round(tracemalloc.get_traced_memory()[0] / 1024, 1),
+    }
+
+
+def _track_request() -> None:
+    """Remember the traced size at the start of the request and reset the peak."""
+    tracemalloc.reset_peak()
+    g.diagnostics_start = tracemalloc.get_traced_memory()[0]
+
+
+def _report_request(response: Response) -> Response:
+    """Log the request's peak allocation once its response has been sent."""
+    start: Optional[int] = g.get("diagnostics_start")
+    if start is None:
+        return response
+    threshold = current_app.config["DIAGNOSTICS_LOG_PEAK_KB"] * 1024
+    label = f"{request.method} {request.path}"
+
+    def report() -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        if peak - start >= threshold:
+            logger.info(
+                "%s: peak +%.1f KB, retained %+.1f KB",
+                label,
+                (peak - start) / 1024,
+                (current - start) / 1024,
+            )
+
+    response.call_on_close(report)
+    return response
+
+
+def init_diagnostics(app: Flask) -> None:
+    """
+    Start allocation tracing and per-request tracking if diagnostics are enabled.
+
+    The tracemalloc peak is per process: with several threads per worker,
+    a request's peak includes allocations of requests running alongside it.
+
+    :param app: Flask application instance.
+    """
+    if not app.config.get("DIAGNOSTICS_ENABLED"):
+        return
+    snapshots.limit = app.config["DIAGNOSTICS_MAX_SNAPSHOTS"]
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(app.config["DIAGNOSTICS_TRACE_FRAMES"])
+    app.before_request(_track_request)
+    app.after_request(_report_request)
+
+
+# Snapshots of this worker process (a forked worker starts without any)
+snapshots = SnapshotStore()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=snapshots.clear)
@@ -1,16 +1,30 @@
 # File: app/events.py
 """
 Purpose:
-    Enable SQLite foreign key support on each new database connection.
+    Enable SQLite foreign key support on each new database connection, hide
+    soft-deleted rows from ORM queries and feed connection pool activity into
+    the pool statistics.
 
 Features:
     - Listens for SQLAlchemy Engine "connect" events
     - Executes PRAGMA to turn on foreign key enforcement in SQLite
+    - Requests incremental auto-vacuum, which new SQLite files are created with
+      (existing files are converted by app.data.migrate_soft_delete)
+    - Listens for Session "do_orm_execute" events and adds `deleted_at IS NULL`
+      for users and shelf entries, unless the statement sets the
+      `include_deleted` execution option
+    - Listens for Pool "checkout", "checkin" and "invalidate" events
+    - Records connections in use and invalidations in app.pool.pool_stats
 
 Required Modules:
     - logging: application logging
+    - sqlite3: detect SQLite DBAPI connections
     - sqlalchemy.event: event listener registration
-    - sqlalchemy.engine.Engine: target for event
+    - sqlalchemy.engine.Engine: target for connect events
+    - sqlalchemy.pool.Pool: target for pool events
+    - sqlalchemy.orm: Session events and loader criteria
+    - app.models: soft-deleted User and Movie models
+    - app.pool.pool_stats: per-process pool statistics
 
 Author:
     Martin Haferanke
@@ -19,8 +33,18 @@ Date:
     2025-07-18
 """
 import logging
+import sqlite3
+
 from sqlalchemy import event
 from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+from sqlalchemy.pool import Pool
+
+from app.models import Movie, User
+from app.pool import pool_stats
+
+# Execution option that lets a statement see soft-deleted rows (undo, purge)
+INCLUDE_DELETED: str = "include_deleted"
 
 # Module-level logger
 logger = logging.getLogger(__name__)
@@ -31,15 +55,100 @@ def _enable_sqlite_fk(dbapi_con, con_record) -> None:
     """
     Enable SQLite foreign key constraint enforcement on new DBAPI connections.
 
+    Connections to other backends are left untouched.
+
     :param dbapi_con: DBAPI connection object
     :param con_record: Connection record (unused)
     :raises Exception: if PRAGMA execution fails
     """
+    if not isinstance(dbapi_con, sqlite3.Connection):
+        return
     try:
         cursor = dbapi_con.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
-        logger.info("SQLite foreign key enforcement enabled.")
+        logger.debug("SQLite foreign key enforcement enabled.")
     except Exception as e:
         logger.exception("Failed to enable SQLite foreign keys: %s", e)
         raise
+
+
+@event.listens_for(Engine, "connect")
+def _request_incremental_vacuum(dbapi_con, con_record) -> None:
+    """
+    Ask SQLite for incremental auto-vacuum on new DBAPI connections.
+
+    The setting only takes effect when a database file is created (or after a
+    full VACUUM); on existing files it is a no-op. Read-only connections (the
+    read engine) refuse it while the file is still empty, which is ignored.
+
+    :param dbapi_con: DBAPI connection object
+    :param con_record: Connection record (unused)
+    """
+    if not isinstance(dbapi_con, sqlite3.Connection):
+        return
+    cursor = dbapi_con.cursor()
+    try:
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    except sqlite3.OperationalError:
+        logger.debug("Incremental auto-vacuum not requested (read-only connection).")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _hide_deleted(state: ORMExecuteState) -> None:
+    """
+    Restrict ORM selects to users and shelf entries that are not soft-deleted.
+
+    Applies to every occurrence of the models in the statement, including
+    joins, subqueries and lazy loads.
+
+    :param state: ORM execution state of the statement
+    """
+    if (
+        not state.is_select
+        or state.is_column_load
+        or state.execution_options.get(INCLUDE_DELETED, False)
+    ):
+        return
+    state.statement = state.statement.options(
+        with_loader_criteria(User, User.deleted_at.is_(None), include_aliases=True),
+        with_loader_criteria(Movie, Movie.deleted_at.is_(None), include_aliases=True),
+    )
+
+
+@event.listens_for(Pool, "checkout")
+def _track_checkout(dbapi_con, con_record, con_proxy) -> None:
+    """
+    Count a connection leaving the pool.
+
+    :param dbapi_con: DBAPI connection object
+    :param con_record: Connection record (unused)
+    :param con_proxy: Pooled connection proxy (unused)
+    """
+    pool_stats.record_checkout()
+
+
+@event.listens_for(Pool, "checkin")
+def _track_checkin(dbapi_con, con_record) -> None:
+    """
+    Count a connection returning to the pool.
+
+    :param dbapi_con: DBAPI connection object (None if it was invalidated)
+    :param con_record: Connection record (unused)
+    """
+    pool_stats.record_checkin()
+
+
+@event.listens_for(Pool, "invalidate")
+def _track_invalidate(dbapi_con, con_record, exception) -> None:
+    """
+    Count and log a connection dropped after an error or failed pre-ping.
+
+    :param dbapi_con: DBAPI connection object
+    :param con_record: Connection record (unused)
+    :param exception: Exception that caused the invalidation, if any
+    """
+    pool_stats.record_invalidate()
+    logger.warning("Database connection invalidated: %s", exception)
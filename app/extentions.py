@@ -4,7 +4,7 @@ Purpose:
     Initialize and configure common Flask extensions for the application.
 
 Features:
-    - SQLAlchemy for ORM and database session management
+    - SQLAlchemy for ORM and database session management, with read/write routing
     - Flask-Limiter for rate limiting based on client IP
 
 Author: Martin Haferanke
@@ -14,7 +14,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-db = SQLAlchemy()
+from app.routing import RoutingSession
+
+# Sessions route replica-safe reads to the "read" bind (see app/routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # Rate limiter using client IP as key function
 limiter = Limiter(key_func=get_remote_address)
@@ -0,0 +1,229 @@
+# File: app/idempotency.py
+"""
+Purpose:
+    Make repeated submissions of the same change safe: a retried or
+    double-submitted POST carrying the same idempotency key gets the stored
+    response of the first one instead of running the change again.
+
+Features:
+    - Keys come from the `Idempotency-Key` header or an `idempotency_key`
+      form field (added to every POST by main.js)
+    - Applies to the mutating routes of protected blueprints (users)
+    - Checked before any other request hook, so a replay never touches the
+      database (not even the shard directory): one dictionary lookup
+    - TTL- and size-bounded store of recent keys, oldest dropped first
+    - A duplicate arriving while the first request is still running waits
+      for its response (up to IDEMPOTENCY_WAIT_SECONDS, then 409)
+    - A key reused for a different request body answers 422
+    - Server errors (5xx) are not stored, so the client may retry them
+    - Replays are marked with `Idempotent-Replayed: true`
+
+Required Modules:
+    - collections.OrderedDict: insertion-ordered key store
+    - hashlib: request fingerprints
+    - threading: store lock and in-flight waits
+    - flask: request hooks and responses
+
+Exceptions:
+    - Answers 400 for keys longer than MAX_KEY_LENGTH
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set, Tuple
+
+from flask import Blueprint, Flask, Response, g, jsonify, request
+
+HEADER: str = "Idempotency-Key"
+FORM_FIELD: str = "idempotency_key"
+MAX_KEY_LENGTH: int = 255
+
+# Methods that change state; safe methods are never deduplicated
+MUTATING_METHODS: frozenset = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+
+
+class _Entry:
+    """A key's request fingerprint and, once finished, its response."""
+
+    __slots__ = ("fingerprint", "expires", "response", "done")
+
+    def __init__(self, fingerprint: str, expires: float) -> None:
+        self.fingerprint = fingerprint
+        self.expires = expires
+        self.response: Optional[Tuple[bytes, int, list]] = None
+        self.done = threading.Event()
+
+
+class IdempotencyStore:
+    """
+    Per-process store of recent idempotency keys and their responses.
+
+    Entries expire `ttl` seconds after the first request; all entries share
+    the TTL, so the oldest is always first in line to expire.
+    """
+
+    def __init__(self, ttl: int = 300, max_keys: int = 10000, wait: float = 5.0):
+        """
+        Initialize an empty store.
+
+        :param ttl: Seconds a key is remembered.
+        :param max_keys: Keys kept at most (oldest dropped first).
+        :param wait: Seconds a duplicate waits for the first request to finish.
+        """
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.wait = wait
+        self.enabled = False
+        self.blueprints: Set[str] = set()
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read store settings from the app config and install the request hooks.
+
+        Must run before other before_request hooks are registered, so replays
+        are answered before any of them can touch the database.
+
+        :param app: Flask application instance.
+        """
+        self.ttl = app.config.get("IDEMPOTENCY_TTL_SECONDS", self.ttl)
+        self.max_keys = app.config.get("IDEMPOTENCY_MAX_KEYS", self.max_keys)
+        self.wait = app.config.get("IDEMPOTENCY_WAIT_SECONDS", self.wait)
+        self.enabled = app.config.get("IDEMPOTENCY_ENABLED", True)
+        app.extensions["idempotency"] = self
+        if not self.enabled:
+            return
+        app.before_request(self._replay)
+        app.after_request(self._store)
+        app.teardown_request(self._release)
+
+    def protect(self, blueprint: Blueprint) -> None:
+        """
+        Deduplicate the mutating routes of a blueprint.
+
+        :param blueprint: Blueprint whose POST/PUT/PATCH/DELETE routes accept keys.
+        """
+        self.blueprints.add(blueprint.name)
+
+    def claim(self, scope: str, fingerprint: str) -> Tuple[_Entry, bool]:
+        """
+        Return the entry of a key, creating it if the key is new.
+
+        :param scope: Key qualified by method and path.
+        :param fingerprint: Hash of the request body.
+        :return: Tuple of (entry, True if this request runs the change).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(scope)
+            if entry is not None and entry.expires > now:
+                return entry, False
+            entry = _Entry(fingerprint, now + self.ttl)
+            self._entries[scope] = entry
+            self._entries.move_to_end(scope)
+            self._evict(now)
+        return entry, True
+
+    def finish(self, scope: str, entry: _Entry, response: Optional[Response]) -> None:
+        """
+        Store the response of a key (or forget the key) and wake waiting duplicates.
+
+        :param scope: Key qualified by method and path.
+        :param entry: Entry returned by `claim`.
+        :param response: Response to replay, or None to let the key be retried.
+        """
+        if response is None:
+            with self._lock:
+                if self._entries.get(scope) is entry:
+                    del self._entries[scope]
+        else:
+            entry.response = (
+                response.get_data(),
+                response.status_code,
+                list(response.headers),
+            )
+        entry.done.set()
+
+    def clear(self) -> None:
+        """Forget all keys."""
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries and the oldest beyond `max_keys` (lock held)."""
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.expires > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    def _applies(self) -> bool:
+        """Return whether the current request is a deduplicated mutation."""
+        return (
+            request.method in MUTATING_METHODS and request.blueprint in self.blueprints
+        )
+
+    def _replay(self) -> Optional[Response]:
+        """Claim the request's key, or answer with the response stored for it."""
+        if not self._applies():
+            return None
+        key = request.headers.get(HEADER) or request.form.get(FORM_FIELD)
+        if not key:
+            return None
+        if len(key) > MAX_KEY_LENGTH:
+            return _error(f"{HEADER} is longer than {MAX_KEY_LENGTH} characters.", 400)
+
+        scope = f"{request.method} {request.path} {key}"
+        fingerprint = _fingerprint()
+        entry, owner = self.claim(scope, fingerprint)
+        if owner:
+            g.idempotency = (scope, entry)
+            return None
+        if entry.fingerprint != fingerprint:
+            return _error(f"{HEADER} was already used for a different request.", 422)
+        if not entry.done.wait(self.wait) or entry.response is None:
+            response = _error("The original request is still in progress.", 409)
+            response.headers["Retry-After"] = "1"
+            return response
+        body, status, headers = entry.response
+        response = Response(body, status=status, headers=headers)
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def _store(self, response: Response) -> Response:
+        """Keep the response of a claimed key for replays (server errors excepted)."""
+        claimed = g.pop("idempotency", None)
+        if claimed is not None:
+            keep = response.status_code < 500 and not response.is_streamed
+            self.finish(*claimed, response if keep else None)
+        return response
+
+    def _release(self, exc: Optional[BaseException]) -> None:
+        """Forget a key whose request ended without a response being stored."""
+        claimed = g.pop("idempotency", None)
+        if claimed is not None:
+            self.finish(*claimed, None)
+
+
+def _fingerprint() -> str:
+    """Return a hash of the request's form fields (the key itself excluded)."""
+    fields = sorted(
+        (k, v) for k, v in request.form.items(multi=True) if k != FORM_FIELD
+    )
+    return hashlib.sha256(repr(fields).encode()).hexdigest()
+
+
+def _error(message: str, status: int) -> Response:
+    """Return a JSON error response."""
+    response = jsonify(error=message)
+    response.status_code = status
+    return response
+
+
+# Shared per-process store; bound to the app in create_app
+idempotency = IdempotencyStore()
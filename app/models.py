@@ -3,16 +3,24 @@
 """
 Purpose:
 Defines SQLAlchemy models for Users and Movies in the MoviWeb application.
-Establishes a one-to-many relationship: each Movie belongs to exactly one User.
+Film details live once in a shared catalogue; each Movie is a thin link between
+a User and a CatalogEntry.
 
 Features:
-- User model: stores a unique id and name, and has a collection of movies.
-- Movie model: stores a unique id, title, director, release year, poster URL, and a foreign key to User.
+- User model: stores a unique id, name and shelf version, and has a collection of movies.
+- CatalogEntry model: stores film details once per film, keyed by imdbID or normalized title.
+- Movie model: links a User to a CatalogEntry and proxies the film details.
+- ReferenceTitle model: offline catalogue loaded from bulk dataset dumps for local title lookups.
+- ShardDirectory model: maps each user to the shard holding their shelf (when sharding is on).
+- ShelfEvent model: recent shelf changes, polled by every worker for the live change feed.
+- Users and shelf entries are soft-deleted (`deleted_at`); partial indexes cover
+  live rows for reads and tombstones for the purger (see app.services.purger).
 
 Author: Martin Haferanke
 Date: 2025-07-14
 """
 from .extentions import db
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import backref
 
 
@@ -28,14 +36,30 @@ class User(db.Model):
 
     :ivar id: Unique identifier for the user.
     :ivar name: Name of the user.
+    :ivar shelf_version: Counter bumped on every change to the user or their shelf.
+    :ivar deleted_at: Unix time of deletion; set until the purger removes the row.
     :ivar movies: Collection of movies associated with the user.
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        db.Index(
+            "ix_users_deleted_at",
+            "deleted_at",
+            sqlite_where=db.text("deleted_at IS NOT NULL"),
+            postgresql_where=db.text("deleted_at IS NOT NULL"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
 
+    # Bumped by DataManager on every shelf change; drives API ETags
+    shelf_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Soft delete: hidden from every query (see app.events), purged after the undo window
+    deleted_at = db.Column(db.Float, nullable=True)
+
     # Define one-to-many relationship: one User can have many Movies
     movies = db.relationship(
         "Movie",
@@ -51,34 +75,202 @@ class User(db.Model):
         return self.name
 
 
-class Movie(db.Model):
+class CatalogEntry(db.Model):
     """
-    Represents a movie record in the database.
+    Represents a film in the shared movie catalogue.
 
-    This class maps to the "movies" table in the database. It stores information
-    about a movie, including its name, director, release year, and an optional
-    URL for its poster. Each movie is associated with a user, establishing a
-    relationship via the `user_id` attribute. The class also provides string
-    representations for debugging and display purposes.
+    Film details are stored once per film and shared by every user who has it
+    on their shelf. Entries are matched by IMDb id when OMDb provided one, and
+    by normalized title otherwise.
 
-    :ivar id: The unique identifier for the movie.
+    :ivar id: The unique identifier for the catalogue entry.
+    :ivar imdb_id: The IMDb id reported by OMDb (if known).
+    :ivar title_key: Normalized title used for lookups and deduplication.
     :ivar name: The name/title of the movie.
     :ivar director: The director of the movie.
     :ivar year: The release year of the movie.
     :ivar poster_url: The URL of the movie poster (if provided).
-    :ivar user_id: The id of the user associated with this movie.
+    :ivar plot: Short plot summary (if provided).
     """
 
-    __tablename__ = "movies"
+    __tablename__ = "catalog"
 
     id = db.Column(db.Integer, primary_key=True)
+    imdb_id = db.Column(db.String, unique=True, nullable=True)
+    title_key = db.Column(db.String, nullable=False, index=True)
     name = db.Column(db.String, nullable=False)
     director = db.Column(db.String, nullable=False)
     year = db.Column(db.Integer, nullable=False)
     poster_url = db.Column(db.String, nullable=True)
+    plot = db.Column(db.String, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<CatalogEntry id={self.id} name='{self.name}'>"
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.year}) by {self.director}"
+
+
+class ReferenceTitle(db.Model):
+    """
+    Represents a film in the offline reference catalogue.
+
+    Rows are bulk-loaded from public dataset dumps (see
+    `app.data.ingest_catalogue`) and let title lookups resolve locally.
+    Poster and plot are not part of the dumps; they are filled in from OMDb
+    the first time a film is looked up.
+
+    :ivar imdb_id: The IMDb id (primary key).
+    :ivar title_key: Normalized title used for lookups.
+    :ivar name: The name/title of the movie.
+    :ivar year: The release year of the movie (if known).
+    :ivar director: The (first) director of the movie (if known).
+    :ivar votes: Number of IMDb votes; ranks films sharing a title.
+    :ivar poster_url: The URL of the movie poster (filled from OMDb; "" if none).
+    :ivar plot: Short plot summary (filled from OMDb; "" if none).
+    """
+
+    __tablename__ = "reference_titles"
+    __table_args__ = (
+        db.Index("ix_reference_titles_title_key_votes", "title_key", "votes"),
+    )
+
+    imdb_id = db.Column(db.String, primary_key=True)
+    title_key = db.Column(db.String, nullable=False)
+    name = db.Column(db.String, nullable=False)
+    year = db.Column(db.Integer, nullable=True)
+    director = db.Column(db.String, nullable=True)
+    votes = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    poster_url = db.Column(db.String, nullable=True)
+    plot = db.Column(db.String, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<ReferenceTitle imdb_id={self.imdb_id} name='{self.name}'>"
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.year})"
+
+
+class ShardDirectory(db.Model):
+    """
+    Represents the shard assignment of a user.
+
+    Lives on the primary database and hands out user ids, so ids stay unique
+    across shards. Only used when SHARD_COUNT is set (see `app.sharding`).
+
+    :ivar user_id: The id of the user (allocated here, reused on the shard).
+    :ivar shard: The number of the shard holding the user's shelf.
+    :ivar locked: True while the rebalancer moves the user to another shard.
+    """
 
-    # Link this Movie to its owning User
+    __tablename__ = "shard_directory"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    shard = db.Column(db.Integer, nullable=False, index=True)
+    locked = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
+
+    def __repr__(self) -> str:
+        return f"<ShardDirectory user_id={self.user_id} shard={self.shard}>"
+
+
+class ShelfEvent(db.Model):
+    """
+    Represents one change to a user's shelf, kept for a few minutes.
+
+    Written after each shelf change and polled by every worker process, so
+    live-update subscribers are notified whichever worker made the change
+    (see `app.services.change_feed`).
+
+    :ivar id: Increasing event id; doubles as the SSE event id.
+    :ivar user_id: The id of the user whose shelf changed.
+    :ivar kind: "added", "updated" or "removed".
+    :ivar movie_id: The id of the changed shelf entry.
+    :ivar payload: JSON card fields (name, director, year, poster_url), if any.
+    :ivar created_at: Unix time of the change; old events are pruned.
+    """
+
+    __tablename__ = "shelf_events"
+    # Never reuse ids of pruned events: clients resume from the last id they saw
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String, nullable=False)
+    movie_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.Float, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<ShelfEvent id={self.id} user_id={self.user_id} kind='{self.kind}'>"
+
+
+class Movie(db.Model):
+    """
+    Represents a movie on a user's shelf.
+
+    This class maps to the "user_movies" link table. It only stores which
+    catalogue entry is on which user's shelf; the film details (name, director,
+    year, poster URL) are read through the linked `CatalogEntry`, which is
+    loaded in the same query.
+
+    :ivar id: The unique identifier for the shelf entry.
+    :ivar user_id: The id of the user associated with this movie.
+    :ivar catalog_id: The id of the linked catalogue entry.
+    :ivar deleted_at: Unix time of deletion; set until the purger removes the row.
+    :ivar entry: The linked CatalogEntry.
+    :ivar name: The name/title of the movie (proxied).
+    :ivar director: The director of the movie (proxied).
+    :ivar year: The release year of the movie (proxied).
+    :ivar poster_url: The URL of the movie poster (proxied).
+    """
+
+    __tablename__ = "user_movies"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "catalog_id"),
+        # Live shelves in id order, and the holders of a catalogue entry
+        db.Index(
+            "ix_user_movies_user_live",
+            "user_id",
+            "id",
+            sqlite_where=db.text("deleted_at IS NULL"),
+            postgresql_where=db.text("deleted_at IS NULL"),
+        ),
+        db.Index(
+            "ix_user_movies_catalog_live",
+            "catalog_id",
+            sqlite_where=db.text("deleted_at IS NULL"),
+            postgresql_where=db.text("deleted_at IS NULL"),
+        ),
+        # Tombstones only, for the purger
+        db.Index(
+            "ix_user_movies_deleted_at",
+            "deleted_at",
+            sqlite_where=db.text("deleted_at IS NOT NULL"),
+            postgresql_where=db.text("deleted_at IS NOT NULL"),
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Link this Movie to its owning User and its catalogue entry
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    catalog_id = db.Column(db.Integer, db.ForeignKey("catalog.id"), nullable=False)
+    deleted_at = db.Column(db.Float, nullable=True)
+    entry = db.relationship("CatalogEntry", lazy="joined", innerjoin=True)
+
+    # Film details read from (and, for new shelf entries, staged on) the catalogue
+    name = association_proxy("entry", "name", creator=lambda v: CatalogEntry(name=v))
+    director = association_proxy(
+        "entry", "director", creator=lambda v: CatalogEntry(director=v)
+    )
+    year = association_proxy("entry", "year", creator=lambda v: CatalogEntry(year=v))
+    poster_url = association_proxy(
+        "entry", "poster_url", creator=lambda v: CatalogEntry(poster_url=v)
+    )
+    plot = association_proxy("entry", "plot", creator=lambda v: CatalogEntry(plot=v))
+    imdb_id = association_proxy(
+        "entry", "imdb_id", creator=lambda v: CatalogEntry(imdb_id=v)
+    )
 
     def __repr__(self) -> str:
         return f"<Movie id={self.id} name='{self.name}'>"
@@ -0,0 +1,211 @@
+# File: app/pool.py
+"""
+Purpose:
+    Choose SQLAlchemy engine/pool options per database backend and record how
+    long requests wait for a pooled connection.
+
+Features:
+    - build_engine_options: pool settings for SQLite files, SQLite :memory: and server databases
+    - MonitoredQueuePool: QueuePool that times every checkout, including waits on an exhausted pool
+    - PoolStats: thread-safe checkout wait histogram, in-use counts and slow-checkout logging
+    - pool_stats: per-process statistics shared by the pool and the pool event hooks
+
+Required Modules:
+    - logging: slow checkout warnings
+    - threading: guard the statistics
+    - time: checkout timing
+    - sqlalchemy.pool: pool classes
+    - sqlalchemy.engine.make_url: backend detection
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is open
+WAIT_BUCKETS_MS: List[float] = [1, 5, 10, 50, 100, 500, 1000, 5000]
+
+
+class PoolStats:
+    """
+    Per-process connection pool statistics.
+
+    Checkout waits go into a fixed-bucket histogram so recording stays O(log b)
+    and memory stays constant regardless of traffic.
+    """
+
+    def __init__(self, slow_checkout_ms: float = 100.0) -> None:
+        """
+        Initialize empty statistics.
+
+        :param slow_checkout_ms: Waits above this many milliseconds are logged.
+        """
+        self.slow_checkout_ms = slow_checkout_ms
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all counters."""
+        with self._lock:
+            self.checkouts = 0
+            self.checked_out = 0
+            self.invalidated = 0
+            self.timeouts = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False) -> None:
+        """
+        Record the time one checkout spent waiting for a connection.
+
+        :param wait_ms: Wait in milliseconds.
+        :param timed_out: True if the checkout gave up after pool_timeout.
+        """
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            if timed_out:
+                self.timeouts += 1
+        if wait_ms > self.slow_checkout_ms:
+            logger.warning(
+                "Slow connection checkout: waited %.1f ms%s.",
+                wait_ms,
+                " and timed out" if timed_out else "",
+            )
+
+    def record_checkout(self) -> None:
+        """Count a connection handed out by any pool."""
+        with self._lock:
+            self.checked_out += 1
+
+    def record_checkin(self) -> None:
+        """Count a connection returned to any pool."""
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def record_invalidate(self) -> None:
+        """Count a connection invalidated after an error or failed pre-ping."""
+        with self._lock:
+            self.invalidated += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return the current statistics as a JSON-serializable dict.
+
+        :return: Counters, mean/max wait and the wait histogram keyed by bucket bound.
+        """
+        with self._lock:
+            labels = [f"<={b:g}ms" for b in WAIT_BUCKETS_MS] + [
+                f">{WAIT_BUCKETS_MS[-1]:g}ms"
+            ]
+            return {
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "invalidated": self.invalidated,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": (
+                    self.total_wait_ms / self.checkouts if self.checkouts else 0.0
+                ),
+                "max_wait_ms": self.max_wait_ms,
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+# Shared per-process statistics; fed by MonitoredQueuePool and app.events
+pool_stats = PoolStats()
+
+
+class MonitoredQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited.
+
+    Pool recreation on `engine.dispose()` keeps the class, so forked workers
+    stay instrumented.
+    """
+
+    def connect(self):
+        """Check out a connection, recording the wait in `pool_stats`."""
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            pool_stats.record_wait((time.perf_counter() - started) * 1000, True)
+            raise
+        pool_stats.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def build_engine_options(
+    uri: str,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30,
+    pool_recycle: int = 1800,
+    pool_pre_ping: bool = True,
+) -> Dict[str, object]:
+    """
+    Return `SQLALCHEMY_ENGINE_OPTIONS` suited to the database behind `uri`.
+
+    - SQLite :memory: uses one shared connection (StaticPool); the database
+      only exists as long as that connection.
+    - SQLite files use NullPool; opening a file is cheap and avoids sharing
+      connections across threads and forked workers.
+    - Server databases use a monitored QueuePool with the given sizing,
+      pre-ping and recycling.
+
+    :param uri: SQLAlchemy database URI.
+    :param pool_size: Persistent connections per worker.
+    :param max_overflow: Extra connections allowed under burst load.
+    :param pool_timeout: Seconds to wait for a connection before failing.
+    :param pool_recycle: Seconds after which connections are replaced.
+    :param pool_pre_ping: Test connections on checkout.
+    :return: Engine keyword arguments.
+    """
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return {
+                "poolclass": StaticPool,
+                "connect_args": {"check_same_thread": False},
+            }
+        return {"poolclass": NullPool}
+
+    return {
+        "poolclass": MonitoredQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": pool_timeout,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+    }
+
+
+def pool_status(engine) -> Dict[str, object]:
+    """
+    Describe the live state of an engine's pool.
+
+    :param engine: SQLAlchemy engine.
+    :return: Pool class and, for queue pools, size/checked-out/overflow counts.
+    """
+    pool = engine.pool
+    status: Dict[str, object] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return status
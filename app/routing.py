@@ -0,0 +1,201 @@
+# File: app/routing.py
+"""
+Purpose:
+    Route read-only queries to a separate read engine (replica or read-only
+    SQLite connection pool) while writes stay on the primary database, and
+    route per-user tables to the user's shard when sharding is enabled.
+
+Features:
+    - RoutingSession: db.session class that sends SELECTs to the "read" bind inside read_replica()
+      and queries on sharded tables to the shard selected with use_shard()
+    - read_replica: context manager marking a block of queries as replica-safe
+    - Read-your-writes: once a session has flushed, and for a short window after
+      a client's last write, every query goes to the primary
+    - read_only_uri: derive a read-only SQLite URI (mode=ro) from the primary URI
+    - use_shard / set_shard / shard_bind_key: select the shard engine for sharded tables
+    - init_routing: request hooks that carry the read-your-writes window in a cookie
+
+Required Modules:
+    - time: read-your-writes window
+    - contextlib.contextmanager: read_replica helper
+    - flask: request hooks and cookie handling
+    - flask_sqlalchemy.session.Session: base session with bind-key support
+    - sqlalchemy: URL parsing, Select detection, session events
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from flask import Flask, Response, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+# Bind key of the read engine in SQLALCHEMY_BINDS
+READ_BIND_KEY: str = "read"
+
+# Bind keys of shard engines are SHARD_BIND_PREFIX + shard number
+SHARD_BIND_PREFIX: str = "shard_"
+
+# Tables that live in the user's shard when sharding is enabled
+SHARDED_TABLES: frozenset = frozenset({"users", "catalog", "user_movies"})
+
+# Session.info flags
+_ROUTE_READS: str = "route_reads"
+_PRIMARY_ONLY: str = "primary_only"
+_WROTE: str = "wrote"
+_SHARD: str = "shard"
+
+# Cookie marking a client that wrote recently and must read from the primary
+RYW_COOKIE: str = "cineshelf_rw"
+
+
+class RoutingSession(Session):
+    """
+    Session that picks the read engine for replica-safe SELECTs.
+
+    Inside `use_shard()`, statements on the sharded tables go to that shard's
+    engine. Otherwise a query goes to the read bind only if it runs inside
+    `read_replica()`, is a plain SELECT, the session has no pending or flushed
+    changes, and the current client is outside its read-your-writes window.
+    Everything else uses the normal bind-key resolution (the primary).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Return the shard, read or primary engine for a statement."""
+        shard = self.info.get(_SHARD)
+        if (
+            bind is None
+            and shard is not None
+            and mapper is not None
+            and mapper.local_table.name in SHARDED_TABLES
+        ):
+            return self._db.engines[shard_bind_key(shard)]
+        if (
+            bind is None
+            and self.info.get(_ROUTE_READS)
+            and not self.info.get(_PRIMARY_ONLY)
+            and not self._flushing
+            and not (self.new or self.dirty or self.deleted)
+            and (clause is None or isinstance(clause, Select))
+        ):
+            engine = self._db.engines.get(READ_BIND_KEY)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context) -> None:
+    """
+    Send every later query of this session to the primary once it has written.
+
+    :param session: Session that flushed
+    :param flush_context: Flush context (unused)
+    """
+    session.info[_PRIMARY_ONLY] = True
+    session.info[_WROTE] = True
+
+
+@contextmanager
+def read_replica(db) -> Iterator[None]:
+    """
+    Let the queries issued inside the block run on the read engine.
+
+    Without a configured read bind this is a no-op and queries use the primary.
+
+    :param db: Flask-SQLAlchemy instance
+    """
+    session = db.session()
+    previous = session.info.get(_ROUTE_READS)
+    session.info[_ROUTE_READS] = True
+    try:
+        yield
+    finally:
+        session.info[_ROUTE_READS] = previous
+
+
+def shard_bind_key(shard: int) -> str:
+    """
+    Return the SQLALCHEMY_BINDS key of a shard.
+
+    :param shard: Shard number
+    :return: Bind key, e.g. "shard_0"
+    """
+    return f"{SHARD_BIND_PREFIX}{shard}"
+
+
+def set_shard(db, shard: Optional[int]) -> Optional[int]:
+    """
+    Send the session's statements on sharded tables to the given shard.
+
+    :param db: Flask-SQLAlchemy instance
+    :param shard: Shard number, or None for the primary database
+    :return: The previously selected shard
+    """
+    info = db.session().info
+    previous = info.get(_SHARD)
+    info[_SHARD] = shard
+    return previous
+
+
+@contextmanager
+def use_shard(db, shard: Optional[int]) -> Iterator[None]:
+    """
+    Send the block's statements on sharded tables to the given shard.
+
+    :param db: Flask-SQLAlchemy instance
+    :param shard: Shard number, or None for the primary database
+    """
+    previous = set_shard(db, shard)
+    try:
+        yield
+    finally:
+        set_shard(db, previous)
+
+
+def read_only_uri(uri: str) -> Optional[str]:
+    """
+    Derive a read-only SQLite URI for the same database file.
+
+    :param uri: Primary SQLAlchemy database URI
+    :return: `sqlite:///file:<path>?mode=ro&uri=true`, or None for other backends and :memory:
+    """
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return f"sqlite:///file:{url.database}?mode=ro&uri=true"
+
+
+def init_routing(app: Flask, db) -> None:
+    """
+    Install request hooks for the read-your-writes window.
+
+    Clients that wrote within READ_YOUR_WRITES_SECONDS carry a cookie; their
+    requests read from the primary so a lagging replica never hides their
+    own changes (e.g. on the redirect back to the home page).
+
+    :param app: Flask application instance
+    :param db: Flask-SQLAlchemy instance
+    """
+    window: int = app.config.get("READ_YOUR_WRITES_SECONDS", 5)
+
+    @app.before_request
+    def _pin_recent_writers() -> None:
+        """Route all reads of a recent writer to the primary."""
+        written_at = request.cookies.get(RYW_COOKIE, type=float)
+        if written_at and time.time() - written_at < window:
+            db.session().info[_PRIMARY_ONLY] = True
+
+    @app.after_request
+    def _mark_writers(response: Response) -> Response:
+        """Start the read-your-writes window after a request that wrote."""
+        if db.session().info.get(_WROTE):
+            response.set_cookie(
+                RYW_COOKIE, str(time.time()), max_age=window, httponly=True
+            )
+        return response
@@ -0,0 +1,123 @@
+# File: app/services/batch_add.py
+"""
+Purpose:
+    Resolve a pasted list of movie titles concurrently for the batch-add flow.
+
+Features:
+    - parse_titles: one title per line, blank lines and repeats removed, capped
+    - resolve_titles: catalogue / OMDb lookups on a bounded thread pool
+    - Per-title status: found, not_found, failed or timed_out (a failed lookup
+      never aborts the rest of the batch)
+    - Overall deadline (BATCH_ADD_DEADLINE_SECONDS, below the gunicorn worker
+      timeout): titles not resolved by then are reported as timed_out
+
+Required Modules:
+    - concurrent.futures: bounded lookup pool and the deadline wait
+    - flask.current_app: application context for worker threads
+    - app.services.data_manager.DataManager: shared catalogue lookups
+    - app.sharding.user_shard: look up the catalogue of the user's shard
+    - app.utils: title normalization and OMDb helpers
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List
+
+from flask import Flask, current_app
+
+from app.extentions import db
+from app.services.data_manager import DataManager
+from app.sharding import user_shard
+from app.utils import fetch_omdb_data, normalize_title, omdb_data_from_entry
+
+
+def parse_titles(raw: str, limit: int) -> List[str]:
+    """
+    Split pasted text into titles, one per line.
+
+    Blank lines and titles repeated within the list (after normalization)
+    are dropped; at most `limit` titles are kept.
+
+    :param raw: Pasted text
+    :param limit: Maximum number of titles
+    :return: Titles in their original order
+    """
+    titles: List[str] = []
+    seen: set[str] = set()
+    for line in raw.splitlines():
+        title = line.strip()
+        key = normalize_title(title)
+        if key and key not in seen:
+            seen.add(key)
+            titles.append(title)
+            if len(titles) >= limit:
+                break
+    return titles
+
+
+def _lookup(app: Flask, user_id: int, title: str) -> dict:
+    """
+    Resolve one title inside its own application context.
+
+    :param app: Flask application (worker threads have no context of their own)
+    :param user_id: ID of the user whose shelf the title is added to
+    :param title: Title as typed by the user
+    :return: Dict with title, status and (if found) OMDb-style data
+    """
+    with app.app_context():
+        try:
+            with user_shard(db, user_id):
+                entry = DataManager(db).find_catalog_entry(title)
+            if entry is not None and entry.imdb_id:
+                data = omdb_data_from_entry(entry)
+            else:
+                data = fetch_omdb_data(title)
+        except Exception:
+            logging.exception("Batch lookup failed for '%s'", title)
+            return {"title": title, "status": "failed", "data": None}
+
+    if not data.get("Title"):
+        return {"title": title, "status": "not_found", "data": None}
+    return {"title": title, "status": "found", "data": data}
+
+
+def resolve_titles(
+    titles: List[str], user_id: int, max_workers: int = 8, deadline: float = 20.0
+) -> List[dict]:
+    """
+    Look up many titles concurrently on a bounded thread pool.
+
+    Lookups still queued at the deadline are cancelled; running ones finish
+    in the background and their results are discarded.
+
+    :param titles: Titles to resolve
+    :param user_id: ID of the user whose shelf the titles are added to
+    :param max_workers: Maximum concurrent lookups (OMDb requests)
+    :param deadline: Seconds all lookups together may take
+    :return: One result dict per title, in input order
+    """
+    if not titles:
+        return []
+    app = current_app._get_current_object()
+    workers = max(1, min(max_workers, len(titles)))
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = [pool.submit(_lookup, app, user_id, title) for title in titles]
+    done, pending = wait(futures, timeout=deadline)
+    pool.shutdown(wait=False, cancel_futures=True)
+    if pending:
+        logging.warning(
+            "Batch lookup deadline of %.0f s passed with %d of %d titles unresolved",
+            deadline,
+            len(pending),
+            len(titles),
+        )
+    return [
+        (
+            future.result()
+            if future in done
+            else {"title": title, "status": "timed_out", "data": None}
+        )
+        for future, title in zip(futures, titles)
+    ]
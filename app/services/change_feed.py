@@ -0,0 +1,341 @@
+# File: app/services/change_feed.py
+"""
+Purpose:
+    Push shelf changes (movie added, updated, removed) to open browser tabs as
+    server-sent events, whichever worker process made the change.
+
+Features:
+    - publish: DataManager writes add their events to the `shelf_events` table
+      in the change's own session, so they commit (or roll back) with it
+    - prune: events older than FEED_RETENTION_SECONDS are deleted by the
+      purger's deferred run (app.services.purger)
+    - Cross-worker channel: one poller thread per worker reads new events from
+      the table while the worker has subscribers, and stops when it has none
+    - Bounded fan-out: each subscriber gets a queue of FEED_QUEUE_SIZE events;
+      a subscriber that falls behind is dropped and told to reload instead of
+      slowing the poller or growing memory
+    - At most FEED_MAX_SUBSCRIBERS open streams per worker (each holds a thread)
+    - Resume after reconnects from Last-Event-ID (or the page's last event id)
+    - Streams end after FEED_STREAM_SECONDS; EventSource reconnects by itself
+
+Required Modules:
+    - json: event payloads
+    - queue, threading: bounded per-subscriber queues and the poller thread
+    - os, time: fork detection, polling and heartbeats
+    - sqlalchemy: event table statements
+    - app.extentions.db: session of the change, primary engine
+    - app.models.ShelfEvent: event table
+
+Exceptions:
+    - SQLAlchemyError: raised by `publish` and `prune`; logged by the poller
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+from flask import Flask
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extentions import db
+from app.models import ShelfEvent
+
+logger = logging.getLogger(__name__)
+
+# Events read from the table per poll
+POLL_BATCH: int = 1000
+
+
+def shelf_event(kind: str, user_id: int, movie_id: int, film=None) -> dict:
+    """
+    Build an event for `ChangeFeed.publish`.
+
+    :param kind: "added", "updated" or "removed"
+    :param user_id: ID of the user whose shelf changed
+    :param movie_id: ID of the changed shelf entry
+    :param film: Movie or CatalogEntry with the card fields (None for removals)
+    :return: Row dict for the `shelf_events` table (without created_at)
+    """
+    payload = None
+    if film is not None:
+        payload = json.dumps(
+            {
+                "name": film.name,
+                "director": film.director,
+                "year": film.year,
+                "poster_url": film.poster_url,
+            }
+        )
+    return {"user_id": user_id, "kind": kind, "movie_id": movie_id, "payload": payload}
+
+
+class Subscription:
+    """
+    One open event stream: a bounded queue of events for one user.
+
+    :ivar user_id: ID of the user whose shelf is watched.
+    :ivar queue: Events waiting to be sent.
+    :ivar overflowed: Set when the queue was full and events were lost.
+    """
+
+    def __init__(self, user_id: int, size: int) -> None:
+        self.user_id = user_id
+        self.queue: "queue.Queue[Row]" = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+
+class ChangeFeed:
+    """
+    Per-process fan-out of shelf change events to SSE subscribers.
+
+    Events travel between workers through the `shelf_events` table: any worker
+    writes them, and every worker with subscribers polls for new ones.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 0.5,
+        queue_size: int = 100,
+        max_subscribers: int = 8,
+        retention: int = 300,
+        stream_seconds: int = 25,
+        heartbeat: int = 10,
+    ) -> None:
+        """
+        Initialize a feed without subscribers.
+
+        :param poll_interval: Seconds between polls of the event table.
+        :param queue_size: Events buffered per subscriber before it is dropped.
+        :param max_subscribers: Open streams allowed in this process.
+        :param retention: Seconds events are kept for resuming clients.
+        :param stream_seconds: Seconds after which a stream ends (clients reconnect).
+        :param heartbeat: Seconds between keep-alive comments on idle streams.
+        """
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.retention = retention
+        self.stream_seconds = stream_seconds
+        self.heartbeat = heartbeat
+
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._count = 0
+        self._poller: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._last_id = 0
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read feed settings from the app config and register the feed.
+
+        :param app: Flask application instance.
+        """
+        self.poll_interval = app.config.get("FEED_POLL_INTERVAL", self.poll_interval)
+        self.queue_size = app.config.get("FEED_QUEUE_SIZE", self.queue_size)
+        self.max_subscribers = app.config.get(
+            "FEED_MAX_SUBSCRIBERS", self.max_subscribers
+        )
+        self.retention = app.config.get("FEED_RETENTION_SECONDS", self.retention)
+        self.stream_seconds = app.config.get("FEED_STREAM_SECONDS", self.stream_seconds)
+        self.heartbeat = app.config.get("FEED_HEARTBEAT_SECONDS", self.heartbeat)
+        app.extensions["change_feed"] = self
+
+    def publish(self, events: List[dict]) -> None:
+        """
+        Add shelf change events to the current session for every worker's subscribers.
+
+        Call before the change's commit: the events are written in the same
+        transaction, so a change is never committed without its events. With
+        sharding the event table stays on the primary and the session commits
+        the shard and the primary together (one after the other).
+
+        :param events: Dicts built with `shelf_event`.
+        :raises SQLAlchemyError: if the insert fails (the caller rolls back).
+        """
+        if not events:
+            return
+        now = time.time()
+        db.session.execute(
+            insert(ShelfEvent), [dict(e, created_at=now) for e in events]
+        )
+
+    def prune(self) -> int:
+        """
+        Delete events older than the retention period.
+
+        :return: Number of deleted events.
+        :raises SQLAlchemyError: if the delete fails.
+        """
+        with db.engine.begin() as conn:
+            return conn.execute(
+                delete(ShelfEvent).where(
+                    ShelfEvent.created_at < time.time() - self.retention
+                )
+            ).rowcount
+
+    def latest_id(self) -> int:
+        """
+        Return the id of the newest event, the starting point for a fresh page.
+
+        :return: Event id (0 if there are none or the lookup failed)
+        """
+        try:
+            with db.engine.connect() as conn:
+                return conn.execute(select(func.max(ShelfEvent.id))).scalar() or 0
+        except SQLAlchemyError:
+            logger.exception("Failed to read the latest shelf event id")
+            return 0
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """
+        Register a stream for a user's shelf changes.
+
+        :param user_id: ID of the user.
+        :return: The subscription, or None if this worker has no free stream slot.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked: threads and subscribers of the parent are gone
+                self._pid, self._poller = os.getpid(), None
+                self._subscribers, self._count = {}, 0
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            if self._poller is None or not self._poller.is_alive():
+                engine = db.engine
+                self._last_id = self.latest_id()
+                self._poller = threading.Thread(
+                    target=self._poll, args=(engine,), name="change-feed", daemon=True
+                )
+                self._poller.start()
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Remove a stream; safe to call more than once.
+
+        :param subscription: Subscription returned by `subscribe`.
+        """
+        with self._lock:
+            self._remove(subscription)
+
+    def stream(
+        self,
+        subscription: Subscription,
+        after_id: int,
+        render: Callable[[Row], dict],
+    ) -> Iterator[str]:
+        """
+        Yield server-sent events for a subscription until the stream expires.
+
+        Events newer than `after_id` that are still retained are replayed first.
+        A subscriber that overflowed gets a final `reset` event.
+
+        :param subscription: Subscription returned by `subscribe`.
+        :param after_id: Last event id the client has seen.
+        :param render: Turns an event row into the JSON data sent to the client.
+        :return: Iterator of SSE-formatted strings.
+        """
+        try:
+            yield "retry: 3000\n\n"
+            sent = after_id
+            if after_id:
+                for row in self._replay(subscription.user_id, after_id):
+                    sent = row.id
+                    yield self._format(row, render)
+
+            deadline = time.monotonic() + self.stream_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    row = subscription.queue.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.overflowed:
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                if row.id > sent:
+                    sent = row.id
+                    yield self._format(row, render)
+        finally:
+            self.unsubscribe(subscription)
+
+    @staticmethod
+    def _format(row: Row, render: Callable[[Row], dict]) -> str:
+        """Format an event row as one SSE message."""
+        data = json.dumps(render(row), separators=(",", ":"))
+        return f"id: {row.id}\nevent: {row.kind}\ndata: {data}\n\n"
+
+    def _replay(self, user_id: int, after_id: int) -> List[Row]:
+        """Return a user's retained events newer than `after_id`."""
+        try:
+            with db.engine.connect() as conn:
+                return conn.execute(
+                    select(ShelfEvent)
+                    .where(ShelfEvent.user_id == user_id, ShelfEvent.id > after_id)
+                    .order_by(ShelfEvent.id)
+                ).all()
+        except SQLAlchemyError:
+            logger.exception("Failed to replay shelf events for user %d", user_id)
+            return []
+
+    def _remove(self, subscription: Subscription) -> None:
+        """Drop a subscription; the caller holds the lock."""
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self._count -= 1
+
+    def _poll(self, engine: Engine) -> None:
+        """
+        Poll the event table and fan new events out until no subscriber is left.
+
+        :param engine: Primary engine (captured in the request that started the poller).
+        """
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            try:
+                with engine.connect() as conn:
+                    rows = conn.execute(
+                        select(ShelfEvent)
+                        .where(ShelfEvent.id > self._last_id)
+                        .order_by(ShelfEvent.id)
+                        .limit(POLL_BATCH)
+                    ).all()
+            except SQLAlchemyError:
+                logger.exception("Polling shelf events failed")
+                continue
+            if not rows:
+                continue
+
+            self._last_id = rows[-1].id
+            with self._lock:
+                for row in rows:
+                    for subscription in list(self._subscribers.get(row.user_id, ())):
+                        try:
+                            subscription.queue.put_nowait(row)
+                        except queue.Full:
+                            subscription.overflowed = True
+                            self._remove(subscription)
+
+
+# Shared per-process feed; bound to the app in create_app
+change_feed = ChangeFeed()
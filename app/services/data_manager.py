@@ -7,12 +7,32 @@ Purpose:
 Features:
     - Create, retrieve, update, and delete Users
     - Retrieve, add, update, and delete Movies for a user
+    - Soft-delete users and movies, restorable within the undo window
+      (see app.services.purger)
+    - Add a batch of movies in one transaction with set-based duplicate filtering
+    - Stream a shelf in batches from a yield_per cursor for large pages
+    - Resolve film details against the shared movie catalogue
+    - Flag changed shelves for the recommender index
+    - Bump per-shelf versions (ETags of the JSON API) on every shelf change
+    - Keyset-paginated listings for the JSON API
+    - Feed newly shelved titles into the title suggestion index
+    - Publish shelf changes to the live change feed in the same transaction
+      (see app.services.change_feed)
+    - Serve listing reads from the read engine (see app.routing)
+    - Route per-user operations to the user's shard and fan cross-shard
+      listings and statistics out over all shards (see app.sharding)
 
 Required Modules:
     - logging: application logging
     - sqlalchemy.exc.SQLAlchemyError: database error handling
     - flask_sqlalchemy.SQLAlchemy: session management
-    - app.models: User, Movie model classes
+    - app.models: User, Movie, CatalogEntry model classes
+    - app.utils.normalize_title: catalogue key for titles
+    - app.routing.read_replica: route listing reads to the read engine
+    - app.sharding: shard directory, per-user routing and fan-out queries
+    - app.services.change_feed: live shelf change events
+    - app.services.recommender: shared recommender index
+    - app.services.title_index: shared title suggestion index
 
 Exceptions:
     - SQLAlchemyError: on database operation failures
@@ -21,12 +41,23 @@ Author: Martin Haferanke
 Date: 2025-07-18
 """
 import logging
-from typing import List
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+from sqlalchemy import delete, func, update
+from sqlalchemy.engine import Row
 from sqlalchemy.exc import SQLAlchemyError
 from flask_sqlalchemy import SQLAlchemy
 
-from app.models import User, Movie
+from app.events import INCLUDE_DELETED
+from app.models import User, Movie, CatalogEntry
+from app.routing import read_replica
+from app.sharding import fan_out, register_user, release_user, shard_count, user_shard
+from app.services.change_feed import change_feed, shelf_event
+from app.services.purger import purger
+from app.services.recommender import recommender
+from app.services.title_index import title_index
+from app.utils import normalize_title
 
 
 class DataManager:
@@ -55,91 +86,554 @@ class DataManager:
         :return: Created User object.
         :raises SQLAlchemyError: if commit fails.
         """
-        user = User(name=name)
+        # With sharding, the directory hands out ids so they stay unique across shards
+        user_id = register_user(self.db)[0] if shard_count() else None
+        user = User(id=user_id, name=name)
         try:
-            self.db.session.add(user)
-            self.db.session.commit()
+            with user_shard(self.db, user_id):
+                self.db.session.add(user)
+                self.db.session.commit()
+                if user_id is not None:
+                    # Load the committed row while the session still routes to its shard
+                    self.db.session.refresh(user)
             return user
         except SQLAlchemyError as e:
             logging.exception("Database commit failed when creating user: %s", e)
             self.db.session.rollback()
+            if user_id is not None:
+                release_user(self.db, user_id)
             raise
 
-    def delete_user(self, user_id: int) -> None:
+    def delete_user(self, user_id: int) -> Optional[float]:
         """
-        Delete a user by ID.
+        Soft-delete a user and their shelf.
+
+        The user and every live shelf entry get the same `deleted_at`, so
+        `restore_user` brings back exactly what this call removed. The rows
+        (and the shard directory entry) are removed by the purger once the
+        undo window has passed.
 
         :param user_id: ID of the user to delete.
+        :return: Deletion time, or None if the user was not found.
         :raises SQLAlchemyError: if commit fails.
         """
         try:
-            user = User.query.get(user_id)
-            if user is None:
-                logging.warning("User with ID %d not found for deletion.", user_id)
-                return
+            with user_shard(self.db, user_id):
+                user = User.query.get(user_id)
+                if user is None:
+                    logging.warning("User with ID %d not found for deletion.", user_id)
+                    return None
 
-            self.db.session.delete(user)
-            self.db.session.commit()
+                deleted_at = time.time()
+                user.deleted_at = deleted_at
+                self.db.session.execute(
+                    update(Movie)
+                    .where(Movie.user_id == user_id, Movie.deleted_at.is_(None))
+                    .values(deleted_at=deleted_at)
+                    .execution_options(synchronize_session=False)
+                )
+                self.db.session.commit()
+            recommender.mark_dirty(user_id)
+            return deleted_at
         except SQLAlchemyError as e:
             logging.exception("Failed to delete user with ID %d: %s", user_id, e)
             self.db.session.rollback()
             raise
 
+    def restore_user(self, user_id: int) -> Optional[User]:
+        """
+        Undo `delete_user` within the undo window.
+
+        Shelf entries deleted on their own before the user stay deleted.
+
+        :param user_id: ID of the deleted user.
+        :return: The restored User, or None if there is nothing to restore.
+        :raises SQLAlchemyError: if commit fails.
+        """
+        try:
+            with user_shard(self.db, user_id):
+                user = self.db.session.execute(
+                    self.db.select(User)
+                    .where(User.id == user_id)
+                    .execution_options(**{INCLUDE_DELETED: True})
+                ).scalar_one_or_none()
+                if user is None or not purger.restorable(user.deleted_at):
+                    return None
+
+                self.db.session.execute(
+                    update(Movie)
+                    .where(
+                        Movie.user_id == user_id,
+                        Movie.deleted_at == user.deleted_at,
+                    )
+                    .values(deleted_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                user.deleted_at = None
+                user.shelf_version += 1
+                self.db.session.commit()
+                self.db.session.refresh(user)
+            recommender.mark_dirty(user_id)
+            return user
+        except SQLAlchemyError as e:
+            logging.exception("Failed to restore user with ID %d: %s", user_id, e)
+            self.db.session.rollback()
+            raise
+
+    def update_user(self, user: User, name: str) -> User:
+        """
+        Rename a user.
+
+        :param user: User to rename.
+        :param name: New name.
+        :return: The updated User object.
+        :raises SQLAlchemyError: if commit fails.
+        """
+        try:
+            with user_shard(self.db, user.id):
+                user.name = name
+                user.shelf_version = User.shelf_version + 1
+                self.db.session.commit()
+            return user
+        except SQLAlchemyError as e:
+            logging.exception("Failed to rename user with ID %d: %s", user.id, e)
+            self.db.session.rollback()
+            raise
+
     def get_users(self) -> List[User]:
         """
         Retrieve all users, ordered by name.
 
+        With sharding, every shard is queried and the sorted lists are merged.
+
         :return: List of User objects.
         """
         # Query all users sorted alphabetically
-        return self.db.session.query(User).order_by(User.name).all()
+        stmt = self.db.select(User).order_by(User.name)
+        with read_replica(self.db):
+            users = [
+                u for _, result in fan_out(self.db, stmt) for u in result.scalars()
+            ]
+        if shard_count():
+            users.sort(key=lambda u: u.name)
+        return users
 
     def get_movies(self, user_id: int) -> List[Movie]:
         """
-        Retrieve all movies for a specific user.
+        Retrieve all movies for a specific user with their catalogue entries.
+
+        :param user_id: ID of the user.
+        :return: List of Movie objects.
+        """
+        # Movie.entry is joined-loaded, so this is a single user_movies JOIN catalog
+        with user_shard(self.db, user_id), read_replica(self.db):
+            return Movie.query.filter_by(user_id=user_id).order_by(Movie.id).all()
+
+    def page_users(self, after_id: int = 0, limit: int = 50) -> List[User]:
+        """
+        Retrieve one page of users ordered by id (keyset pagination).
+
+        :param after_id: Return users with an id greater than this.
+        :param limit: Maximum number of users.
+        :return: List of User objects.
+        """
+        stmt = (
+            self.db.select(User)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+        )
+        with read_replica(self.db):
+            users = [
+                u for _, result in fan_out(self.db, stmt) for u in result.scalars()
+            ]
+        # Each shard returned its first `limit` users; keep the first overall
+        return sorted(users, key=lambda u: u.id)[:limit]
+
+    def page_movies(
+        self, user_id: int, after_id: int = 0, limit: int = 50
+    ) -> List[Movie]:
+        """
+        Retrieve one page of a user's movies ordered by id (keyset pagination).
 
         :param user_id: ID of the user.
+        :param after_id: Return movies with an id greater than this.
+        :param limit: Maximum number of movies.
         :return: List of Movie objects.
         """
-        return Movie.query.filter_by(user_id=user_id).all()
+        with user_shard(self.db, user_id), read_replica(self.db):
+            return (
+                Movie.query.filter(Movie.user_id == user_id, Movie.id > after_id)
+                .order_by(Movie.id)
+                .limit(limit)
+                .all()
+            )
+
+    def shelf_version(self, user_id: int) -> Optional[int]:
+        """
+        Return the current shelf version of a user.
+
+        :param user_id: ID of the user.
+        :return: Version counter, or None if the user does not exist.
+        """
+        with user_shard(self.db, user_id), read_replica(self.db):
+            return (
+                self.db.session.query(User.shelf_version)
+                .filter(User.id == user_id)
+                .scalar()
+            )
+
+    def count_movies(self, user_id: int) -> int:
+        """
+        Count the movies on a user's shelf.
+
+        :param user_id: ID of the user.
+        :return: Number of movies.
+        """
+        with user_shard(self.db, user_id), read_replica(self.db):
+            return Movie.query.filter_by(user_id=user_id).count()
+
+    def iter_movie_cards(self, user_id: int, batch_size: int = 100) -> Iterator[Row]:
+        """
+        Stream the card fields of a user's movies from a server-side cursor.
+
+        Rows are plain tuples fetched `batch_size` at a time, not ORM objects,
+        so nothing accumulates in the session's identity map and memory stays
+        bounded however large the shelf is.
+
+        :param user_id: ID of the user.
+        :param batch_size: Rows fetched per round trip.
+        :return: Iterator of rows with id, name, director, year and poster_url.
+        :raises SQLAlchemyError: if the query fails.
+        """
+        stmt = (
+            self.db.select(
+                Movie.id,
+                CatalogEntry.name,
+                CatalogEntry.director,
+                CatalogEntry.year,
+                CatalogEntry.poster_url,
+            )
+            .join(Movie.entry)
+            .where(Movie.user_id == user_id)
+            .order_by(Movie.id)
+            .execution_options(yield_per=batch_size)
+        )
+        with user_shard(self.db, user_id), read_replica(self.db):
+            for partition in self.db.session.execute(stmt).partitions():
+                yield from partition
+
+    def find_movie(self, user_id: int, title: str) -> Optional[Movie]:
+        """
+        Find a movie on a user's shelf by (normalized) title.
+
+        :param user_id: ID of the user.
+        :param title: Movie title to look for.
+        :return: Matching Movie or None.
+        """
+        with user_shard(self.db, user_id):
+            return (
+                Movie.query.join(Movie.entry)
+                .filter(
+                    Movie.user_id == user_id,
+                    CatalogEntry.title_key == normalize_title(title),
+                )
+                .first()
+            )
+
+    def find_catalog_entry(
+        self, title: str, imdb_id: Optional[str] = None
+    ) -> Optional[CatalogEntry]:
+        """
+        Look up a film in the shared catalogue, by IMDb id first, then by title.
+
+        With sharding, each shard keeps its own catalogue; the one of the
+        shard selected by the caller (see `app.sharding.user_shard`) is used.
+
+        :param title: Movie title to look for.
+        :param imdb_id: IMDb id, if known.
+        :return: Matching CatalogEntry or None.
+        """
+        if imdb_id:
+            entry = CatalogEntry.query.filter_by(imdb_id=imdb_id).first()
+            if entry is not None:
+                return entry
+        return (
+            CatalogEntry.query.filter_by(title_key=normalize_title(title))
+            .order_by(CatalogEntry.imdb_id.is_(None), CatalogEntry.id)
+            .first()
+        )
+
+    def resolve_entry(
+        self,
+        name: str,
+        director: str,
+        year: Optional[int],
+        poster_url: Optional[str] = None,
+        plot: Optional[str] = None,
+        imdb_id: Optional[str] = None,
+    ) -> CatalogEntry:
+        """
+        Return the catalogue entry for a film, creating it if it is unknown.
+
+        Missing poster, plot or IMDb id on an existing entry are filled in from
+        the given values. The session is not committed.
+
+        :param name: Movie title.
+        :param director: Movie director.
+        :param year: Release year (0 or None if unknown).
+        :param poster_url: Poster URL, if known.
+        :param plot: Plot summary, if known.
+        :param imdb_id: IMDb id, if known.
+        :return: Persistent or pending CatalogEntry.
+        """
+        entry = self.find_catalog_entry(name, imdb_id)
+        if entry is None:
+            entry = CatalogEntry(
+                imdb_id=imdb_id or None,
+                title_key=normalize_title(name),
+                name=name,
+                director=director,
+                year=year or 0,
+                poster_url=poster_url or None,
+                plot=plot or None,
+            )
+            self.db.session.add(entry)
+            return entry
+
+        if imdb_id and not entry.imdb_id:
+            entry.imdb_id = imdb_id
+        if poster_url and not entry.poster_url:
+            entry.poster_url = poster_url
+        if plot and not entry.plot:
+            entry.plot = plot
+        return entry
 
     def add_movie(self, movie: Movie) -> Movie:
         """
         Add a new movie to the database.
 
-        :param movie: Movie instance with user_id set.
+        The film details staged on the movie are resolved against the shared
+        catalogue, so a film already known is linked instead of copied.
+
+        :param movie: Movie instance with user_id and film details set.
         :return: The added Movie object.
         :raises SQLAlchemyError: if commit fails.
         """
         try:
-            self.db.session.add(movie)
-            self.db.session.commit()
+            with user_shard(self.db, movie.user_id):
+                staged = movie.entry
+                movie.entry = self.resolve_entry(
+                    staged.name,
+                    staged.director,
+                    staged.year,
+                    staged.poster_url,
+                    staged.plot,
+                    staged.imdb_id,
+                )
+                self._drop_tombstones(movie.user_id, [movie.entry.id])
+                filled = self._filled_entries([movie.entry])
+                self.db.session.add(movie)
+                self.db.session.flush()
+                self._touch_shelves(user_id=movie.user_id, catalog_ids=filled)
+                change_feed.publish(
+                    [shelf_event("added", movie.user_id, movie.id, movie)]
+                )
+                self.db.session.commit()
+            recommender.mark_dirty(movie.user_id)
+            title_index.add(movie.name, movie.year, movie.imdb_id)
             return movie
         except SQLAlchemyError as e:
+            # Roll back first: reading movie.name loads from the failed transaction
+            self.db.session.rollback()
             logging.exception("Failed to add movie '%s': %s", movie.name, e)
+            raise
+
+    def add_movies(
+        self, user_id: int, movies: List[Movie]
+    ) -> Tuple[List[Movie], List[Movie]]:
+        """
+        Add many movies to a user's shelf in a single transaction.
+
+        Titles and IMDb ids already on the shelf are found with one set-based
+        query; those movies and repeats within the batch are skipped. The
+        remaining film details are resolved against the shared catalogue.
+
+        :param user_id: ID of the user.
+        :param movies: Unsaved Movie instances with film details staged.
+        :return: Tuple of (added movies, skipped duplicates).
+        :raises SQLAlchemyError: if the transaction fails (nothing is added).
+        """
+        staged = [(movie, movie.entry) for movie in movies]
+        keys = {normalize_title(entry.name) for _, entry in staged}
+        imdb_ids = {entry.imdb_id for _, entry in staged if entry.imdb_id}
+
+        try:
+            with user_shard(self.db, user_id):
+                on_shelf = self.db.session.execute(
+                    self.db.select(
+                        CatalogEntry.id, CatalogEntry.title_key, CatalogEntry.imdb_id
+                    )
+                    .join(Movie, Movie.catalog_id == CatalogEntry.id)
+                    .where(
+                        Movie.user_id == user_id,
+                        CatalogEntry.title_key.in_(keys)
+                        | CatalogEntry.imdb_id.in_(imdb_ids),
+                    )
+                ).all()
+                seen_ids = {row.id for row in on_shelf}
+                seen_keys = {row.title_key for row in on_shelf}
+                seen_imdb = {row.imdb_id for row in on_shelf if row.imdb_id}
+
+                added: List[Movie] = []
+                duplicates: List[Movie] = []
+                # No autoflush: rows added for earlier titles would collide with
+                # tombstones that are only dropped after the loop
+                with self.db.session.no_autoflush:
+                    for movie, entry in staged:
+                        key = normalize_title(entry.name)
+                        if key in seen_keys or (
+                            entry.imdb_id and entry.imdb_id in seen_imdb
+                        ):
+                            duplicates.append(movie)
+                            continue
+                        seen_keys.add(key)
+                        if entry.imdb_id:
+                            seen_imdb.add(entry.imdb_id)
+
+                        movie.entry = self.resolve_entry(
+                            entry.name,
+                            entry.director,
+                            entry.year,
+                            entry.poster_url,
+                            entry.plot,
+                            entry.imdb_id,
+                        )
+                        # Two spellings may still resolve to the same catalogue entry
+                        if movie.entry.id is not None and movie.entry.id in seen_ids:
+                            duplicates.append(movie)
+                            continue
+                        if movie.entry.id is not None:
+                            seen_ids.add(movie.entry.id)
+                        movie.user_id = user_id
+                        self.db.session.add(movie)
+                        added.append(movie)
+
+                self._drop_tombstones(user_id, {m.entry.id for m in added})
+                filled = self._filled_entries(m.entry for m in added)
+                self.db.session.flush()
+                if added:
+                    self._touch_shelves(user_id=user_id, catalog_ids=filled)
+                change_feed.publish(
+                    [shelf_event("added", user_id, m.id, m) for m in added]
+                )
+                self.db.session.commit()
+        except SQLAlchemyError as e:
+            logging.exception(
+                "Failed to add %d movies for user %d: %s", len(movies), user_id, e
+            )
             self.db.session.rollback()
             raise
 
-    def update_movie(self, movie: Movie) -> Movie:
+        recommender.mark_dirty(user_id)
+        for movie in added:
+            title_index.add(movie.name, movie.year, movie.imdb_id)
+        return added, duplicates
+
+    def update_movie(
+        self, movie: Movie, name: str, director: str, year: Optional[int]
+    ) -> Movie:
         """
-        Update an existing movie or insert if new.
+        Update the details of a movie on a user's shelf.
 
-        :param movie: Movie instance to merge.
-        :return: The merged Movie object.
+        Catalogue entries are shared, so an edit never changes one: the shelf
+        entry is re-linked to the catalogue entry with exactly the edited
+        details, which is created (keeping the poster and plot) if there is
+        none. Only the editing user's shelf changes.
+
+        :param movie: Movie to update.
+        :param name: New title.
+        :param director: New director.
+        :param year: New release year, or None to keep the current one.
+        :return: The updated Movie object.
+        :raises ValueError: if the new title is already on the user's shelf.
         :raises SQLAlchemyError: if commit fails.
         """
         try:
-            merged = self.db.session.merge(movie)
-            self.db.session.commit()
-            return merged
+            with user_shard(self.db, movie.user_id):
+                entry = movie.entry
+                year = year or entry.year
+                if (name, director, year) == (entry.name, entry.director, entry.year):
+                    return movie
+                if normalize_title(name) != entry.title_key:
+                    if self.find_movie(movie.user_id, name) is not None:
+                        raise ValueError(f'"{name}" is already in your favourites.')
+
+                edited = self._edited_entry(entry, name, director, year)
+                self._drop_tombstones(movie.user_id, [edited.id])
+                movie.entry = edited
+                self.db.session.flush()
+                self._touch_shelves(user_id=movie.user_id)
+                change_feed.publish(
+                    [shelf_event("updated", movie.user_id, movie.id, edited)]
+                )
+                self.db.session.commit()
+            recommender.mark_dirty(movie.user_id)
+            title_index.add(edited.name, edited.year, edited.imdb_id)
+            return movie
         except SQLAlchemyError as e:
-            logging.exception("Failed to update movie '%s': %s", movie.name, e)
+            logging.exception("Failed to update movie '%s': %s", name, e)
             self.db.session.rollback()
             raise
 
+    def _edited_entry(
+        self, entry: CatalogEntry, name: str, director: str, year: int
+    ) -> CatalogEntry:
+        """
+        Return the catalogue entry with exactly the edited details, creating it if needed.
+
+        An existing entry for the same film is preferred (the one with an IMDb
+        id first); a new one copies poster and plot from the edited film's
+        entry, or from the current entry after a rename to an unknown title.
+
+        :param entry: Catalogue entry the shelf entry links to now.
+        :param name: Edited title.
+        :param director: Edited director.
+        :param year: Edited release year.
+        :return: Persistent or pending CatalogEntry.
+        """
+        title_key = normalize_title(name)
+        found = (
+            CatalogEntry.query.filter_by(
+                title_key=title_key, name=name, director=director, year=year
+            )
+            .order_by(CatalogEntry.imdb_id.is_(None), CatalogEntry.id)
+            .first()
+        )
+        if found is not None:
+            return found
+
+        source = entry
+        if title_key != entry.title_key:
+            source = self.find_catalog_entry(name) or entry
+        edited = CatalogEntry(
+            title_key=title_key,
+            name=name,
+            director=director,
+            year=year,
+            poster_url=source.poster_url,
+            plot=source.plot,
+        )
+        self.db.session.add(edited)
+        return edited
+
     def delete_movie(self, movie_id: int) -> None:
         """
-        Delete a movie by ID.
+        Soft-delete a movie by ID.
+
+        With sharding, movie ids are only unique within a shard: the movie is
+        looked up on the shard the current request was routed to. The row is
+        removed by the purger once the undo window has passed.
 
         :param movie_id: ID of the movie to delete.
         :raises SQLAlchemyError: if commit fails.
@@ -150,9 +644,129 @@ class DataManager:
                 logging.warning("Movie with ID %d not found for deletion.", movie_id)
                 return
 
-            self.db.session.delete(movie)
+            user_id = movie.user_id
+            movie.deleted_at = time.time()
+            self._touch_shelves(user_id=user_id)
+            change_feed.publish([shelf_event("removed", user_id, movie_id)])
             self.db.session.commit()
+            recommender.mark_dirty(user_id)
         except SQLAlchemyError as e:
             logging.exception("Failed to delete movie with ID %d: %s", movie_id, e)
             self.db.session.rollback()
             raise
+
+    def restore_movie(self, movie_id: int) -> Optional[Movie]:
+        """
+        Undo `delete_movie` within the undo window.
+
+        Looked up on the shard the current request was routed to, like
+        `delete_movie`. A movie whose film was shelved again in the meantime
+        is gone for good (re-adding replaces the deleted row).
+
+        :param movie_id: ID of the deleted movie.
+        :return: The restored Movie, or None if there is nothing to restore.
+        :raises SQLAlchemyError: if commit fails.
+        """
+        try:
+            movie = self.db.session.execute(
+                self.db.select(Movie)
+                .where(Movie.id == movie_id)
+                .execution_options(**{INCLUDE_DELETED: True})
+            ).scalar_one_or_none()
+            if movie is None or not purger.restorable(movie.deleted_at):
+                return None
+
+            movie.deleted_at = None
+            self._touch_shelves(user_id=movie.user_id)
+            change_feed.publish([shelf_event("added", movie.user_id, movie.id, movie)])
+            self.db.session.commit()
+            recommender.mark_dirty(movie.user_id)
+            return movie
+        except SQLAlchemyError as e:
+            logging.exception("Failed to restore movie with ID %d: %s", movie_id, e)
+            self.db.session.rollback()
+            raise
+
+    def shard_stats(self) -> List[dict]:
+        """
+        Count users and shelved movies per shard.
+
+        :return: One dict per shard (a single one with shard None without sharding)
+            with shard, users and movies.
+        :raises SQLAlchemyError: if a shard query fails.
+        """
+        stmt = self.db.select(
+            self.db.select(func.count(User.id)).scalar_subquery(),
+            self.db.select(func.count(Movie.id)).scalar_subquery(),
+        )
+        with read_replica(self.db):
+            return [
+                dict(zip(("shard", "users", "movies"), (shard, *result.one())))
+                for shard, result in fan_out(self.db, stmt)
+            ]
+
+    def _drop_tombstones(self, user_id: int, catalog_ids: Iterable[int]) -> None:
+        """
+        Hard-delete soft-deleted shelf entries a user is about to shelve again.
+
+        The (user_id, catalog_id) unique constraint covers deleted rows too;
+        re-adding a film replaces its tombstone instead of reviving it.
+
+        :param user_id: ID of the user.
+        :param catalog_ids: IDs of the catalogue entries being shelved.
+        """
+        catalog_ids = [c for c in catalog_ids if c is not None]
+        if not catalog_ids:
+            return
+        # Runs before the new rows are flushed, which would collide with the tombstones
+        with self.db.session.no_autoflush:
+            self.db.session.execute(
+                delete(Movie)
+                .where(
+                    Movie.user_id == user_id,
+                    Movie.catalog_id.in_(catalog_ids),
+                    Movie.deleted_at.is_not(None),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    def _filled_entries(self, entries: Iterable[CatalogEntry]) -> List[int]:
+        """
+        Return the IDs of persistent catalogue entries `resolve_entry` filled in.
+
+        Must run before the session is flushed.
+
+        :param entries: Catalogue entries of the shelf entries being added.
+        :return: IDs of entries with pending changes (e.g. a poster filled in).
+        """
+        return [
+            entry.id
+            for entry in set(entries)
+            if entry.id is not None and self.db.session.is_modified(entry)
+        ]
+
+    def _touch_shelves(
+        self, user_id: Optional[int] = None, catalog_ids: Iterable[int] = ()
+    ) -> None:
+        """
+        Bump the shelf version of a user and of every user holding given catalogue entries.
+
+        Catalogue entries are shared, so filling one in changes every shelf
+        that links to it; pass them only when a shared field actually changed,
+        as each holder costs an UPDATE. The update joins the caller's transaction.
+
+        :param user_id: ID of a single user whose shelf changed.
+        :param catalog_ids: IDs of catalogue entries whose holders' shelves changed.
+        """
+        catalog_ids = list(catalog_ids)
+        condition = User.id == user_id
+        if catalog_ids:
+            condition = condition | User.id.in_(
+                self.db.select(Movie.user_id).where(Movie.catalog_id.in_(catalog_ids))
+            )
+        self.db.session.execute(
+            update(User)
+            .where(condition)
+            .values(shelf_version=User.shelf_version + 1)
+            .execution_options(synchronize_session=False)
+        )
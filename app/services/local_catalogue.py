@@ -0,0 +1,87 @@
+# File: app/services/local_catalogue.py
+"""
+Purpose:
+    Resolve movie titles against the offline reference catalogue so that most
+    lookups never leave the process.
+
+Features:
+    - Indexed lookup by normalized title; the most-voted film wins among remakes
+    - Stores posters and plots fetched from OMDb back into the reference row
+    - Lookup failures (e.g. a database without the table) fall back to OMDb
+
+Required Modules:
+    - logging: failures are logged, never raised
+    - sqlalchemy: select/update statements
+    - app.extentions.db: engine and session
+    - app.models.ReferenceTitle: reference catalogue table
+    - app.routing.read_replica: lookups run on the read engine
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extentions import db
+from app.models import ReferenceTitle
+from app.routing import read_replica
+
+
+class LocalCatalogue:
+    """
+    Access to the `reference_titles` table loaded by the ingest command.
+
+    Title keys are computed by the caller (`app.utils.normalize_title`), so
+    this service has no dependency on the OMDb helpers that call it.
+    """
+
+    def find(self, title_key: str) -> Optional[ReferenceTitle]:
+        """
+        Find the best reference entry for a normalized title.
+
+        :param title_key: Normalized title.
+        :return: The most-voted ReferenceTitle with that title, or None if the
+            title is unknown or the lookup failed.
+        """
+        if not title_key:
+            return None
+        try:
+            with read_replica(db):
+                return (
+                    ReferenceTitle.query.filter_by(title_key=title_key)
+                    .order_by(ReferenceTitle.votes.desc())
+                    .first()
+                )
+        except SQLAlchemyError:
+            logging.exception("Local catalogue lookup failed for '%s'", title_key)
+            db.session.rollback()
+            return None
+
+    def remember_details(self, imdb_id: str, poster_url: str, plot: str) -> None:
+        """
+        Store a poster and plot fetched from OMDb on the reference row.
+
+        Empty strings are stored as-is: they mark details OMDb does not have,
+        so they are not requested again. Runs in its own transaction so it
+        never commits the caller's session.
+
+        :param imdb_id: IMDb id of the reference row.
+        :param poster_url: Poster URL ("" if OMDb has none).
+        :param plot: Plot summary ("" if OMDb has none).
+        """
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    update(ReferenceTitle)
+                    .where(ReferenceTitle.imdb_id == imdb_id)
+                    .values(poster_url=poster_url, plot=plot)
+                )
+        except SQLAlchemyError:
+            logging.exception("Failed to store OMDb details for %s", imdb_id)
+
+
+# Shared per-process instance used by app.utils.fetch_omdb_data
+local_catalogue = LocalCatalogue()
@@ -0,0 +1,256 @@
+# File: app/services/purger.py
+"""
+Purpose:
+    Remove soft-deleted users and shelf entries once their undo window has
+    passed, and give the freed pages back to the file system, without making
+    any request wait for it.
+
+Features:
+    - Deletes tombstones in bounded batches, each in its own short transaction,
+      so the SQLite write lock is never held for long
+    - Deleted users go last (their shelf first) and leave the shard directory
+    - Prunes change feed events past FEED_RETENTION_SECONDS (app.services.change_feed)
+    - Incremental VACUUM (`PRAGMA incremental_vacuum(N)`) of every SQLite
+      database at most every VACUUM_INTERVAL_SECONDS, N pages at a time
+    - Runs after a response has been sent, at most every PURGE_INTERVAL_SECONDS
+      per worker and in one thread at a time; a full run is available for cron
+      and maintenance (app.data.purge_deleted)
+
+Required Modules:
+    - threading: one purge at a time per process
+    - time: undo window and scheduling
+    - flask: application context for the deferred run
+    - sqlalchemy: batched deletes and pragmas on the engines
+    - app.models: User and Movie tables
+    - app.sharding: engines holding the per-user tables and the shard directory
+    - app.services.change_feed: event retention
+
+Exceptions:
+    - SQLAlchemyError: logged by the deferred run; raised by `purge` and `vacuum`
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, current_app
+from sqlalchemy import delete, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extentions import db
+from app.models import Movie, User
+from app.services.change_feed import change_feed
+from app.sharding import release_user, shard_count, shard_engine
+
+logger = logging.getLogger(__name__)
+
+
+class Purger:
+    """
+    Batched removal of soft-deleted rows and incremental VACUUM scheduling.
+    """
+
+    def __init__(
+        self,
+        undo_seconds: int = 120,
+        interval: int = 60,
+        batch_size: int = 500,
+        vacuum_interval: int = 3600,
+        vacuum_pages: int = 2000,
+    ) -> None:
+        """
+        Initialize a purger that has not run yet.
+
+        :param undo_seconds: Seconds a deleted row can still be restored.
+        :param interval: Seconds between deferred purges per process (0 disables them).
+        :param batch_size: Rows deleted per transaction.
+        :param vacuum_interval: Seconds between incremental VACUUM runs.
+        :param vacuum_pages: Free pages returned per VACUUM run and database.
+        """
+        self.undo_seconds = undo_seconds
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_interval = vacuum_interval
+        self.vacuum_pages = vacuum_pages
+
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+        self._next_vacuum = 0.0
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read purge settings from the app config and schedule deferred runs.
+
+        :param app: Flask application instance.
+        """
+        self.undo_seconds = app.config.get(
+            "SOFT_DELETE_UNDO_SECONDS", self.undo_seconds
+        )
+        self.interval = app.config.get("PURGE_INTERVAL_SECONDS", self.interval)
+        self.batch_size = app.config.get("PURGE_BATCH_SIZE", self.batch_size)
+        self.vacuum_interval = app.config.get(
+            "VACUUM_INTERVAL_SECONDS", self.vacuum_interval
+        )
+        self.vacuum_pages = app.config.get("VACUUM_PAGES", self.vacuum_pages)
+        app.extensions["purger"] = self
+        if self.interval:
+            app.after_request(self._schedule)
+
+    def restorable(self, deleted_at: Optional[float]) -> bool:
+        """
+        Return whether a row deleted at the given time may still be restored.
+
+        :param deleted_at: Unix time of deletion (None for live rows).
+        :return: True inside the undo window.
+        """
+        return deleted_at is not None and deleted_at >= time.time() - self.undo_seconds
+
+    def purge(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """
+        Delete tombstones older than the undo window on every database, and
+        change feed events older than their retention period.
+
+        :param max_batches: Batches per table and database (None: until done).
+        :return: Counts of purged movies, users and events.
+        :raises SQLAlchemyError: if a delete fails.
+        """
+        cutoff = time.time() - self.undo_seconds
+        purged = {"movies": 0, "users": 0, "events": change_feed.prune()}
+        for engine in self._engines():
+            purged["movies"] += self._purge_movies(engine, cutoff, max_batches)
+            user_ids = self._purge_users(engine, cutoff, max_batches)
+            purged["users"] += len(user_ids)
+            if shard_count():
+                for user_id in user_ids:
+                    release_user(db, user_id)
+        return purged
+
+    def vacuum(self) -> Dict[str, int]:
+        """
+        Return up to `vacuum_pages` free pages of every SQLite database to the file system.
+
+        Databases without incremental auto-vacuum are skipped (see
+        app.data.migrate_soft_delete); other backends vacuum themselves.
+
+        :return: Pages freed per database URL.
+        :raises SQLAlchemyError: if a pragma fails.
+        """
+        freed: Dict[str, int] = {}
+        for engine in self._engines():
+            if engine.dialect.name != "sqlite":
+                continue
+            with engine.connect() as conn:
+                if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+                    logger.warning(
+                        "%s has no incremental auto-vacuum; run "
+                        "app.data.migrate_soft_delete",
+                        engine.url.database,
+                    )
+                    continue
+                before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                if before:
+                    # The pragma frees one page per step and execute() steps
+                    # once; executescript() runs it to completion
+                    conn.connection.dbapi_connection.executescript(
+                        f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});"
+                    )
+                after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            freed[str(engine.url.database)] = before - after
+        return freed
+
+    def _engines(self) -> List[Engine]:
+        """Return the engines holding users and shelves (the shards, or the primary)."""
+        count = shard_count()
+        if not count:
+            return [db.engine]
+        return [shard_engine(db, shard) for shard in range(count)]
+
+    def _purge_movies(
+        self, engine: Engine, cutoff: float, max_batches: Optional[int]
+    ) -> int:
+        """Delete shelf entries tombstoned before the cutoff, one batch per transaction."""
+        movies = Movie.__table__
+        batch = (
+            select(movies.c.id)
+            .where(movies.c.deleted_at < cutoff)
+            .limit(self.batch_size)
+            .scalar_subquery()
+        )
+        total, batches = 0, 0
+        while max_batches is None or batches < max_batches:
+            with engine.begin() as conn:
+                deleted = conn.execute(delete(movies).where(movies.c.id.in_(batch)))
+            total += deleted.rowcount
+            batches += 1
+            if deleted.rowcount < self.batch_size:
+                break
+        return total
+
+    def _purge_users(
+        self, engine: Engine, cutoff: float, max_batches: Optional[int]
+    ) -> List[int]:
+        """Delete users tombstoned before the cutoff with what is left of their shelves."""
+        users, movies = User.__table__, Movie.__table__
+        purged: List[int] = []
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            with engine.begin() as conn:
+                user_ids = list(
+                    conn.execute(
+                        select(users.c.id)
+                        .where(users.c.deleted_at < cutoff)
+                        .limit(self.batch_size)
+                    ).scalars()
+                )
+                if user_ids:
+                    conn.execute(delete(movies).where(movies.c.user_id.in_(user_ids)))
+                    conn.execute(delete(users).where(users.c.id.in_(user_ids)))
+            purged.extend(user_ids)
+            batches += 1
+            if len(user_ids) < self.batch_size:
+                break
+        return purged
+
+    def _schedule(self, response: Response) -> Response:
+        """Run one bounded purge (and, when due, a VACUUM step) after the response is sent."""
+        now = time.monotonic()
+        if now < self._next_purge:
+            return response
+        app = current_app._get_current_object()
+        response.call_on_close(lambda: self._run_deferred(app))
+        return response
+
+    def _run_deferred(self, app: Flask) -> None:
+        """Deferred run: one batch per table and database, then VACUUM if due."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.interval
+            with app.app_context():
+                purged = self.purge(max_batches=1)
+                if purged["movies"] or purged["users"]:
+                    logger.info(
+                        "Purged %d movies and %d users.",
+                        purged["movies"],
+                        purged["users"],
+                    )
+                if now >= self._next_vacuum:
+                    self._next_vacuum = now + self.vacuum_interval
+                    freed = self.vacuum()
+                    if any(freed.values()):
+                        logger.info("Incremental VACUUM freed pages: %s", freed)
+        except SQLAlchemyError:
+            logger.exception("Purging deleted rows failed")
+        finally:
+            self._lock.release()
+
+
+# Shared per-process purger; bound to the app in create_app
+purger = Purger()
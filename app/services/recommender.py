@@ -0,0 +1,395 @@
+# File: app/services/recommender.py
+"""
+Purpose:
+    Recommend movies to a user based on the shelves of users with similar taste,
+    using item-item cosine similarity over a sparse user x movie matrix.
+
+Features:
+    - Build a sparse user x movie matrix keyed on IMDb id (or normalized title),
+      so the same film links users on different shards
+    - Compute item-item cosine similarity with batched sparse matrix products
+    - Precompute the top-K suggestions for every user in bounded user chunks
+    - Incrementally refresh suggestions of users whose shelves changed, with
+      the query and scoring outside the index lock; a per-user change
+      generation keeps changes that arrive meanwhile dirty
+    - Periodically rebuild the similarity matrix in full, in a background
+      thread and outside the index lock; the old index is served meanwhile
+    - Score users sparsely: per-row top-K selection over the non-zero scores,
+      so memory follows the co-occurrences, not users x catalogue size
+    - Serve precomputed suggestions in O(K)
+
+Required Modules:
+    - logging: application logging
+    - threading: guard the in-process index, background rebuilds
+    - time: rebuild scheduling
+    - numpy: per-row top-K selection
+    - scipy.sparse: sparse matrix storage and products
+    - app.extentions.db: SQLAlchemy session for shelf queries
+    - app.models: Movie shelf rows and CatalogEntry film details
+    - app.routing.read_replica: run index scans on the read engine
+    - app.sharding.fan_out: scan the shelves of every shard
+
+Exceptions:
+    - SQLAlchemyError: on database query failures while (re)building the index
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from flask import Flask, current_app
+from scipy import sparse
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extentions import db
+from app.models import CatalogEntry, Movie
+from app.routing import read_replica
+from app.sharding import fan_out
+
+logger = logging.getLogger(__name__)
+
+# Users scored per sparse product; bounds the sparse score block to CHUNK rows
+CHUNK_SIZE: int = 1024
+
+
+class Recommender:
+    """
+    In-process index of precomputed "similar shelves" suggestions.
+
+    The index holds a binary user x item matrix, the item-item cosine similarity
+    derived from it, and the top-K suggestions for each user. Shelf changes only
+    mark users as dirty; their suggestions are rescored against the current
+    similarity matrix on the next lookup, while the similarity matrix itself is
+    rebuilt in full once the configured rebuild interval has passed. Rebuilds
+    triggered by a lookup run in a background thread; lookups keep being
+    served from the previous index until the new one is swapped in.
+    """
+
+    def __init__(self, top_k: int = 10, rebuild_interval: int = 900) -> None:
+        """
+        Initialize an empty recommender index.
+
+        :param top_k: Number of suggestions precomputed per user.
+        :param rebuild_interval: Seconds after which the similarity matrix is rebuilt.
+        """
+        self.top_k = top_k
+        self.rebuild_interval = rebuild_interval
+
+        # Guards the index; never held across a query or a scoring run
+        self._lock = threading.RLock()
+        # Serializes full rebuilds (first build, warm-up, background)
+        self._build_lock = threading.RLock()
+        self._built_at: Optional[float] = None
+        # Dirty users and the generation of their latest shelf change
+        self._dirty: Dict[int, int] = {}
+        self._generation = 0
+        self._rebuilding = False
+        # Users refreshed against the old index while a rebuild is running
+        self._refreshed: Optional[Set[int]] = None
+
+        self._item_index: Dict[str, int] = {}
+        self._items: List[dict] = []
+        self._similarity: sparse.csr_matrix = sparse.csr_matrix((0, 0))
+        self._suggestions: Dict[int, List[Tuple[int, float]]] = {}
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read recommender settings from the app config and register the index.
+
+        :param app: Flask application instance.
+        """
+        self.top_k = app.config.get("RECOMMENDER_TOP_K", self.top_k)
+        self.rebuild_interval = app.config.get(
+            "RECOMMENDER_REBUILD_INTERVAL", self.rebuild_interval
+        )
+        app.extensions["recommender"] = self
+
+    def mark_dirty(self, user_id: int) -> None:
+        """
+        Flag a user's suggestions as stale after a shelf change.
+
+        :param user_id: ID of the user whose shelf changed.
+        """
+        with self._lock:
+            self._generation += 1
+            self._dirty[user_id] = self._generation
+
+    def suggestions(self, user_id: int) -> List[dict]:
+        """
+        Return the precomputed suggestions for a user, best match first.
+
+        Builds the index first if it was never built (warm-up normally does
+        that; concurrent first requests share one build). An expired index is
+        rebuilt in the background and served meanwhile; dirty users are
+        rescored first, without holding the index lock.
+
+        :param user_id: ID of the user.
+        :return: List of dicts with name, director, year, poster_url and score.
+        :raises SQLAlchemyError: if the shelf query fails.
+        """
+        if self._built_at is None:
+            with self._build_lock:
+                if self._built_at is None:
+                    self.rebuild()
+        with self._lock:
+            if self._expired():
+                self._start_rebuild()
+            dirty = dict(self._dirty)
+        if dirty:
+            self._refresh(dirty)
+        with self._lock:
+            ranked = self._suggestions.get(user_id, [])
+            return [dict(self._items[col], score=score) for col, score in ranked]
+
+    def rebuild(self) -> None:
+        """
+        Rebuild the user x item matrix, the similarity matrix and all suggestions.
+
+        The new index is computed without holding the index lock and swapped
+        in at the end, so lookups are not blocked meanwhile. Rebuilds run one
+        at a time.
+
+        :raises SQLAlchemyError: if the shelf query fails.
+        """
+        with self._build_lock:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Rebuild the index (build lock held)."""
+        started = time.perf_counter()
+        with self._lock:
+            pending = dict(self._dirty)
+            self._refreshed = set()
+        try:
+            with read_replica(db):
+                rows = self._shelf_rows(self._shelf_query())
+
+            item_index: Dict[str, int] = {}
+            items: List[dict] = []
+            user_ids, matrix = self._build_matrix(rows, item_index, items, grow=True)
+
+            # Cosine similarity: C = X^T X scaled by 1 / (|i| * |j|)
+            cooccurrence = (matrix.T @ matrix).tocsr()
+            norms = np.sqrt(cooccurrence.diagonal())
+            norms[norms == 0] = 1.0
+            scale = sparse.diags(1.0 / norms)
+            similarity = (scale @ cooccurrence @ scale).tocsr()
+            similarity.setdiag(0)
+            similarity.eliminate_zeros()
+
+            suggestions: Dict[int, List[Tuple[int, float]]] = {}
+            self._score(user_ids, matrix, similarity, suggestions)
+        finally:
+            with self._lock:
+                refreshed, self._refreshed = self._refreshed or set(), None
+
+        with self._lock:
+            self._item_index = item_index
+            self._items = items
+            self._similarity = similarity
+            self._suggestions = suggestions
+            self._clear_dirty(pending)
+            # Changes refreshed against the old index may be missing from the rows
+            for user_id in refreshed:
+                self._generation += 1
+                self._dirty[user_id] = self._generation
+            self._built_at = time.monotonic()
+
+        logger.info(
+            "Recommender rebuilt: %d users, %d titles in %.1f ms.",
+            len(user_ids),
+            len(items),
+            (time.perf_counter() - started) * 1000,
+        )
+
+    def _expired(self) -> bool:
+        """Return True if the index was never built or is past its rebuild interval."""
+        if self._built_at is None:
+            return True
+        return time.monotonic() - self._built_at > self.rebuild_interval
+
+    def _clear_dirty(self, snapshot: Dict[int, int]) -> List[int]:
+        """
+        Clear dirty users whose shelves did not change again since the snapshot (lock held).
+
+        :param snapshot: Dirty users and their generations when work on them started.
+        :return: IDs of the users cleared.
+        """
+        cleared = [
+            user_id
+            for user_id, generation in snapshot.items()
+            if self._dirty.get(user_id) == generation
+        ]
+        for user_id in cleared:
+            del self._dirty[user_id]
+        return cleared
+
+    def _start_rebuild(self) -> None:
+        """Start a background rebuild unless one is already running (lock held)."""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=self._rebuild_in_background,
+            args=(app,),
+            name="recommender-rebuild",
+            daemon=True,
+        ).start()
+
+    def _rebuild_in_background(self, app: Flask) -> None:
+        """Background rebuild; on failure the old index stays in service."""
+        try:
+            with app.app_context():
+                self.rebuild()
+        except SQLAlchemyError:
+            logger.exception("Rebuilding the recommender index failed")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _refresh(self, dirty: Dict[int, int]) -> None:
+        """
+        Rescore the given users against the current similarity matrix.
+
+        The shelf query and scoring run without the index lock; results are
+        only stored for users whose shelves did not change again meanwhile,
+        and dropped if the index was rebuilt meanwhile (the users stay dirty).
+        Films unseen at the last rebuild are ignored until the next full rebuild.
+
+        :param dirty: Dirty users and their generations.
+        :raises SQLAlchemyError: if the shelf query fails.
+        """
+        with self._lock:
+            item_index, items = self._item_index, self._items
+            similarity = self._similarity
+
+        query = self._shelf_query().where(Movie.user_id.in_(list(dirty)))
+        with read_replica(db):
+            rows = self._shelf_rows(query)
+        scored_ids, matrix = self._build_matrix(rows, item_index, items, grow=False)
+        scored: Dict[int, List[Tuple[int, float]]] = {}
+        self._score(scored_ids, matrix, similarity, scored)
+
+        with self._lock:
+            if self._similarity is not similarity:
+                return
+            for user_id in self._clear_dirty(dirty):
+                if user_id in scored:
+                    self._suggestions[user_id] = scored[user_id]
+                else:
+                    self._suggestions.pop(user_id, None)
+                if self._refreshed is not None:
+                    self._refreshed.add(user_id)
+
+    @staticmethod
+    def _shelf_query():
+        """Return a select of (user_id, item_key, name, director, year, poster_url) rows."""
+        return db.select(
+            Movie.user_id,
+            func.coalesce(CatalogEntry.imdb_id, CatalogEntry.title_key),
+            CatalogEntry.name,
+            CatalogEntry.director,
+            CatalogEntry.year,
+            CatalogEntry.poster_url,
+        ).join(CatalogEntry, Movie.catalog_id == CatalogEntry.id)
+
+    @staticmethod
+    def _shelf_rows(query) -> list:
+        """Run a shelf select on every shard and return all rows."""
+        return [row for _, result in fan_out(db, query) for row in result]
+
+    @staticmethod
+    def _build_matrix(
+        rows: list, item_index: Dict[str, int], items: List[dict], grow: bool
+    ) -> Tuple[List[int], sparse.csr_matrix]:
+        """
+        Convert shelf rows into a binary user x item CSR matrix.
+
+        :param rows: Tuples of (user_id, item_key, name, director, year, poster_url).
+        :param item_index: Column of each item key (extended when growing).
+        :param items: Film details per column (extended when growing).
+        :param grow: Register unseen films as new items instead of skipping them.
+        :return: Row-ordered user IDs and the matching CSR matrix.
+        """
+        user_rows: Dict[int, int] = {}
+        row_idx: List[int] = []
+        col_idx: List[int] = []
+
+        for user_id, item_key, name, director, year, poster_url in rows:
+            col = item_index.get(item_key)
+            if col is None:
+                if not grow:
+                    continue
+                col = len(items)
+                item_index[item_key] = col
+                items.append(
+                    {
+                        "name": name,
+                        "director": director,
+                        "year": year,
+                        "poster_url": poster_url,
+                    }
+                )
+            row_idx.append(user_rows.setdefault(user_id, len(user_rows)))
+            col_idx.append(col)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(row_idx), dtype=np.float32), (row_idx, col_idx)),
+            shape=(len(user_rows), len(items)),
+        )
+        # Guard against duplicate links collapsing into counts > 1
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        return list(user_rows), matrix
+
+    def _score(
+        self,
+        user_ids: List[int],
+        matrix: sparse.csr_matrix,
+        similarity: sparse.csr_matrix,
+        suggestions: Dict[int, List[Tuple[int, float]]],
+    ) -> None:
+        """
+        Compute the top-K unseen items for each user row of the matrix.
+
+        Scores stay sparse: each row's top-K is selected among its non-zero
+        scores only.
+
+        :param user_ids: User IDs in matrix row order.
+        :param matrix: Binary user x item matrix aligned with the similarity matrix.
+        :param similarity: Item-item similarity matrix.
+        :param suggestions: Mapping the ranked (column, score) lists are stored in.
+        """
+        if not user_ids or similarity.shape[0] == 0:
+            return
+
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            block = matrix[start : start + CHUNK_SIZE]
+            scores = (block @ similarity).tocsr()
+            scores.sort_indices()
+
+            for offset, user_id in enumerate(user_ids[start : start + CHUNK_SIZE]):
+                row = slice(scores.indptr[offset], scores.indptr[offset + 1])
+                cols, values = scores.indices[row], scores.data[row]
+                # Never suggest what is already on the shelf
+                seen = block.indices[block.indptr[offset] : block.indptr[offset + 1]]
+                keep = (values > 0) & ~np.isin(cols, seen)
+                cols, values = cols[keep], values[keep]
+                if len(values) > self.top_k:
+                    top = np.argpartition(-values, self.top_k - 1)[: self.top_k]
+                    cols, values = cols[top], values[top]
+                order = np.argsort(-values, kind="stable")
+                suggestions[user_id] = [
+                    (int(col), float(score))
+                    for col, score in zip(cols[order], values[order])
+                ]
+
+
+# Shared per-process index; bound to the app in create_app
+recommender = Recommender()
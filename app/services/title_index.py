@@ -0,0 +1,177 @@
+# File: app/services/title_index.py
+"""
+Purpose:
+    Serve type-ahead movie title suggestions from a local prefix index, falling
+    back to the OMDb search endpoint only when the index has no match.
+
+Features:
+    - Sorted in-memory index of normalized titles with bisect prefix lookups
+    - Lazily seeded from the shared movie catalogue (of every shard)
+    - Grows with titles added to shelves and titles returned by OMDb
+    - Bounded LRU cache of results per prefix with a time-to-live
+    - Remembers upstream misses so unknown prefixes are not re-queried
+
+Required Modules:
+    - bisect: prefix range lookups on the sorted index
+    - threading: guard the in-process index
+    - time: cache expiry
+    - collections.OrderedDict: LRU cache of prefix results
+    - app.extentions.db: SQLAlchemy session for seeding
+    - app.models.CatalogEntry: previously seen titles
+    - app.sharding.fan_out: seed from every shard
+    - app.utils: title normalization and OMDb search
+
+Exceptions:
+    - SQLAlchemyError: on database failures while seeding the index
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from flask import Flask
+
+from app.extentions import db
+from app.models import CatalogEntry
+from app.sharding import fan_out
+from app.utils import normalize_title, search_omdb_titles
+
+# Upper bound for the bisect range: sorts after every real continuation of a prefix
+_PREFIX_END: str = "\U0010ffff"
+
+
+class TitleIndex:
+    """
+    Prefix index over every movie title CineShelf has seen.
+
+    Lookups bisect a sorted list of normalized titles, so a warm prefix costs
+    O(log n + limit). Only prefixes without any local match go to OMDb, and
+    both local and upstream results are cached per prefix.
+    """
+
+    def __init__(
+        self, min_length: int = 3, cache_size: int = 2048, cache_ttl: int = 3600
+    ) -> None:
+        """
+        Initialize an empty title index.
+
+        :param min_length: Minimum prefix length before suggestions are served.
+        :param cache_size: Maximum number of cached prefixes.
+        :param cache_ttl: Seconds a cached prefix result stays valid.
+        """
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        self._lock = threading.RLock()
+        self._seeded = False
+        self._keys: List[str] = []
+        self._titles: Dict[str, dict] = {}
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[dict]]]" = (
+            OrderedDict()
+        )
+        self._limits: Set[int] = set()
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read suggestion settings from the app config and register the index.
+
+        :param app: Flask application instance.
+        """
+        self.min_length = app.config.get("SUGGEST_MIN_LENGTH", self.min_length)
+        self.cache_size = app.config.get("SUGGEST_CACHE_SIZE", self.cache_size)
+        self.cache_ttl = app.config.get("SUGGEST_CACHE_TTL", self.cache_ttl)
+        app.extensions["title_index"] = self
+
+    def add(self, title: str, year: Optional[int] = None, imdb_id: str = "") -> None:
+        """
+        Insert a title into the index, keeping the list sorted.
+
+        :param title: Display title.
+        :param year: Release year, if known.
+        :param imdb_id: IMDb id, if known.
+        """
+        key = normalize_title(title)
+        if not key:
+            return
+        with self._lock:
+            if key in self._titles:
+                return
+            self._titles[key] = {
+                "Title": title,
+                "Year": str(year) if year else "",
+                "imdbID": imdb_id or "",
+            }
+            bisect.insort(self._keys, key)
+            # A new title can only change the cached results of its own prefixes
+            for length in range(self.min_length, len(key) + 1):
+                for limit in self._limits:
+                    self._cache.pop((key[:length], limit), None)
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        """
+        Return up to `limit` titles starting with the given prefix.
+
+        :param prefix: Text typed so far.
+        :param limit: Maximum number of suggestions.
+        :return: List of dicts with Title, Year and imdbID.
+        :raises SQLAlchemyError: if seeding the index from the catalogue fails.
+        """
+        key = normalize_title(prefix)
+        if len(key) < self.min_length:
+            return []
+
+        with self._lock:
+            cached = self._cache.get((key, limit))
+            if cached and cached[0] > time.monotonic():
+                self._cache.move_to_end((key, limit))
+                return cached[1]
+
+            if not self._seeded:
+                self._seed()
+            results = self._lookup(key, limit)
+
+        if not results:
+            for item in search_omdb_titles(prefix):
+                self.add(item["Title"], item["Year"][:4], item["imdbID"])
+            with self._lock:
+                results = self._lookup(key, limit)
+
+        with self._lock:
+            self._limits.add(limit)
+            self._cache[(key, limit)] = (time.monotonic() + self.cache_ttl, results)
+            self._cache.move_to_end((key, limit))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def _lookup(self, key: str, limit: int) -> List[dict]:
+        """Return the indexed titles in the sorted range of the given prefix."""
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key + _PREFIX_END, lo=start)
+        return [self._titles[k] for k in self._keys[start : min(end, start + limit)]]
+
+    def _seed(self) -> None:
+        """Load every catalogue title into the index once per process."""
+        stmt = db.select(CatalogEntry.name, CatalogEntry.year, CatalogEntry.imdb_id)
+        rows = [row for _, result in fan_out(db, stmt) for row in result]
+        for name, year, imdb_id in rows:
+            key = normalize_title(name)
+            self._titles.setdefault(
+                key,
+                {
+                    "Title": name,
+                    "Year": str(year) if year else "",
+                    "imdbID": imdb_id or "",
+                },
+            )
+        self._keys = sorted(self._titles)
+        self._seeded = True
+
+
+# Shared per-process index; bound to the app in create_app
+title_index = TitleIndex()
@@ -0,0 +1,245 @@
+# File: app/services/warmup.py
+"""
+Purpose:
+    Warm a freshly started process before it accepts traffic, so the first
+    requests after a deploy or restart do not pay for cold caches.
+
+Features:
+    - templates: compile every template (in-process and bytecode cache)
+    - titles: replay the prefixes of the most-shelved titles into the title
+      suggestion cache (seeds the index; local hits never call OMDb)
+    - statements: run each read-only DataManager query once, filling the
+      SQLAlchemy compiled statement cache of every engine
+    - recommender: build the similarity index
+    - shelves: render the home page of the largest shelves once
+    - A shared time budget (WARMUP_BUDGET_SECONDS): stages that would start
+      after it ran out are skipped, long stages stop between items
+    - Status per stage for the readiness endpoint (GET /health/ready)
+
+Required Modules:
+    - collections.Counter: merge per-shard popularity counts
+    - time: budget and stage timing
+    - flask: application context and test client for pre-rendering
+    - sqlalchemy: popularity queries
+    - app.services: DataManager, recommender and title index
+    - app.sharding.fan_out: popularity over every shard
+    - app.templating.precompile_templates: template compilation
+
+Exceptions:
+    - Exceptions inside a stage are logged and mark the stage as failed;
+      warm-up never prevents the app from starting
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from flask import Flask
+from sqlalchemy import func, select
+
+from app.extentions import db
+from app.models import CatalogEntry, Movie
+from app.services.data_manager import DataManager
+from app.services.recommender import recommender
+from app.services.title_index import title_index
+from app.sharding import fan_out
+from app.templating import precompile_templates
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Runs the warm-up stages of one process within a time budget.
+
+    :ivar ready: True once warm-up finished (or when it is disabled).
+    :ivar stages: Stage name -> dict with status ("ok", "failed", "skipped",
+        "partial") and duration in milliseconds.
+    """
+
+    def __init__(
+        self, budget: float = 15.0, top_titles: int = 50, top_shelves: int = 10
+    ) -> None:
+        """
+        Initialize a warm-up that has not run yet.
+
+        :param budget: Seconds all stages together may take.
+        :param top_titles: Most-shelved titles replayed into the suggestion cache.
+        :param top_shelves: Largest shelves rendered once.
+        """
+        self.budget = budget
+        self.top_titles = top_titles
+        self.top_shelves = top_shelves
+        self.enabled = False
+        self.ready = True
+        self.stages: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._deadline = 0.0
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Read warm-up settings from the app config and register the warm-up.
+
+        Until `run` finished, a process with warm-up enabled reports not ready.
+
+        :param app: Flask application instance.
+        """
+        self.budget = app.config.get("WARMUP_BUDGET_SECONDS", self.budget)
+        self.top_titles = app.config.get("WARMUP_TOP_TITLES", self.top_titles)
+        self.top_shelves = app.config.get("WARMUP_TOP_SHELVES", self.top_shelves)
+        self.enabled = app.config.get("WARMUP_ENABLED", False)
+        self.ready = not self.enabled
+        app.extensions["warmup"] = self
+
+    def run(self, app: Flask) -> Dict[str, dict]:
+        """
+        Run all stages, then drop pooled connections (the caller may fork next).
+
+        :param app: Flask application instance.
+        :return: Stage status mapping.
+        """
+        started = time.monotonic()
+        self._deadline = started + self.budget
+        stages: List[tuple] = [
+            ("templates", lambda: self._templates(app)),
+            ("titles", self._titles),
+            ("statements", self._statements),
+            ("recommender", recommender.rebuild),
+            ("shelves", lambda: self._shelves(app)),
+        ]
+        with app.app_context():
+            for name, stage in stages:
+                self._run_stage(name, stage)
+            db.session.remove()
+            for engine in db.engines.values():
+                if engine.url.database not in (None, "", ":memory:"):
+                    engine.dispose()
+
+        with self._lock:
+            self.ready = True
+        logger.info(
+            "Warm-up finished in %.0f ms: %s",
+            (time.monotonic() - started) * 1000,
+            ", ".join(f"{n} {s['status']}" for n, s in self.stages.items()),
+        )
+        return self.stages
+
+    def status(self) -> dict:
+        """Return readiness and per-stage results for the readiness endpoint."""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "enabled": self.enabled,
+                "stages": dict(self.stages),
+            }
+
+    def _run_stage(self, name: str, stage: Callable[[], Optional[bool]]) -> None:
+        """Run one stage unless the budget is spent, recording its outcome."""
+        if self._out_of_time():
+            self.stages[name] = {"status": "skipped", "ms": 0.0}
+            return
+        started = time.perf_counter()
+        try:
+            complete = stage()
+            status = "partial" if complete is False else "ok"
+        except Exception:
+            logger.exception("Warm-up stage '%s' failed", name)
+            db.session.rollback()
+            status = "failed"
+        self.stages[name] = {
+            "status": status,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _out_of_time(self) -> bool:
+        """Return True once the budget is spent."""
+        return time.monotonic() >= self._deadline
+
+    @staticmethod
+    def _templates(app: Flask) -> None:
+        """Compile every template."""
+        precompile_templates(app)
+
+    def _titles(self) -> bool:
+        """
+        Cache suggestions for the prefixes of the most-shelved titles.
+
+        :return: False if the budget ran out before every title was replayed.
+        """
+        stmt = (
+            select(CatalogEntry.name, func.count(Movie.id))
+            .join(Movie, Movie.catalog_id == CatalogEntry.id)
+            .group_by(CatalogEntry.id)
+            .order_by(func.count(Movie.id).desc())
+            .limit(self.top_titles)
+        )
+        popular: Counter = Counter()
+        for _, result in fan_out(db, stmt):
+            for name, count in result:
+                popular[name] += count
+        for name, _ in popular.most_common(self.top_titles):
+            if self._out_of_time():
+                return False
+            key = name.strip()
+            for end in range(title_index.min_length, min(len(key), 8) + 1):
+                title_index.suggest(key[:end])
+        return True
+
+    def _top_users(self) -> List[int]:
+        """Return the ids of the users with the largest shelves, largest first."""
+        stmt = (
+            select(Movie.user_id, func.count(Movie.id))
+            .group_by(Movie.user_id)
+            .order_by(func.count(Movie.id).desc())
+            .limit(self.top_shelves)
+        )
+        sizes: Counter = Counter()
+        for _, result in fan_out(db, stmt):
+            sizes.update(dict(result.all()))
+        return [user_id for user_id, _ in sizes.most_common(self.top_shelves)]
+
+    def _statements(self) -> None:
+        """
+        Run every read-only DataManager query once.
+
+        Writes are not replayed; their statements compile on first use.
+        """
+        data_manager = DataManager(db)
+        data_manager.get_users()
+        data_manager.page_users(limit=1)
+        data_manager.shard_stats()
+        top = self._top_users()
+        if not top:
+            return
+        user_id = top[0]
+        movies = data_manager.page_movies(user_id, limit=1)
+        data_manager.shelf_version(user_id)
+        data_manager.count_movies(user_id)
+        next(data_manager.iter_movie_cards(user_id, batch_size=1), None)
+        if movies:
+            data_manager.find_movie(user_id, movies[0].name)
+            data_manager.find_catalog_entry(movies[0].name)
+        db.session.rollback()
+
+    def _shelves(self, app: Flask) -> bool:
+        """
+        Render the home page of the largest shelves once.
+
+        :return: False if the budget ran out before every shelf was rendered.
+        """
+        client = app.test_client()
+        for user_id in self._top_users():
+            if self._out_of_time():
+                return False
+            response = client.get(f"/?user_id={user_id}")
+            response.get_data()
+            response.close()
+        return True
+
+
+# Shared per-process warm-up; bound to the app in create_app, run by wsgi.py
+warmup = Warmup()
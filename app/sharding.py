@@ -0,0 +1,213 @@
+# File: app/sharding.py
+"""
+Purpose:
+    Spread users over N SQLite files so that writes to different shelves do
+    not queue behind a single database lock.
+
+Features:
+    - shard_for: hash a user id onto one of SHARD_COUNT shards
+    - Shard directory (`shard_directory` on the primary) mapping user id to shard
+    - user_shard: route a block of queries to a user's shard
+    - fan_out: run one statement on every shard for cross-shard listings and stats
+    - register_user / release_user: allocate and free directory entries
+    - init_sharding: create the per-user tables on every shard and route each
+      request with a `user_id` URL argument to that user's shard
+    - Users being moved between shards answer HTTP 503 with Retry-After
+
+Required Modules:
+    - zlib.crc32: stable hash of user ids
+    - contextlib.contextmanager: user_shard helper
+    - flask: request hook and configuration
+    - sqlalchemy: directory statements
+    - werkzeug.exceptions.ServiceUnavailable: users locked by the rebalancer
+    - app.models.ShardDirectory: directory table
+    - app.routing: shard bind keys and session routing
+
+Exceptions:
+    - ServiceUnavailable: when a user's shelf is being moved to another shard
+    - SQLAlchemyError: on directory failures
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from flask import Flask, current_app, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Engine, Result
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.models import ShardDirectory
+from app.routing import SHARDED_TABLES, set_shard, shard_bind_key, use_shard
+
+# Session.info key of the per-session cache of directory lookups
+_DIRECTORY_CACHE: str = "shard_directory"
+
+# Seconds a client should wait before retrying a user that is being moved
+RETRY_AFTER: int = 5
+
+
+def shard_count() -> int:
+    """Return the configured number of shards (0 when sharding is off)."""
+    return current_app.config.get("SHARD_COUNT", 0)
+
+
+def shard_for(user_id: int, count: int) -> int:
+    """
+    Return the home shard of a user id.
+
+    :param user_id: ID of the user
+    :param count: Number of shards
+    :return: Shard number in range(count)
+    """
+    return zlib.crc32(str(user_id).encode()) % count
+
+
+def shard_engine(db, shard: Optional[int]) -> Engine:
+    """
+    Return the engine of a shard, or the primary engine for None.
+
+    :param db: Flask-SQLAlchemy instance
+    :param shard: Shard number or None
+    :return: SQLAlchemy engine
+    :raises KeyError: if the shard is not configured
+    """
+    return db.engine if shard is None else db.engines[shard_bind_key(shard)]
+
+
+def lookup_shard(db, user_id: int) -> Optional[int]:
+    """
+    Return the shard holding a user, cached for the rest of the session.
+
+    :param db: Flask-SQLAlchemy instance
+    :param user_id: ID of the user
+    :return: Shard number, or None if the user is not in the directory
+    :raises ServiceUnavailable: if the user is being moved to another shard
+    """
+    cache = db.session().info.setdefault(_DIRECTORY_CACHE, {})
+    if user_id not in cache:
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(ShardDirectory.shard, ShardDirectory.locked).where(
+                    ShardDirectory.user_id == user_id
+                )
+            ).first()
+        if row is not None and row.locked:
+            raise ServiceUnavailable(
+                "This shelf is being moved, please retry shortly.",
+                retry_after=RETRY_AFTER,
+            )
+        cache[user_id] = row.shard if row is not None else None
+    return cache[user_id]
+
+
+@contextmanager
+def user_shard(db, user_id: Optional[int]) -> Iterator[None]:
+    """
+    Route the block's queries on per-user tables to the user's shard.
+
+    Does nothing when sharding is off or no user id is given.
+
+    :param db: Flask-SQLAlchemy instance
+    :param user_id: ID of the user, or None
+    :raises ServiceUnavailable: if the user is being moved to another shard
+    """
+    if not shard_count() or user_id is None:
+        yield
+        return
+    with use_shard(db, lookup_shard(db, user_id)):
+        yield
+
+
+def fan_out(db, statement) -> Iterator[Tuple[Optional[int], Result]]:
+    """
+    Execute a statement on every shard, one shard after the other.
+
+    Without sharding the statement runs once through the normal session
+    routing (so read_replica() still applies) and the shard is None.
+
+    :param db: Flask-SQLAlchemy instance
+    :param statement: Select statement on per-user tables
+    :return: Iterator of (shard, result) pairs
+    :raises SQLAlchemyError: if a shard query fails
+    """
+    count = shard_count()
+    if not count:
+        yield None, db.session.execute(statement)
+        return
+    for shard in range(count):
+        bind = shard_engine(db, shard)
+        yield shard, db.session.execute(statement, bind_arguments={"bind": bind})
+
+
+def register_user(db, user_id: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Allocate a directory entry (and so a globally unique id) for a new user.
+
+    Runs in its own transaction on the primary.
+
+    :param db: Flask-SQLAlchemy instance
+    :param user_id: Explicit id (when importing existing users), or None to allocate
+    :return: Tuple of (user id, shard)
+    :raises SQLAlchemyError: if the directory insert fails
+    """
+    count = shard_count()
+    with db.engine.begin() as conn:
+        result = conn.execute(
+            insert(ShardDirectory).values(user_id=user_id, shard=0, locked=False)
+        )
+        user_id = result.inserted_primary_key[0]
+        shard = shard_for(user_id, count)
+        conn.execute(
+            update(ShardDirectory)
+            .where(ShardDirectory.user_id == user_id)
+            .values(shard=shard)
+        )
+    db.session().info.setdefault(_DIRECTORY_CACHE, {})[user_id] = shard
+    return user_id, shard
+
+
+def release_user(db, user_id: int) -> None:
+    """
+    Remove a deleted user from the directory.
+
+    :param db: Flask-SQLAlchemy instance
+    :param user_id: ID of the deleted user
+    :raises SQLAlchemyError: if the directory delete fails
+    """
+    with db.engine.begin() as conn:
+        conn.execute(delete(ShardDirectory).where(ShardDirectory.user_id == user_id))
+    db.session().info.get(_DIRECTORY_CACHE, {}).pop(user_id, None)
+
+
+def init_sharding(app: Flask, db) -> None:
+    """
+    Create the per-user tables on every shard and route requests by user.
+
+    Requests whose URL carries a `user_id` argument run against that user's
+    shard; users that are not in the directory fall through to the primary
+    (where they do not exist, so views answer 404 as usual).
+
+    :param app: Flask application instance
+    :param db: Flask-SQLAlchemy instance
+    """
+    count: int = app.config.get("SHARD_COUNT", 0)
+    if not count:
+        return
+
+    with app.app_context():
+        tables = [t for t in db.metadata.sorted_tables if t.name in SHARDED_TABLES]
+        for shard in range(count):
+            engine = shard_engine(db, shard)
+            db.metadata.create_all(engine, tables=tables)
+            if engine.url.database not in (None, "", ":memory:"):
+                engine.dispose()
+
+    @app.before_request
+    def _route_to_user_shard() -> None:
+        """Send per-user queries of this request to the user's shard."""
+        user_id = (request.view_args or {}).get("user_id")
+        if user_id is not None:
+            set_shard(db, lookup_shard(db, user_id))
@@ -9,10 +9,17 @@
  *   - Reload page with updated query parameters
  *   - Load and display HTML fragments in a global Bootstrap modal
  *   - Bind movie search/add and delete actions dynamically
+ *   - Debounced, cached type-ahead title suggestions in the add-movie search
+ *   - Live shelf updates: cards are added, patched and removed from the
+ *     server-sent change feed, and shelf changes are submitted in the
+ *     background while the feed is connected
+ *   - Idempotency key on every shelf change, reused when the same change is
+ *     submitted again (double clicks, retries after a network error)
  *   - Clean up modal backdrops and state upon closing
  *
  * Dependencies:
  *   - window.fetch API
+ *   - EventSource (server-sent events)
  *   - Bootstrap Modal (bootstrap.Modal)
  *   - DOM APIs: document, window, Element
  *
@@ -21,6 +28,33 @@
  * Date: 2025-07-18
  */
 
+// Keys of changes not yet answered, by path and form data
+const pendingKeys = new Map();
+
+/**
+ * Return the idempotency key of a change, reusing the key of an identical
+ * change that has not been answered yet.
+ *
+ * @param {string} path - URL the change is submitted to.
+ * @param {Object} data - Form fields of the change.
+ * @returns {{id: string, key: string}} Map entry id and idempotency key.
+ */
+function idempotencyKey(path, data) {
+  const fields = Object.entries(data)
+    .filter(([name]) => name !== 'idempotency_key')
+    .map(([name, value]) => [name, String(value)])
+    .sort();
+  const id = `${path} ${JSON.stringify(fields)}`;
+  if (!pendingKeys.has(id)) {
+    const key = window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    pendingKeys.set(id, key);
+  }
+  return { id, key: pendingKeys.get(id) };
+}
+
+
 /**
  * Submit a POST request by creating and submitting a hidden form.
  *
@@ -34,7 +68,8 @@ function postForm(path, confirmMessage = null, extraData = {}) {
   const form = document.createElement('form');
   form.method = 'POST';
   form.action = path;
-  Object.entries(extraData).forEach(([name, value]) => {
+  const { key } = idempotencyKey(path, extraData);
+  Object.entries({ ...extraData, idempotency_key: key }).forEach(([name, value]) => {
     const input = document.createElement('input');
     input.type  = 'hidden';
     input.name  = name;
@@ -70,6 +105,8 @@ async function openModal(url) {
   modalEl.querySelector('.modal-content').innerHTML = html;
   new bootstrap.Modal(modalEl).show();
   bindMovieModal();
+  bindBatchAddForm();
+  bindEditForm();
 }
 
 
@@ -86,6 +123,70 @@ function closeModal() {
 
 
 
+// Delay (ms) after the last keystroke before suggestions are requested
+const SUGGEST_DEBOUNCE_MS = 200;
+
+// Client-side cache of suggestion results per typed prefix
+const suggestionCache = new Map();
+
+
+/**
+ * Return a function that delays calls to `fn` until `wait` ms have passed
+ * without another call.
+ *
+ * @param {Function} fn - Function to debounce.
+ * @param {number} wait - Quiet period in milliseconds.
+ * @returns {Function}
+ */
+function debounce(fn, wait) {
+  let timer = null;
+  return (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), wait);
+  };
+}
+
+
+/**
+ * Fill the title datalist with suggestions for the typed prefix.
+ *
+ * Results are cached per prefix; a newer keystroke aborts the pending request.
+ *
+ * @param {HTMLInputElement} input - Title input bound to the datalist.
+ * @param {string} userId - ID of the current user.
+ * @returns {Promise<void>}
+ */
+async function loadTitleSuggestions(input, userId) {
+  const prefix = input.value.trim().toLowerCase();
+  const datalist = document.getElementById(input.getAttribute('list'));
+  if (!datalist || prefix.length < 3) return;
+
+  let suggestions = suggestionCache.get(prefix);
+  if (!suggestions) {
+    if (input._suggestAbort) input._suggestAbort.abort();
+    input._suggestAbort = new AbortController();
+    try {
+      const res = await fetch(
+        `/users/${userId}/movies/suggest?q=${encodeURIComponent(prefix)}`,
+        { signal: input._suggestAbort.signal }
+      );
+      suggestions = await res.json();
+    } catch (err) {
+      if (err.name === 'AbortError') return;
+      throw err;
+    }
+    suggestionCache.set(prefix, suggestions);
+  }
+
+  datalist.replaceChildren(...suggestions.map(s => {
+    const option = document.createElement('option');
+    option.value = s.Title;
+    if (s.Year) option.label = `${s.Title} (${s.Year})`;
+    return option;
+  }));
+}
+
+
 // Bind form submission and button actions inside the movie modal.
 function bindMovieModal() {
   const modalEl = document.getElementById('globalModal');
@@ -97,6 +198,14 @@ function bindMovieModal() {
 
   form.onsubmit = null;
 
+  const titleInput = form.querySelector('[name=title]');
+  if (titleInput && titleInput.list) {
+    titleInput.oninput = debounce(
+      () => loadTitleSuggestions(titleInput, form.dataset.userId),
+      SUGGEST_DEBOUNCE_MS
+    );
+  }
+
   form.addEventListener('submit', async e => {
     e.preventDefault();
     const title = form.querySelector('[name=title]').value.trim();
@@ -119,12 +228,167 @@ function bindMovieModal() {
       const userId = form.dataset.userId;
       const titleText = modalEl.querySelector('.card-title')?.textContent.trim();
       if (!userId || !titleText) return;
-      postForm(`/users/${userId}/movies`, null, { title: titleText });
+      submitAction(`/users/${userId}/movies`, null, { title: titleText });
     };
   }
 }
 
 
+// Submit the edit-movie form in the background while the change feed is live.
+function bindEditForm() {
+  const modalEl = document.getElementById('globalModal');
+  const form = modalEl && modalEl.querySelector('#editMovieForm');
+  if (!form) return;
+
+  form.addEventListener('submit', e => {
+    if (!feedLive()) return;
+    e.preventDefault();
+    submitAction(form.action, null, Object.fromEntries(new FormData(form)));
+  });
+}
+
+
+// Open change feed of the shown shelf (null while disconnected)
+let shelfFeed = null;
+
+
+/**
+ * Return whether the change feed is connected, so that shelf changes can be
+ * sent in the background and the page is patched from the feed.
+ *
+ * @returns {boolean}
+ */
+function feedLive() {
+  return shelfFeed !== null && shelfFeed.readyState === EventSource.OPEN;
+}
+
+
+/**
+ * Show a status message above the shelf, with an Undo button if the change
+ * can be reverted.
+ *
+ * @param {string} message - Text to show.
+ * @param {string|null} [undo=null] - URL that reverts the change.
+ */
+function showMessage(message, undo = null) {
+  const el = document.getElementById('shelf-message');
+  if (!el) return;
+  el.querySelector('.js-message-text').textContent = message;
+  const undoBtn = el.querySelector('.js-undo');
+  undoBtn.dataset.url = undo || '';
+  // Undone the way it was done: in the background
+  undoBtn.dataset.background = '1';
+  undoBtn.classList.toggle('d-none', !undo);
+  el.classList.remove('d-none');
+}
+
+
+/**
+ * Submit a shelf change. With a live change feed the POST is sent in the
+ * background and the page is patched from the feed; otherwise the page is
+ * submitted and reloaded as before.
+ *
+ * @param {string} path - URL to submit to.
+ * @param {string|null} [confirmMessage=null] - Optional confirmation message.
+ * @param {Object} [extraData={}] - Form fields to send.
+ * @returns {Promise<void>}
+ */
+async function submitAction(path, confirmMessage = null, extraData = {}) {
+  if (!feedLive()) {
+    postForm(path, confirmMessage, extraData);
+    return;
+  }
+  if (confirmMessage && !window.confirm(confirmMessage)) return;
+
+  const body = new URLSearchParams();
+  Object.entries(extraData).forEach(([name, value]) => body.append(name, String(value)));
+  // Kept on a network error, so trying again cannot apply the change twice
+  const { id, key } = idempotencyKey(path, extraData);
+  const res = await fetch(path, {
+    method: 'POST',
+    body,
+    headers: { 'X-Requested-With': 'fetch', 'Idempotency-Key': key },
+  });
+  pendingKeys.delete(id);
+  closeModal();
+  if (!res.ok) {
+    showMessage('The change could not be saved, please try again.');
+    return;
+  }
+  const { message, undo } = await res.json();
+  showMessage(message, undo);
+}
+
+
+/**
+ * Insert or replace a movie card in the grid.
+ *
+ * @param {{id: number, html: string}} data - Card data from the feed.
+ */
+function upsertCard(data) {
+  const grid = document.getElementById('movie-grid');
+  const template = document.createElement('template');
+  template.innerHTML = data.html.trim();
+  const card = template.content.firstElementChild;
+  const existing = document.getElementById(`movie-${data.id}`);
+  if (existing) existing.replaceWith(card);
+  else grid.append(card);
+}
+
+
+/**
+ * Connect to the shelf's change feed and apply its events to the page.
+ * A `reset` event (the client fell behind) reloads the page.
+ */
+function openShelfFeed() {
+  const grid = document.getElementById('movie-grid');
+  if (!grid || !grid.dataset.feedUrl || !window.EventSource) return;
+
+  shelfFeed = new EventSource(grid.dataset.feedUrl);
+  const updateCount = () => {
+    document.getElementById('movie-count').textContent = grid.children.length;
+  };
+
+  shelfFeed.addEventListener('added', e => {
+    upsertCard(JSON.parse(e.data));
+    updateCount();
+  });
+  shelfFeed.addEventListener('updated', e => upsertCard(JSON.parse(e.data)));
+  shelfFeed.addEventListener('removed', e => {
+    document.getElementById(`movie-${JSON.parse(e.data).id}`)?.remove();
+    updateCount();
+  });
+  shelfFeed.addEventListener('reset', () => window.location.reload());
+  shelfFeed.onerror = () => {
+    // EventSource retries on its own unless the server refused the stream
+    if (shelfFeed.readyState === EventSource.CLOSED) shelfFeed = null;
+  };
+}
+
+
+/**
+ * Submit the batch-add form in the background and show the per-title results
+ * in the modal. Lookups for long lists take a while, so the button is disabled
+ * until the server answers.
+ */
+function bindBatchAddForm() {
+  const modalEl = document.getElementById('globalModal');
+  const form = modalEl && modalEl.querySelector('#batchAddForm');
+  if (!form) return;
+
+  form.addEventListener('submit', async e => {
+    e.preventDefault();
+    const button = form.querySelector('[type=submit]');
+    button.disabled = true;
+    button.textContent = 'Adding…';
+
+    const res = await fetch(form.action, { method: 'POST', body: new FormData(form) });
+    modalEl.querySelector('.modal-content').innerHTML = await res.text();
+    bindBatchAddForm();
+  });
+}
+
+
 // Wire up buttons, delete actions on a page load and attach closeModal action inside the modal
 document.addEventListener('DOMContentLoaded', () => {
 
@@ -133,17 +397,47 @@ document.addEventListener('DOMContentLoaded', () => {
     if (e.target.closest('[data-bs-dismiss="modal"]')) {
       closeModal();
     }
+    const reload = e.target.closest('.js-close-reload');
+    if (reload) {
+      if (feedLive()) closeModal();
+      else loadIndex({ user_id: reload.dataset.userId });
+    }
   });
 
-  document.querySelectorAll('.js-open-modal').forEach(btn => {
-    btn.addEventListener('click', () => openModal(btn.dataset.url));
+  // Delegated, so that cards added from the change feed work as well
+  document.addEventListener('click', e => {
+    const openBtn = e.target.closest('.js-open-modal');
+    if (openBtn) {
+      openModal(openBtn.dataset.url);
+      return;
+    }
+    const deleteBtn = e.target.closest('.js-delete-movie');
+    if (deleteBtn) {
+      submitAction(deleteBtn.dataset.url, 'Do you really want to delete this movie?');
+      return;
+    }
+    const undoBtn = e.target.closest('.js-undo');
+    if (undoBtn && undoBtn.dataset.url) {
+      if (undoBtn.dataset.background) submitAction(undoBtn.dataset.url);
+      else postForm(undoBtn.dataset.url);
+    }
   });
-  bindMovieModal();
+  // Every other POST form (add, batch add, edit) carries a key as well
+  document.addEventListener('submit', e => {
+    const form = e.target;
+    if (form.method.toUpperCase() !== 'POST') return;
+    let input = form.querySelector('input[name="idempotency_key"]');
+    if (!input) {
+      input = document.createElement('input');
+      input.type = 'hidden';
+      input.name = 'idempotency_key';
+      form.append(input);
+    }
+    const { key } = idempotencyKey(form.action, Object.fromEntries(new FormData(form)));
+    input.value = key;
+  }, true);
 
-  document.querySelectorAll('.js-delete-movie').forEach(btn => {
-    btn.addEventListener('click', () => {
-      postForm(btn.dataset.url, 'Do you really want to delete this movie?');
-    });
-  });
+  bindMovieModal();
+  openShelfFeed();
 
 });
\ No newline at end of file
@@ -0,0 +1,99 @@
+# File: app/streaming.py
+"""
+Purpose:
+    Stream rendered HTML to the client while the template is still rendering,
+    so time-to-first-byte and per-request memory do not grow with page size.
+
+Features:
+    - stream_page: Response built from Flask's stream_template
+    - Coalesces Jinja's many small output events into socket-sized chunks
+    - stream_flush(): template global marking where buffered output must be
+      sent immediately (e.g. after the header, before a slow query)
+    - init_streaming: registers the template global
+
+Required Modules:
+    - flask: stream_template, Response and the request-scoped `g`
+    - markupsafe.Markup: flush marker output
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+from typing import Iterable, Iterator, List
+
+from flask import Flask, Response, current_app, g, stream_template
+from markupsafe import Markup
+
+# Emitted by stream_flush() while streaming; consumed by _coalesce, never sent
+FLUSH_MARKER: str = "<!--stream-flush-->"
+
+
+def stream_flush() -> Markup:
+    """
+    Mark a flush point in a template.
+
+    Renders nothing in a normal render; while streaming, everything buffered
+    so far is sent to the client at this point.
+
+    :return: The flush marker while streaming, an empty string otherwise.
+    """
+    return Markup(FLUSH_MARKER if g.get("streaming") else "")
+
+
+def _coalesce(chunks: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """
+    Join template output into chunks of at least `chunk_size` characters.
+
+    :param chunks: Template output events.
+    :param chunk_size: Minimum characters per yielded chunk (except at flush points and the end).
+    :return: Iterator of coalesced chunks.
+    """
+    buffer: List[str] = []
+    size = 0
+    try:
+        for chunk in chunks:
+            if chunk == FLUSH_MARKER:
+                if buffer:
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+                continue
+            buffer.append(chunk)
+            size += len(chunk)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Release the template generator (and its request context) on disconnect
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def stream_page(template_name: str, **context) -> Response:
+    """
+    Render a template as a streamed HTML response.
+
+    Database iterators passed in the context are consumed while the response
+    is being sent. Errors raised mid-stream can no longer change the status
+    code, so callers should run anything that may fail before streaming.
+
+    :param template_name: Template to render.
+    :param context: Template variables.
+    :return: Streaming response (no Content-Length).
+    """
+    g.streaming = True
+    chunks = stream_template(template_name, **context)
+    return Response(
+        _coalesce(chunks, current_app.config.get("STREAM_CHUNK_SIZE", 16384)),
+        mimetype="text/html",
+    )
+
+
+def init_streaming(app: Flask) -> None:
+    """
+    Register the `stream_flush` template global.
+
+    :param app: Flask application instance.
+    """
+    app.add_template_global(stream_flush)
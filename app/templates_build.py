@@ -0,0 +1,46 @@
+# File: app/templates_build.py
+"""
+Purpose:
+    Build step for templates: compile every template into the shared bytecode
+    cache so freshly started workers load bytecode instead of compiling.
+
+Features:
+    - Compiles all templates of the default, partials and fallback directories
+    - Writes into TEMPLATE_CACHE_DIR of the selected configuration
+    - Fails on template syntax errors before a deploy goes live
+
+Usage:
+    python -m app.templates_build [--config production]
+
+Required Modules:
+    - argparse: command line options
+    - app.create_app: application factory
+    - app.templating.precompile_templates: template compilation
+
+Exceptions:
+    - TemplateSyntaxError: when a template fails to compile
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+
+from app import create_app
+from app.templating import precompile_templates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompile CineShelf templates")
+    parser.add_argument(
+        "--config",
+        default="production",
+        help="configuration name (default: production)",
+    )
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    if not app.config.get("TEMPLATE_CACHE_DIR"):
+        parser.error("TEMPLATE_CACHE_DIR is not set for this configuration.")
+    compiled = precompile_templates(app)
+    print(
+        f"[OK] Compiled {compiled} templates into {app.config['TEMPLATE_CACHE_DIR']}."
+    )
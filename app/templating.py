@@ -0,0 +1,150 @@
+# File: app/templating.py
+"""
+Purpose:
+    Make template loading cheap across workers: remember which loader of the
+    default -> partials -> fallback chain owns each template, share compiled
+    bytecode between processes, and compile every template ahead of traffic.
+
+Features:
+    - ResolvingChoiceLoader: ChoiceLoader that caches the winning loader per template name
+    - Filesystem-backed Jinja bytecode cache shared by all workers (TEMPLATE_CACHE_DIR)
+    - precompile_templates: compile every template once, filling the bytecode cache
+    - init_templating: install the loader chain, bytecode cache and optional warm-up
+
+Required Modules:
+    - os: template and cache directories
+    - threading: guard the resolved-loader cache
+    - jinja2: loaders, bytecode cache and template errors
+    - flask.Flask: application instance
+
+Exceptions:
+    - TemplateNotFound: when no loader in the chain provides a template
+    - TemplateSyntaxError: when precompiling a broken template
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from flask import Flask
+from jinja2 import (
+    BaseLoader,
+    ChoiceLoader,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    TemplateNotFound,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ResolvingChoiceLoader(ChoiceLoader):
+    """
+    ChoiceLoader that remembers which loader resolved each template name.
+
+    A plain ChoiceLoader probes every loader in order on each load, i.e. up to
+    three directory lookups for a fallback template. Once a name is resolved,
+    later loads go straight to the loader that owns it; if that template
+    disappears, the chain is searched again.
+    """
+
+    def __init__(self, loaders: List[BaseLoader]) -> None:
+        """
+        Initialize the loader chain with an empty resolution cache.
+
+        :param loaders: Loaders in priority order.
+        """
+        super().__init__(loaders)
+        self._resolved: Dict[str, BaseLoader] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, name: str, method: str, *args):
+        """
+        Call `method` on the cached loader for `name`, or search the chain.
+
+        :param name: Template name.
+        :param method: Loader method to call ("get_source" or "load").
+        :return: Result of the loader method.
+        :raises TemplateNotFound: if no loader provides the template.
+        """
+        loader = self._resolved.get(name)
+        if loader is not None:
+            try:
+                return getattr(loader, method)(*args)
+            except TemplateNotFound:
+                with self._lock:
+                    self._resolved.pop(name, None)
+
+        for loader in self.loaders:
+            try:
+                result = getattr(loader, method)(*args)
+            except TemplateNotFound:
+                continue
+            with self._lock:
+                self._resolved[name] = loader
+            return result
+        raise TemplateNotFound(name)
+
+    def get_source(self, environment, template):
+        """Return the template source from the loader that owns it."""
+        return self._resolve(template, "get_source", environment, template)
+
+    def load(self, environment, name, globals=None):
+        """Load (and bytecode-cache) the template from the loader that owns it."""
+        return self._resolve(name, "load", environment, name, globals)
+
+    def clear(self) -> None:
+        """Forget all resolved template locations."""
+        with self._lock:
+            self._resolved.clear()
+
+
+def precompile_templates(app: Flask) -> int:
+    """
+    Compile every template the loader chain can see.
+
+    Compiled templates land in the environment's in-process cache and, when a
+    bytecode cache is configured, on disk for the other workers.
+
+    :param app: Flask application instance.
+    :return: Number of templates compiled.
+    :raises TemplateSyntaxError: if a template fails to compile.
+    """
+    env = app.jinja_env
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_templating(app: Flask) -> None:
+    """
+    Install the default -> partials -> fallback loader chain and template caching.
+
+    Config keys:
+        TEMPLATE_CACHE_DIR: Directory for compiled template bytecode; None disables it.
+        TEMPLATE_PRECOMPILE: Compile all templates at startup (before workers fork).
+
+    :param app: Flask application instance.
+    :raises OSError: if the bytecode cache directory cannot be created.
+    """
+    templates_root = os.path.join(app.root_path, app.template_folder)
+    app.jinja_loader = ResolvingChoiceLoader(
+        [
+            app.jinja_loader,
+            FileSystemLoader(os.path.join(templates_root, "partials")),
+            FileSystemLoader(os.path.join(templates_root, "fallback")),
+        ]
+    )
+
+    cache_dir: Optional[str] = app.config.get("TEMPLATE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    if app.config.get("TEMPLATE_PRECOMPILE"):
+        count = precompile_templates(app)
+        logger.info("Precompiled %d templates.", count)
@@ -6,6 +6,11 @@ Purpose:
 Features:
     - fetch_omdb_data: Retrieve and normalize movie details from OMDb
     - build_movie_from_omdb: Construct Movie model instances from OMDb data
+    - normalize_title: Canonical key for comparing titles across shelves
+    - omdb_data_from_entry: Present a catalogue entry in the OMDb data format
+    - search_omdb_titles: Search OMDb for titles matching a partial query
+    - Titles are resolved in the offline reference catalogue first; OMDb is
+      only asked for titles it lacks and for missing posters and plots
 
 Exceptions:
     - JSONDecodeError: on invalid JSON response
@@ -21,23 +26,49 @@ from json import JSONDecodeError
 import requests
 from flask import abort
 
-from app.models import Movie
+from app.models import CatalogEntry, Movie, ReferenceTitle
+from app.services.local_catalogue import local_catalogue
 
 # Load OMDb API key from environment
 OMDB_API_KEY: str = os.getenv("OMDB_API_KEY", "YOUR_OMDB_API_KEY")
 
 
+def normalize_title(title: str) -> str:
+    """
+    Normalize a movie title for case- and whitespace-insensitive comparison.
+
+    :param title: Raw movie title
+    :return: Casefolded title with collapsed whitespace
+    """
+    return " ".join((title or "").casefold().split())
+
+
 def fetch_omdb_data(title: str) -> dict:
     """
     Fetches and cleans data for a given movie title from the OMDb API.
     We have to clean the data because the API returns some fields as "N/A" instead of empty strings.
     This is necessary because we want to display "No movies found" in the UI when the movie is not found.
 
+    Titles found in the offline reference catalogue are answered locally;
+    OMDb is then only asked once per film (by IMDb id) for poster and plot.
+
     :param title: Movie title to query
-    :return: Dictionary with keys Title, Year, Poster, Director, Plot
+    :return: Dictionary with keys Title, Year, Poster, Director, Plot, imdbID
     :raises JSONDecodeError: if response JSON is invalid
     :raises requests.RequestException: on request failure or timeout
     """
+    ref = local_catalogue.find(normalize_title(title))
+    if ref is not None:
+        data = omdb_data_from_reference(ref)
+        if ref.poster_url is None or ref.plot is None:
+            details = fetch_omdb_details(ref.imdb_id)
+            if details is not None:
+                data.update(details)
+                local_catalogue.remember_details(
+                    ref.imdb_id, details["Poster"], details["Plot"]
+                )
+        return data
+
     url: str = f"https://www.omdbapi.com/?t={title}&apikey={OMDB_API_KEY}"
     try:
         response = requests.get(url, timeout=5)
@@ -67,10 +98,108 @@ def fetch_omdb_data(title: str) -> dict:
             "Poster": clean("Poster"),
             "Director": clean("Director"),
             "Plot": clean("Plot"),
+            "imdbID": clean("imdbID"),
         }
     return data
 
 
+def fetch_omdb_details(imdb_id: str) -> dict | None:
+    """
+    Fetch poster and plot for a known IMDb id from OMDb.
+
+    Failures are logged and yield None; the caller still has the local data.
+
+    :param imdb_id: IMDb id (e.g. tt0133093)
+    :return: Dictionary with keys Poster and Plot ("" where OMDb has none), or None on failure
+    """
+    try:
+        response = requests.get(
+            "https://www.omdbapi.com/",
+            params={"i": imdb_id, "apikey": OMDB_API_KEY},
+            timeout=5,
+        )
+        response.raise_for_status()
+        payload: dict = response.json()
+    except (requests.RequestException, JSONDecodeError) as e:
+        logging.warning("OMDb details lookup failed for '%s': %s", imdb_id, e)
+        return None
+
+    if payload.get("Response") != "True":
+        return {"Poster": "", "Plot": ""}
+    return {
+        key: "" if payload.get(key, "N/A") == "N/A" else payload[key]
+        for key in ("Poster", "Plot")
+    }
+
+
+def omdb_data_from_reference(ref: ReferenceTitle) -> dict:
+    """
+    Build an OMDb-style data dictionary from an offline reference catalogue row.
+
+    :param ref: Reference catalogue row
+    :return: Dictionary with keys Title, Year, Poster, Director, Plot, imdbID
+    """
+    return {
+        "Title": ref.name,
+        "Year": str(ref.year) if ref.year else "",
+        "Poster": ref.poster_url or "",
+        "Director": ref.director or "",
+        "Plot": ref.plot or "",
+        "imdbID": ref.imdb_id,
+    }
+
+
+def omdb_data_from_entry(entry: CatalogEntry) -> dict:
+    """
+    Build an OMDb-style data dictionary from a shared catalogue entry.
+
+    :param entry: Catalogue entry previously filled from OMDb
+    :return: Dictionary with keys Title, Year, Poster, Director, Plot, imdbID
+    """
+    return {
+        "Title": entry.name,
+        "Year": str(entry.year) if entry.year else "",
+        "Poster": entry.poster_url or "",
+        "Director": entry.director or "",
+        "Plot": entry.plot or "",
+        "imdbID": entry.imdb_id or "",
+    }
+
+
+def search_omdb_titles(query: str) -> list[dict]:
+    """
+    Search the OMDb `s=` endpoint for movies matching a partial title.
+
+    Failures are logged and yield no results, since suggestions are optional.
+
+    :param query: Partial movie title
+    :return: List of dictionaries with keys Title, Year, imdbID
+    """
+    try:
+        response = requests.get(
+            "https://www.omdbapi.com/",
+            params={"s": query, "type": "movie", "apikey": OMDB_API_KEY},
+            timeout=5,
+        )
+        response.raise_for_status()
+        payload: dict = response.json()
+    except (requests.RequestException, JSONDecodeError) as e:
+        logging.warning("OMDb search failed for query '%s': %s", query, e)
+        return []
+
+    if payload.get("Response") != "True":
+        return []
+    return [
+        {
+            "Title": item.get("Title", ""),
+            "Year": item.get("Year", ""),
+            "imdbID": item.get("imdbID", ""),
+        }
+        for item in payload.get("Search", [])
+        if item.get("Title")
+    ]
+
+
 def build_movie_from_omdb(data: dict, user_id: int) -> Movie:
     """
     Build a Movie instance from OMDb data dictionary.
@@ -93,5 +222,7 @@ def build_movie_from_omdb(data: dict, user_id: int) -> Movie:
         director=data.get("Director", "Unknown"),
         year=year,
         poster_url=poster_url,
+        plot=data.get("Plot") or None,
+        imdb_id=data.get("imdbID") or None,
         user_id=user_id,
     )
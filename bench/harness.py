@@ -0,0 +1,278 @@
+# File: bench/harness.py
+"""
+Purpose:
+    Benchmark harness: seed a throwaway database with synthetic shelves, start
+    the app under gunicorn and measure HTTP throughput and latency.
+
+Features:
+    - seed_database: synthetic users and shelves, no OMDb calls
+    - run_load: closed-loop HTTP load with keep-alive connections per client thread
+    - serve: context manager running gunicorn with a given worker/thread count
+    - CLI: throughput table for a list of worker counts
+    - --write: measure writes (user renames through the JSON API) instead of page reads
+    - --shards: spread the synthetic users over per-user SQLite shards
+
+Usage:
+    python -m bench.harness --workers 1,2,4 --threads 2 --duration 10
+    python -m bench.harness --workers 4 --write --shards 4
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+import contextlib
+import http.client
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Iterator, List, Optional, Sequence
+
+PROJECT_ROOT: str = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+
+def seed_database(
+    database_url: str,
+    users: int = 50,
+    movies_per_user: int = 40,
+    shard_url: Optional[str] = None,
+    shards: int = 0,
+) -> None:
+    """
+    Fill a fresh database with synthetic users and shelves drawn from a shared pool.
+
+    :param database_url: SQLAlchemy URL of the database to seed
+    :param users: Number of users to create
+    :param movies_per_user: Shelf size per user
+    :param shard_url: Shard URL template (`{}` = shard number) when sharding
+    :param shards: Number of shards (0 keeps every shelf in the database)
+    """
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SHARD_COUNT"] = str(shards)
+    if shard_url:
+        os.environ["SHARD_DATABASE_URL"] = shard_url
+    sys.path.insert(0, PROJECT_ROOT)
+
+    from app import create_app
+    from app.extentions import db
+    from app.models import Movie
+    from app.services.data_manager import DataManager
+    from app.sharding import user_shard
+
+    app = create_app("production")
+    rng = random.Random(42)
+    pool = [
+        (f"Synthetic Movie {i}", f"Director {i % 97}", 1950 + i % 75)
+        for i in range(2000)
+    ]
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        data_manager = DataManager(db)
+        for u in range(users):
+            user = data_manager.create_user(f"Bench User {u:03d}")
+            with user_shard(db, user.id):
+                for name, director, year in rng.sample(pool, movies_per_user):
+                    entry = data_manager.resolve_entry(name, director, year)
+                    db.session.add(Movie(entry=entry, user_id=user.id))
+                db.session.commit()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def run_load(
+    host: str,
+    port: int,
+    paths: Sequence[str],
+    concurrency: int = 8,
+    duration: float = 10.0,
+    method: str = "GET",
+    body: Optional[bytes] = None,
+) -> dict:
+    """
+    Issue requests from `concurrency` client threads for `duration` seconds.
+
+    :param host: Server host
+    :param port: Server port
+    :param paths: Request paths, cycled per thread
+    :param concurrency: Number of client threads
+    :param duration: Measurement window in seconds
+    :param method: HTTP method
+    :param body: JSON request body (sent with every request), if any
+    :return: Dict with requests, errors, rps, p50_ms and p95_ms
+    """
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset: int) -> None:
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local: List[float] = []
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    raise http.client.HTTPException(response.status)
+            except (OSError, http.client.HTTPException):
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors[0],
+        "rps": count / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if count else 0.0,
+        "p95_ms": latencies[int(count * 0.95) - 1] * 1000 if count else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def serve(
+    database_url: str,
+    workers: int,
+    threads: int,
+    port: int = 8765,
+    shard_url: Optional[str] = None,
+    shards: int = 0,
+) -> Iterator[subprocess.Popen]:
+    """
+    Run `wsgi:app` under gunicorn for the duration of the context.
+
+    :param database_url: SQLAlchemy URL the app should use
+    :param workers: Gunicorn worker processes
+    :param threads: Threads per worker
+    :param port: Port to bind on 127.0.0.1
+    :param shard_url: Shard URL template (`{}` = shard number) when sharding
+    :param shards: Number of shards
+    :return: The gunicorn process
+    """
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        SHARD_COUNT=str(shards),
+        SHARD_DATABASE_URL=shard_url or "",
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_MAX_REQUESTS="0",
+    )
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "wsgi:app",
+            "--access-logfile",
+            "/dev/null",
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_port(port)
+        yield proc
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    """Block until the server answers on the port or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"Server did not come up on port {port}")
+
+
+def main() -> None:
+    """Seed a temporary database and print throughput per worker count."""
+    parser = argparse.ArgumentParser(description="CineShelf throughput vs. workers")
+    parser.add_argument(
+        "--workers", default="1,2,4", help="comma-separated worker counts"
+    )
+    parser.add_argument("--threads", type=int, default=2, help="threads per worker")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--users", type=int, default=50, help="synthetic users")
+    parser.add_argument("--movies", type=int, default=40, help="movies per user")
+    parser.add_argument("--shards", type=int, default=0, help="per-user shards")
+    parser.add_argument(
+        "--write", action="store_true", help="rename users instead of reading pages"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.sqlite')}"
+        shard_url = f"sqlite:///{os.path.join(tmp, 'bench_shard_{}.sqlite')}"
+        seed_database(database_url, args.users, args.movies, shard_url, args.shards)
+        if args.write:
+            method, body = "PATCH", b'{"name": "Renamed Bench User"}'
+            paths = [f"/api/v1/users/{u}" for u in range(1, args.users + 1)]
+        else:
+            method, body = "GET", None
+            paths = [f"/?user_id={u}" for u in range(1, args.users + 1)]
+
+        print("| workers | threads | shards | req/s | p50 ms | p95 ms | errors |")
+        print("|--------:|--------:|-------:|------:|-------:|-------:|-------:|")
+        for workers in (int(w) for w in args.workers.split(",")):
+            with serve(
+                database_url,
+                workers,
+                args.threads,
+                shard_url=shard_url,
+                shards=args.shards,
+            ):
+                result = run_load(
+                    "127.0.0.1",
+                    8765,
+                    paths,
+                    args.concurrency,
+                    args.duration,
+                    method,
+                    body,
+                )
+            print(
+                f"| {workers} | {args.threads} | {args.shards} | {result['rps']:.0f} | "
+                f"{result['p50_ms']:.1f} | {result['p95_ms']:.1f} | {result['errors']} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
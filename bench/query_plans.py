@@ -0,0 +1,339 @@
+# File: bench/query_plans.py
+"""
+Purpose:
+    Guard the hot paths against query plan regressions: capture every SQL
+    statement the blueprints and DataManager issue for a fixed request mix,
+    explain it and compare the plans with a checked-in baseline.
+
+Features:
+    - Seeds the same synthetic shelves as the benchmark harness
+    - Runs the request mix twice in-process (cold caches, then warm) and
+      records the statements of each request, on every engine (primary,
+      read engine and shards)
+    - EXPLAIN QUERY PLAN on SQLite, EXPLAIN on other backends
+    - Fails on a full scan of users/user_movies/catalog that the baseline
+      does not have, and on more queries per (warm) request than the baseline
+    - --update rewrites the baseline (bench/query_plans.json, or
+      query_plans_shards<N>.json with --shards N) after an intended change;
+      commit it together with that change
+
+Usage:
+    python -m bench.query_plans
+    python -m bench.query_plans --shards 4
+    python -m bench.query_plans --update
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from bench.harness import PROJECT_ROOT, seed_database
+
+BASELINE_DIR: str = os.path.join(PROJECT_ROOT, "bench")
+
+# Tables whose full scans are regressions unless the baseline already has them
+WATCHED_TABLES: Set[str] = {"users", "user_movies", "catalog"}
+
+# Full scans in SQLite ("SCAN users", older: "SCAN TABLE users") and Postgres plans
+_SCAN_PATTERNS = (
+    re.compile(r"^SCAN (?:TABLE )?(\w+)"),
+    re.compile(r"Seq Scan on (\w+)"),
+)
+
+# Statements that have no plan worth comparing
+_SKIP_PREFIXES = ("PRAGMA", "EXPLAIN", "SAVEPOINT", "RELEASE", "ROLLBACK")
+
+# Users the request mix runs for
+MIX_USERS: Tuple[int, ...] = (1, 2, 3)
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduce a statement to a stable key: single spaces, expanded IN lists collapsed.
+
+    :param statement: SQL as sent to the driver
+    :return: Normalized SQL
+    """
+    statement = " ".join(statement.split())
+    return re.sub(r"\((?:\?|%\(\w+\)s)(?:, (?:\?|%\(\w+\)s))+\)", "(?...)", statement)
+
+
+def scanned_tables(plan: List[str]) -> List[str]:
+    """
+    Return the watched tables a plan reads in full.
+
+    :param plan: Plan lines
+    :return: Sorted table names
+    """
+    tables = set()
+    for line in plan:
+        for pattern in _SCAN_PATTERNS:
+            match = pattern.search(line.strip())
+            if match and match.group(1) in WATCHED_TABLES:
+                tables.add(match.group(1))
+    return sorted(tables)
+
+
+class QueryRecorder:
+    """
+    Records the statements executed by the current request thread, per request.
+
+    :ivar statements: Normalized SQL -> (engine, raw statement, parameters) of
+        its first execution, used to explain it later.
+    :ivar counts: Request key -> number of statements of each run.
+    """
+
+    def __init__(self) -> None:
+        self.statements: Dict[str, tuple] = {}
+        self.counts: Dict[str, List[int]] = defaultdict(list)
+        self._current: Optional[List[str]] = None
+        self._thread: Optional[int] = None
+
+    def before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ) -> None:
+        """SQLAlchemy engine event: remember statements of the recorded request."""
+        if self._current is None or threading.get_ident() != self._thread:
+            return
+        if statement.lstrip().upper().startswith(_SKIP_PREFIXES):
+            return
+        self._current.append(statement)
+        key = normalize_sql(statement)
+        if key not in self.statements and not executemany:
+            self.statements[key] = (conn.engine, statement, parameters)
+
+    def start(self) -> None:
+        """Begin recording a request on this thread."""
+        self._current, self._thread = [], threading.get_ident()
+
+    def stop(self, request_key: str) -> None:
+        """Finish recording a request and store its statement count."""
+        self.counts[request_key].append(len(self._current))
+        self._current = None
+
+
+def explain(engine, statement: str, parameters) -> List[str]:
+    """
+    Return the plan of a statement on the engine it ran on.
+
+    :param engine: SQLAlchemy engine
+    :param statement: Raw SQL
+    :param parameters: Driver parameters of the captured execution
+    :return: Plan lines
+    """
+    sqlite = engine.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+        conn.rollback()
+    if sqlite:
+        return [row[-1] for row in rows]
+    # Postgres cost estimates change with the data, the plan shape does not
+    return [re.sub(r"\s*\(cost=.*\)$", "", row[0]) for row in rows]
+
+
+def run_mix(client, recorder: QueryRecorder, tag: str) -> None:
+    """
+    Issue the request mix once, recording each request under "METHOD rule".
+
+    :param client: Flask test client
+    :param recorder: Statement recorder
+    :param tag: Suffix that keeps names of created rows unique per run
+    """
+
+    def call(method: str, rule: str, url: str, **kwargs):
+        recorder.start()
+        response = client.open(url, method=method, **kwargs)
+        recorder.stop(f"{method} {rule}")
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} answered {response.status_code}")
+        return response
+
+    for u in MIX_USERS:
+        call("GET", "/", f"/?user_id={u}")
+        call("GET", "/api/v1/users", "/api/v1/users")
+        call("GET", "/api/v1/users/<id>", f"/api/v1/users/{u}")
+        call("GET", "/api/v1/users/<id>/movies", f"/api/v1/users/{u}/movies?limit=20")
+        call("PATCH", "/api/v1/users/<id>", f"/api/v1/users/{u}", json={"name": tag})
+        call(
+            "GET",
+            "/users/<id>/movies/suggest",
+            f"/users/{u}/movies/suggest?q=synthetic",
+        )
+        call("GET", "/users/<id>/recommendations", f"/users/{u}/recommendations")
+
+        movie = call(
+            "POST",
+            "/api/v1/users/<id>/movies",
+            f"/api/v1/users/{u}/movies",
+            json={"name": f"Plan Check {tag}", "director": "Nobody", "year": 2000},
+        ).get_json()
+        path = f"/api/v1/users/{u}/movies/{movie['id']}"
+        call("GET", "/api/v1/users/<id>/movies/<id>", path)
+        call("PATCH", "/api/v1/users/<id>/movies/<id>", path, json={"year": 2001})
+        call("DELETE", "/api/v1/users/<id>/movies/<id>", path)
+
+        call(
+            "POST",
+            "/users/<id>/movies",
+            f"/users/{u}/movies",
+            data={"title": f"Form Check {tag}", "director": "Nobody", "year": "1999"},
+        )
+        movie_id = client.get(f"/api/v1/users/{u}/movies?limit=200").get_json()["data"][
+            -1
+        ]["id"]
+        call(
+            "GET",
+            "/users/<id>/movies/<id>/edit",
+            f"/users/{u}/movies/{movie_id}/edit?modal=1",
+        )
+        call(
+            "POST",
+            "/users/<id>/movies/<id>/update",
+            f"/users/{u}/movies/{movie_id}/update",
+            data={"name": f"Form Check {tag}", "director": "Somebody", "year": "1998"},
+        )
+        call(
+            "POST",
+            "/users/<id>/movies/<id>/delete",
+            f"/users/{u}/movies/{movie_id}/delete",
+        )
+
+
+def capture(shards: int) -> dict:
+    """
+    Seed a temporary database, run the request mix and explain every statement.
+
+    :param shards: Number of per-user shards (0 for one database)
+    :return: Result dict with per-request query counts and per-statement plans
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'plans.sqlite')}"
+        shard_url = f"sqlite:///{os.path.join(tmp, 'plans_shard_{}.sqlite')}"
+        seed_database(database_url, 20, 40, shard_url, shards)
+
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        from app import create_app
+        from app.extentions import limiter
+
+        app = create_app("production")
+        limiter.enabled = False
+        recorder = QueryRecorder()
+        event.listen(Engine, "before_cursor_execute", recorder.before_cursor_execute)
+        try:
+            client = app.test_client()
+            run_mix(client, recorder, "cold")
+            cold = dict(recorder.counts)
+            recorder.counts.clear()
+            run_mix(client, recorder, "warm")
+        finally:
+            event.remove(
+                Engine, "before_cursor_execute", recorder.before_cursor_execute
+            )
+
+        with app.app_context():
+            statements = {}
+            for key, (engine, statement, parameters) in sorted(
+                recorder.statements.items()
+            ):
+                plan = explain(engine, statement, parameters)
+                statements[key] = {"plan": plan, "scans": scanned_tables(plan)}
+            for engine in app.extensions["sqlalchemy"].engines.values():
+                engine.dispose()
+
+    return {
+        "requests": {
+            key: {"cold": max(cold.get(key, [0])), "warm": max(counts)}
+            for key, counts in sorted(recorder.counts.items())
+        },
+        "statements": statements,
+    }
+
+
+def compare(baseline: dict, current: dict) -> Tuple[List[str], List[str]]:
+    """
+    Compare a capture with the baseline.
+
+    :param baseline: Baseline result
+    :param current: New result
+    :return: Tuple of (failures, notes)
+    """
+    failures: List[str] = []
+    notes: List[str] = []
+
+    for key, counts in current["requests"].items():
+        expected = baseline["requests"].get(key)
+        if expected is None:
+            notes.append(f"new request {key}: {counts['warm']} queries")
+        elif counts["warm"] > expected["warm"]:
+            failures.append(
+                f"{key}: {counts['warm']} queries per request "
+                f"(baseline {expected['warm']})"
+            )
+        elif counts["warm"] < expected["warm"]:
+            notes.append(
+                f"{key}: {counts['warm']} queries (baseline {expected['warm']})"
+            )
+
+    for sql, entry in current["statements"].items():
+        allowed = set(baseline["statements"].get(sql, {}).get("scans", []))
+        new_scans = [t for t in entry["scans"] if t not in allowed]
+        if new_scans:
+            failures.append(
+                f"full scan of {', '.join(new_scans)}:\n    {sql}\n    "
+                + "\n    ".join(entry["plan"])
+            )
+        elif sql not in baseline["statements"]:
+            notes.append(f"new statement: {sql}")
+    return failures, notes
+
+
+def main() -> None:
+    """Capture plans and compare them with (or write them to) the baseline."""
+    parser = argparse.ArgumentParser(description="CineShelf query plan regressions")
+    parser.add_argument("--shards", type=int, default=0, help="per-user shards")
+    parser.add_argument(
+        "--update", action="store_true", help="rewrite the baseline from this run"
+    )
+    parser.add_argument("--baseline", default=None, help="baseline file")
+    args = parser.parse_args()
+    if args.baseline is None:
+        # Sharded runs look up the shard directory, so they get their own baseline
+        name = f"query_plans_shards{args.shards}.json" if args.shards else None
+        args.baseline = os.path.join(BASELINE_DIR, name or "query_plans.json")
+
+    current = capture(args.shards)
+    if args.update:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(
+            f"[OK] Baseline written: {len(current['requests'])} requests, "
+            f"{len(current['statements'])} statements."
+        )
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures, notes = compare(baseline, current)
+    for note in notes:
+        print(f"[NOTE] {note}")
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] {len(current['statements'])} statements match the baseline.")
+
+
+if __name__ == "__main__":
+    main()
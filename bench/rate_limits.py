@@ -0,0 +1,102 @@
+# File: bench/rate_limits.py
+"""
+Purpose:
+    Check that the rate limits actually fire: a limit decorator placed
+    above the route decorator wraps a function Flask never calls and is
+    silently ignored.
+
+Features:
+    - Seeds a small temporary database (synthetic shelves, no OMDb calls)
+    - Sends one request more than each limit allows, in-process, and expects
+      HTTP 429 for that request only
+    - Exits with status 1 if any limit does not fire (or fires too early)
+
+Usage:
+    python -m bench.rate_limits
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import os
+import sys
+import tempfile
+from typing import Callable, List, Tuple
+
+from bench.harness import seed_database
+
+# (description, limit per minute, request sender taking the client and a counter)
+LIMITED_REQUESTS: List[Tuple[str, int, Callable]] = [
+    (
+        "POST /api/v1/users/<id>/movies",
+        10,
+        lambda client, i: client.post(
+            "/api/v1/users/1/movies",
+            json={"name": f"Rate Limit Film {i}", "director": "Bench", "year": 2000},
+        ),
+    ),
+    (
+        "POST /users/<id>/movies",
+        10,
+        lambda client, i: client.post(
+            "/users/1/movies",
+            data={"title": f"Rate Limit Film {i}", "director": "Bench", "year": "2000"},
+        ),
+    ),
+    (
+        "POST /users/<id>/movies/batch",
+        5,
+        lambda client, i: client.post("/users/1/movies/batch", data={"titles": ""}),
+    ),
+    (
+        "GET /users/<id>/movies/suggest",
+        60,
+        lambda client, i: client.get("/users/1/movies/suggest?q=a"),
+    ),
+]
+
+
+def check() -> List[str]:
+    """
+    Seed a temporary database and exceed every limit in LIMITED_REQUESTS once.
+
+    :return: Failure messages (empty if every limit fired on time)
+    """
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_database(f"sqlite:///{os.path.join(tmp, 'limits.sqlite')}", 2, 5)
+
+        from app import create_app
+        from app.extentions import limiter
+
+        app = create_app("production")
+        limiter.enabled = True
+        client = app.test_client()
+        for description, limit, send in LIMITED_REQUESTS:
+            limiter.reset()
+            statuses = [send(client, i).status_code for i in range(limit + 1)]
+            if 429 in statuses[:limit]:
+                failures.append(f"{description}: 429 before request {limit + 1}")
+            elif statuses[limit] != 429:
+                failures.append(
+                    f"{description}: request {limit + 1} got {statuses[limit]}, "
+                    "expected 429"
+                )
+
+        with app.app_context():
+            for engine in app.extensions["sqlalchemy"].engines.values():
+                engine.dispose()
+    return failures
+
+
+def main() -> None:
+    """Run the check and exit with status 1 on failures."""
+    failures = check()
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"[OK] {len(LIMITED_REQUESTS)} rate limits fire on time.")
+
+
+if __name__ == "__main__":
+    main()
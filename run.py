@@ -2,7 +2,8 @@
 CineShelf - Your favorite movie collection in one place.
 
 Purpose:
-Entry point for initializing and running the CineShelf Flask web application.
+Entry point for initializing and running the CineShelf Flask web application
+with the Flask development server. Use `wsgi.py` with gunicorn in production.
 
 Features:
 - User Management: Create, select, and delete user profiles.
@@ -37,4 +38,4 @@ if __name__ == "__main__":
     host = os.getenv("FLASK_RUN_HOST", "127.0.0.1")
     port = int(os.getenv("FLASK_RUN_PORT", 5000))
 
-    app.run(host=host, port=port, debug=True)
+    app.run(host=host, port=port, debug=app.config["DEBUG"])
@@ -0,0 +1,27 @@
+"""
+CineShelf - Your favorite movie collection in one place.
+
+Purpose:
+WSGI entry point for running CineShelf under a multi-process production server.
+
+Features:
+- Builds the app once at import, so gunicorn can preload it in the master
+  process and fork workers from it (see gunicorn.conf.py).
+- Defaults to the production configuration; override with FLASK_CONFIG.
+- Warms caches before the server accepts traffic (WARMUP_ENABLED). With
+  preloading this happens once in the master, before the listening socket
+  is opened, and every forked worker starts warm.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Author: Martin Haferanke
+Date: 2026-10-18
+"""
+import os
+from app import create_app
+from app.services.warmup import warmup
+
+app = create_app(config_name=os.getenv("FLASK_CONFIG", "production"))
+if app.config["WARMUP_ENABLED"]:
+    warmup.run(app)